@@ -40,20 +40,23 @@ def get_employee(db: Session, employee_id: int):
 def get_employee_by_email(db: Session, email: str):
     return db.query(models.Employee).filter(models.Employee.email == email).first()
 
-def get_employees(db: Session, skip: int = 0, limit: int = 100, search: str = None, active_only: bool = False):
-    # Optimize query with eager loading to avoid N+1 problem
-    # We need to load assignments and the device within each assignment
-    query = db.query(models.Employee).options(
-        joinedload(models.Employee.assignments).joinedload(models.Assignment.device)
-    )
-    
+def filter_employee_list(query, search: str = None, active_only: bool = False):
+    """Filters and ordering shared by the employee list (full objects or sparse fields)"""
     if active_only:
         query = query.filter(models.Employee.is_active == True)
     if search:
         query = query.filter(models.Employee.full_name.ilike(f"%{search}%") | models.Employee.email.ilike(f"%{search}%"))
     
     # Order by name for consistent pagination
-    query = query.order_by(models.Employee.full_name)
+    return query.order_by(models.Employee.full_name)
+
+def get_employees(db: Session, skip: int = 0, limit: int = 100, search: str = None, active_only: bool = False):
+    # Optimize query with eager loading to avoid N+1 problem
+    # We need to load assignments and the device within each assignment
+    query = db.query(models.Employee).options(
+        joinedload(models.Employee.assignments).joinedload(models.Assignment.device)
+    )
+    query = filter_employee_list(query, search=search, active_only=active_only)
     
     return query.offset(skip).limit(limit).all()
 
@@ -81,6 +84,15 @@ def update_employee(db: Session, employee_id: int, employee_update: schemas.Empl
     return db_employee
 
 # Assignment Logic
+def set_current_assignment(device: models.Device, assignment: models.Assignment = None):
+    """
+    Point the device's denormalized holder fields at an open assignment,
+    or clear them when assignment is None (device returned/sold).
+    Call in the same transaction that opens or closes the assignment.
+    """
+    device.current_assignment_id = assignment.id if assignment else None
+    device.current_employee_id = assignment.employee_id if assignment else None
+
 def assign_device(db: Session, assignment: schemas.AssignmentCreate):
     # 1. Check if device is available
     device = get_device(db, assignment.device_id)
@@ -90,12 +102,13 @@ def assign_device(db: Session, assignment: schemas.AssignmentCreate):
     # 2. Create Assignment Record
     db_assignment = models.Assignment(**assignment.dict())
     db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
+    db.flush()  # Get the ID
     
-    # 3. Update Device status
+    # 3. Update Device status and current holder in the same transaction
     device.status = models.DeviceStatus.ASSIGNED
+    set_current_assignment(device, db_assignment)
     db.commit()
+    db.refresh(db_assignment)
     
     return db_assignment
 
@@ -118,6 +131,7 @@ def return_device(db: Session, device_id: int):
     
     # Update device status
     device.status = models.DeviceStatus.AVAILABLE
+    set_current_assignment(device, None)
     db.commit()
     return device
 
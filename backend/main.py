@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from routes import inventory, assignments, maintenance, terminations, analytics
 import database, models
+import services.data_versions  # registers the per-table version hooks used for ETags
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -98,6 +99,14 @@ tags_metadata = [
         "name": "Alerts", 
         "description": "🔔 **Sistema de alertas y notificaciones**. Avisos de equipos sin asignar, licencias por vencer, etc."
     },
+    {
+        "name": "Document Jobs", 
+        "description": "⏳ **Generación de actas en segundo plano**. Encola la generación, consulta el estado (o síguelo por SSE) y descarga el resultado."
+    },
+    {
+        "name": "Storage", 
+        "description": "🧹 **Limpieza de archivos generados**. Reporte de uso de disco y barrido LRU de actas, vistas previas y cargas temporales (solo administradores)."
+    },
     {
         "name": "Upload Actas", 
         "description": "📤 **Carga de actas firmadas**. Sube documentos escaneados con firmas físicas."
@@ -165,6 +174,19 @@ from routes import form_templates
 app.include_router(form_templates.router, tags=["Form Templates"])
 from routes import image_builder
 app.include_router(image_builder.router, tags=["Image Builder"])
+from routes import document_jobs
+app.include_router(document_jobs.router, tags=["Document Jobs"])
+from routes import storage
+app.include_router(storage.router, tags=["Storage"])
+
+# Periodic cleanup of generated/temporary files (see services/storage.py)
+from services import storage as storage_service
+storage_service.start_housekeeping()
+
+# Opt-in (YOLO_WARMUP=1): start the photo workers and load their detection model now
+# instead of on the first upload (see services/image_pipeline.py)
+from services import image_pipeline
+image_pipeline.start_warmup()
 
 # Serve static files (uploaded images)
 import os
@@ -0,0 +1,70 @@
+"""
+Script de migración para agregar el puntero desnormalizado del poseedor actual
+(current_assignment_id, current_employee_id) a la tabla devices y poblarlo desde
+assignments.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import SessionLocal
+from sync_current_assignments import sync_current_assignments
+
+POINTER_COLUMNS = [
+    ("current_assignment_id", "assignments", "fk_devices_current_assignment_id"),
+    ("current_employee_id", "employees", "fk_devices_current_employee_id"),
+]
+
+def migrate_current_assignment_pointer():
+    """
+    1. Agregar columnas current_assignment_id / current_employee_id con FK e índice
+    2. Backfill desde assignments abiertas
+    """
+    
+    print("=" * 60)
+    print("MIGRACION: Puntero de asignacion actual en devices")
+    print("=" * 60)
+    
+    db = SessionLocal()
+    
+    try:
+        print("\n[1/2] Verificando columnas...")
+        for column_name, ref_table, fk_name in POINTER_COLUMNS:
+            result = db.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name='devices' AND column_name=:column_name
+            """), {"column_name": column_name})
+            
+            if result.fetchone():
+                print(f"[OK] La columna {column_name} ya existe")
+                continue
+            
+            print(f"[->] Agregando columna {column_name}...")
+            db.execute(text(f"ALTER TABLE devices ADD COLUMN {column_name} INTEGER"))
+            db.execute(text(
+                f"ALTER TABLE devices ADD CONSTRAINT {fk_name} "
+                f"FOREIGN KEY ({column_name}) REFERENCES {ref_table} (id)"
+            ))
+            db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_devices_{column_name} ON devices ({column_name})"))
+            db.commit()
+            print(f"[OK] Columna {column_name} agregada")
+    except Exception as e:
+        print(f"\n[ERROR] durante la migracion: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    
+    print("\n[2/2] Poblando punteros desde assignments...")
+    sync_current_assignments(fix=True)
+    
+    print("\n" + "=" * 60)
+    print("[OK] MIGRACION COMPLETADA EXITOSAMENTE")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    migrate_current_assignment_pointer()
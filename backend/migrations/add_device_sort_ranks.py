@@ -0,0 +1,77 @@
+"""
+Script de migración para agregar las columnas de orden persistidas a la tabla devices
+(status_group_rank, type_rank, status_rank) y el índice parcial que sirve el orden
+por defecto del inventario.
+Requiere PostgreSQL 12+ (columnas GENERATED ALWAYS AS ... STORED).
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import SessionLocal
+import models
+
+RANK_COLUMNS = [
+    ("status_group_rank", models.DEVICE_STATUS_GROUP_RANK_SQL),
+    ("type_rank", models.DEVICE_TYPE_RANK_SQL),
+    ("status_rank", models.DEVICE_STATUS_RANK_SQL),
+]
+
+def migrate_device_sort_ranks():
+    """
+    1. Agregar columnas generadas de ranking a devices
+    2. Crear índice parcial ix_devices_default_sort
+    """
+    
+    print("=" * 60)
+    print("MIGRACION: Columnas de orden persistidas en devices")
+    print("=" * 60)
+    
+    db = SessionLocal()
+    
+    try:
+        print("\n[1/2] Verificando columnas de ranking...")
+        for column_name, expression in RANK_COLUMNS:
+            result = db.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name='devices' AND column_name=:column_name
+            """), {"column_name": column_name})
+            
+            if result.fetchone():
+                print(f"[OK] La columna {column_name} ya existe")
+            else:
+                print(f"[->] Agregando columna {column_name}...")
+                db.execute(text(
+                    f"ALTER TABLE devices ADD COLUMN {column_name} INTEGER "
+                    f"GENERATED ALWAYS AS ({expression}) STORED NOT NULL"
+                ))
+                db.commit()
+                print(f"[OK] Columna {column_name} agregada")
+        
+        print("\n[2/2] Creando indice ix_devices_default_sort...")
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_devices_default_sort
+            ON devices (status_group_rank, type_rank, status_rank, brand, id DESC)
+            WHERE deleted_at IS NULL AND device_type <> 'charger'
+        """))
+        db.execute(text("ANALYZE devices"))
+        db.commit()
+        print("[OK] Indice creado")
+        
+        print("\n" + "=" * 60)
+        print("[OK] MIGRACION COMPLETADA EXITOSAMENTE")
+        print("=" * 60)
+        
+    except Exception as e:
+        print(f"\n[ERROR] durante la migracion: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_device_sort_ranks()
@@ -0,0 +1,114 @@
+"""
+Script de migración para los índices de los predicados más usados.
+Crea los índices declarados en models.py para:
+  - asignaciones abiertas (returned_date IS NULL) por empleado y por dispositivo
+  - dispositivos por estado / tipo / sede (excluyendo eliminados)
+  - empleados activos por sede
+  - auditoría por fecha
+  - ventas por nombre y DNI del comprador
+En PostgreSQL los índices se crean con CONCURRENTLY para no bloquear escrituras.
+Es idempotente: se puede ejecutar varias veces.
+
+Uso recomendado para ver el efecto en los planes de consulta:
+    python migrations/report_query_plans.py --save antes.json
+    python migrations/add_hot_predicate_indexes.py
+    python migrations/report_query_plans.py --compare antes.json
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from database import engine
+import models
+
+HOT_PREDICATE_INDEXES = [
+    "ix_assignments_open_employee_id",
+    "ix_assignments_open_device_id",
+    "ix_assignments_employee_id",
+    "ix_assignments_device_id",
+    "ix_assignments_termination_id",
+    "ix_devices_live_status_type_location",
+    "ix_devices_type_status",
+    "ix_employees_active_location",
+    "ix_audit_logs_timestamp",
+    "ix_sales_buyer_name",
+    "ix_sales_buyer_dni",
+]
+
+def _model_indexes():
+    """Índices declarados en los modelos, por nombre (única fuente de verdad del DDL)"""
+    indexes = {}
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            indexes[index.name] = index
+    return indexes
+
+def _invalid_postgres_indexes(conn):
+    """Índices que quedaron INVALID por un CREATE INDEX CONCURRENTLY interrumpido"""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid"
+    ))
+    return {row[0] for row in rows}
+
+def migrate_hot_predicate_indexes():
+    """
+    1. Reparar índices inválidos de una ejecución anterior (solo PostgreSQL)
+    2. Crear los índices que falten
+    3. Actualizar estadísticas del planificador
+    """
+
+    print("=" * 60)
+    print("MIGRACION: Indices de predicados frecuentes")
+    print("=" * 60)
+
+    is_postgres = engine.dialect.name == "postgresql"
+    declared = _model_indexes()
+
+    missing = [name for name in HOT_PREDICATE_INDEXES if name not in declared]
+    if missing:
+        print(f"[ERROR] Indices no declarados en models.py: {', '.join(missing)}")
+        return False
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if is_postgres:
+            print("\n[1/3] Buscando indices invalidos de ejecuciones anteriores...")
+            invalid = _invalid_postgres_indexes(conn) & set(HOT_PREDICATE_INDEXES)
+            for index_name in sorted(invalid):
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+                print(f"[->] {index_name} estaba INVALID, se recreara")
+            if not invalid:
+                print("[OK] Ninguno")
+        else:
+            print("\n[1/3] (no aplica fuera de PostgreSQL)")
+
+        print(f"\n[2/3] Creando {len(HOT_PREDICATE_INDEXES)} indices...")
+        tables = set()
+        for index_name in HOT_PREDICATE_INDEXES:
+            index = declared[index_name]
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if is_postgres:
+                ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            conn.execute(text(ddl))
+            tables.add(index.table.name)
+            print(f"[OK] {index_name}")
+
+        print("\n[3/3] Actualizando estadisticas...")
+        for table in sorted(tables):
+            conn.execute(text(f"ANALYZE {table}"))
+            print(f"[OK] ANALYZE {table}")
+
+    print("\n" + "=" * 60)
+    print("[OK] MIGRACION COMPLETADA")
+    print("=" * 60)
+    return True
+
+if __name__ == "__main__":
+    if not migrate_hot_predicate_indexes():
+        sys.exit(1)
@@ -0,0 +1,63 @@
+"""
+Script de migración para habilitar la búsqueda por trigramas (pg_trgm).
+Crea la extensión y los índices GIN que usa services/device_search.py para
+resolver las búsquedas ILIKE '%texto%' del inventario sin escaneo secuencial.
+Los índices se crean con CONCURRENTLY para no bloquear las tablas en producción.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+
+TRIGRAM_INDEXES = [
+    ("ix_devices_device_type_trgm", "devices", "device_type"),
+    ("ix_devices_serial_number_trgm", "devices", "serial_number"),
+    ("ix_devices_brand_trgm", "devices", "brand"),
+    ("ix_devices_model_trgm", "devices", "model"),
+    ("ix_devices_hostname_trgm", "devices", "hostname"),
+    ("ix_devices_inventory_code_trgm", "devices", "inventory_code"),
+    ("ix_employees_full_name_trgm", "employees", "full_name"),
+    ("ix_employees_dni_trgm", "employees", "dni"),
+]
+
+def migrate_search_trigram_indexes():
+    """
+    1. Crear extensión pg_trgm
+    2. Crear índices GIN (gin_trgm_ops) sobre las columnas de búsqueda
+    """
+    
+    print("=" * 60)
+    print("MIGRACION: Indices de busqueda por trigramas")
+    print("=" * 60)
+    
+    if engine.dialect.name != "postgresql":
+        print("[SKIP] pg_trgm solo aplica a PostgreSQL; la busqueda usara ILIKE")
+        return
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        print("\n[1/2] Habilitando extension pg_trgm...")
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        print("[OK] Extension pg_trgm disponible")
+        
+        print(f"\n[2/2] Creando {len(TRIGRAM_INDEXES)} indices GIN...")
+        for index_name, table, column in TRIGRAM_INDEXES:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            ))
+            print(f"[OK] {index_name}")
+        
+        conn.execute(text("ANALYZE devices"))
+        conn.execute(text("ANALYZE employees"))
+    
+    print("\n" + "=" * 60)
+    print("[OK] MIGRACION COMPLETADA (reiniciar el backend para activar el ranking)")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    migrate_search_trigram_indexes()
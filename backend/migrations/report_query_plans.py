@@ -0,0 +1,175 @@
+"""
+Reporte de planes de consulta de los endpoints más usados.
+Ejecuta EXPLAIN sobre las mismas consultas que arman los endpoints y resume
+cada plan (tipo de nodo + índice/tabla). Sirve para comprobar qué endpoints
+cambian de plan después de aplicar una migración de índices.
+
+Uso:
+    python migrations/report_query_plans.py                      # mostrar planes actuales
+    python migrations/report_query_plans.py --save antes.json    # guardar planes
+    python migrations/report_query_plans.py --compare antes.json # comparar con planes guardados
+"""
+import sys
+import os
+import json
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, func
+from database import SessionLocal, engine
+import models
+
+def _sample_ids(db):
+    """Ids reales para que el planificador vea valores representativos"""
+    employee_id = db.query(func.max(models.Assignment.employee_id)).scalar() or 1
+    device_id = db.query(func.max(models.Assignment.device_id)).scalar() or 1
+    termination_id = db.query(func.max(models.Termination.id)).scalar() or 1
+    sale = db.query(models.Sale).order_by(models.Sale.id.desc()).first()
+    buyer_name = sale.buyer_name if sale else "-"
+    buyer_dni = sale.buyer_dni if sale else "-"
+    location = db.query(models.Employee.location).filter(models.Employee.location != None).limit(1).scalar() or "Callao"
+    return employee_id, device_id, termination_id, buyer_name, buyer_dni, location
+
+def endpoint_queries(db):
+    """Consultas representativas por endpoint (nombre -> Query)"""
+    employee_id, device_id, termination_id, buyer_name, buyer_dni, location = _sample_ids(db)
+    Assignment, Device, Employee = models.Assignment, models.Device, models.Employee
+    assigned = models.DeviceStatus.ASSIGNED.value
+    sold = models.DeviceStatus.SOLD.value
+
+    return {
+        "POST /devices/{id}/return (asignacion abierta del equipo)": db.query(Assignment.id).filter(
+            Assignment.device_id == device_id,
+            Assignment.returned_date == None
+        ),
+        "POST /terminations/ (asignaciones abiertas del empleado)": db.query(Assignment.id).filter(
+            Assignment.employee_id == employee_id,
+            Assignment.returned_date == None
+        ),
+        "GET /terminations/{id}/acta (equipos devueltos en el cese)": db.query(Assignment.id).filter(
+            Assignment.termination_id == termination_id
+        ),
+        "GET /employees/{id} (historial de asignaciones)": db.query(Assignment.id).filter(
+            Assignment.employee_id == employee_id
+        ),
+        "GET /analytics/ (asignados por tipo y sede)": db.query(
+            Device.device_type, func.count(Device.id)
+        ).join(Assignment, Device.id == Assignment.device_id)
+         .join(Employee, Assignment.employee_id == Employee.id)
+         .filter(
+            Device.deleted_at == None,
+            Device.status == assigned,
+            Assignment.returned_date == None,
+            Employee.is_active == True,
+            Employee.location == location
+        ).group_by(Device.device_type),
+        "GET /analytics/ (empleados activos por sede)": db.query(func.count(Employee.id)).filter(
+            Employee.is_active == True,
+            Employee.location == location
+        ),
+        "GET /stats (equipos por estado)": db.query(
+            Device.status, func.count(Device.id)
+        ).filter(
+            Device.deleted_at == None,
+            Device.status != sold
+        ).group_by(Device.status),
+        "GET /alerts/ (stock por tipo)": db.query(func.count(Device.id)).filter(
+            Device.device_type == models.DeviceType.LAPTOP.value,
+            Device.status == models.DeviceStatus.AVAILABLE.value
+        ),
+        "GET /audit-logs/ (ultimos registros)": db.query(models.AuditLog.id)
+            .order_by(models.AuditLog.timestamp.desc()).limit(100),
+        "GET /actas-status/ (ventas por comprador)": db.query(models.Sale.id).filter(
+            models.Sale.buyer_name.in_([buyer_name])
+        ),
+        "GET /sales/{id}/acta (venta por DNI)": db.query(models.Sale.id).filter(
+            models.Sale.buyer_dni == buyer_dni
+        ),
+    }
+
+def _summarize_postgres(plan, nodes):
+    """Aplana un plan JSON de PostgreSQL a 'Nodo [indice] on tabla'"""
+    label = plan.get("Node Type", "?")
+    if plan.get("Index Name"):
+        label += f" [{plan['Index Name']}]"
+    if plan.get("Relation Name"):
+        label += f" on {plan['Relation Name']}"
+    nodes.append(label)
+    for child in plan.get("Plans", []):
+        _summarize_postgres(child, nodes)
+    return nodes
+
+def explain(db, query):
+    """Devuelve el plan resumido (lista de nodos) de una Query"""
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "postgresql":
+        raw = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        return _summarize_postgres(plan[0]["Plan"], [])
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [str(row[0]) for row in db.execute(text(f"EXPLAIN {sql}"))]
+
+def collect_plans():
+    db = SessionLocal()
+    try:
+        return {name: explain(db, query) for name, query in endpoint_queries(db).items()}
+    finally:
+        db.close()
+
+def report_query_plans(save_path=None, compare_path=None):
+    print("=" * 60)
+    print(f"PLANES DE CONSULTA POR ENDPOINT ({engine.dialect.name})")
+    print("=" * 60)
+
+    plans = collect_plans()
+
+    previous = None
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    changed = []
+    for name, nodes in plans.items():
+        if previous is None:
+            print(f"\n{name}")
+            for node in nodes:
+                print(f"    {node}")
+            continue
+
+        before = previous.get(name)
+        if before == nodes:
+            print(f"\n[=] {name}")
+            continue
+
+        changed.append(name)
+        print(f"\n[->] {name}")
+        for node in before or ["(sin plan guardado)"]:
+            print(f"    antes:   {node}")
+        for node in nodes:
+            print(f"    despues: {node}")
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(plans, f, indent=2, ensure_ascii=False)
+        print(f"\n[OK] Planes guardados en {save_path}")
+
+    if previous is not None:
+        print("\n" + "=" * 60)
+        print(f"[OK] {len(changed)} de {len(plans)} endpoints cambiaron de plan")
+        print("=" * 60)
+
+    return changed
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    save_path = args[args.index("--save") + 1] if "--save" in args else None
+    compare_path = args[args.index("--compare") + 1] if "--compare" in args else None
+    try:
+        report_query_plans(save_path=save_path, compare_path=compare_path)
+    except Exception as e:
+        print(f"\n[ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Date, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, Boolean, Date, Enum, Computed, Index, text
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -33,6 +33,18 @@ class DeviceType(str, enum.Enum):
     KEYBOARD_MOUSE_KIT = "kit teclado/mouse"
     HEADPHONES = "auriculares"
 
+# Sort ranks for the default inventory ordering (Active first, Laptop > Monitor ..., Available > Assigned ...)
+# Stored as generated columns on devices so the ORDER BY of the inventory list can be served by an index.
+DEVICE_STATUS_GROUP_RANK_SQL = "CASE WHEN status IN ('available', 'assigned', 'maintenance') THEN 1 ELSE 2 END"
+DEVICE_TYPE_RANK_SQL = (
+    "CASE device_type WHEN 'laptop' THEN 1 WHEN 'monitor' THEN 2 WHEN 'celular' THEN 3 "
+    "WHEN 'kit teclado/mouse' THEN 4 WHEN 'auriculares' THEN 5 WHEN 'mochila' THEN 6 ELSE 100 END"
+)
+DEVICE_STATUS_RANK_SQL = (
+    "CASE status WHEN 'available' THEN 1 WHEN 'assigned' THEN 2 WHEN 'sold' THEN 3 "
+    "WHEN 'retired' THEN 4 ELSE 5 END"
+)
+
 class Employee(Base):
     __tablename__ = "employees"
 
@@ -58,6 +70,9 @@ class Employee(Base):
     assignments = relationship("Assignment", back_populates="employee")
     terminations = relationship("Termination", back_populates="employee")
 
+# Active-employee KPIs filter by is_active and location together (stats, analytics)
+Index("ix_employees_active_location", Employee.is_active, Employee.location)
+
 class Device(Base):
     __tablename__ = "devices"
 
@@ -100,21 +115,58 @@ class Device(Base):
     # Sale relationship
     sale_id = Column(Integer, ForeignKey("sales.id"), nullable=True)
     
+    # Persisted sort ranks (computed by the database from status/device_type)
+    status_group_rank = Column(Integer, Computed(DEVICE_STATUS_GROUP_RANK_SQL, persisted=True), nullable=False)
+    type_rank = Column(Integer, Computed(DEVICE_TYPE_RANK_SQL, persisted=True), nullable=False)
+    status_rank = Column(Integer, Computed(DEVICE_STATUS_RANK_SQL, persisted=True), nullable=False)
+    
     # Current assignment (quick lookup, though history is in Assignment table)
-    # This is optional normalization, but useful for performance
-    # current_assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=True)
+    # Denormalized pointer to the open assignment (returned_date IS NULL) and its employee.
+    # Maintained by crud.set_current_assignment in every flow that opens or closes an assignment;
+    # check/repair with sync_current_assignments.py
+    current_assignment_id = Column(Integer, ForeignKey("assignments.id", use_alter=True, name="fk_devices_current_assignment_id"), nullable=True, index=True)
+    current_employee_id = Column(Integer, ForeignKey("employees.id"), nullable=True, index=True)
 
     assignments = relationship("Assignment", back_populates="device", foreign_keys="Assignment.device_id")
+    current_assignment = relationship("Assignment", foreign_keys=[current_assignment_id], post_update=True)
+    current_employee = relationship("Employee", foreign_keys=[current_employee_id])
     maintenance_logs = relationship("MaintenanceLog", back_populates="device")
     sale = relationship("Sale", back_populates="sold_devices")
     decommissions = relationship("Decommission", back_populates="device")
 
+# Covers the default inventory ordering for the rows the list actually shows
+# (not deleted, chargers excluded), so the first page is an index scan instead of a sort.
+_DEVICE_LIST_WHERE = text("deleted_at IS NULL AND device_type <> 'charger'")
+Index(
+    "ix_devices_default_sort",
+    Device.status_group_rank,
+    Device.type_rank,
+    Device.status_rank,
+    Device.brand,
+    Device.id.desc(),
+    postgresql_where=_DEVICE_LIST_WHERE,
+    sqlite_where=_DEVICE_LIST_WHERE
+)
+
+# Status/type/location breakdowns over non-deleted devices (stats, analytics, export)
+_DEVICE_LIVE_WHERE = text("deleted_at IS NULL")
+Index(
+    "ix_devices_live_status_type_location",
+    Device.status,
+    Device.device_type,
+    Device.location,
+    postgresql_where=_DEVICE_LIVE_WHERE,
+    sqlite_where=_DEVICE_LIVE_WHERE
+)
+# Stock counts by type and status (alerts, sales stats)
+Index("ix_devices_type_status", Device.device_type, Device.status)
+
 class Assignment(Base):
     __tablename__ = "assignments"
 
     id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(Integer, ForeignKey("devices.id"))
-    employee_id = Column(Integer, ForeignKey("employees.id"))
+    device_id = Column(Integer, ForeignKey("devices.id"), index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), index=True)
     assigned_date = Column(DateTime, default=datetime.datetime.utcnow)
     returned_date = Column(DateTime, nullable=True)
     notes = Column(String, nullable=True)  # Notes when assigning
@@ -124,12 +176,27 @@ class Assignment(Base):
     return_observations = Column(String, nullable=True)  # Observations when equipment is returned
     return_acta_computer_path = Column(String, nullable=True)  # Path to computer return acta
     return_acta_mobile_path = Column(String, nullable=True)  # Path to mobile return acta
-    termination_id = Column(Integer, ForeignKey("terminations.id"), nullable=True)  # Link to termination if applicable
+    termination_id = Column(Integer, ForeignKey("terminations.id"), nullable=True, index=True)  # Link to termination if applicable
 
     device = relationship("Device", back_populates="assignments", foreign_keys=[device_id])
     employee = relationship("Employee", back_populates="assignments")
     termination = relationship("Termination", back_populates="returned_assignments")
 
+# Open assignments (returned_date IS NULL) looked up by employee or by device
+_ASSIGNMENT_OPEN_WHERE = text("returned_date IS NULL")
+Index(
+    "ix_assignments_open_employee_id",
+    Assignment.employee_id,
+    postgresql_where=_ASSIGNMENT_OPEN_WHERE,
+    sqlite_where=_ASSIGNMENT_OPEN_WHERE
+)
+Index(
+    "ix_assignments_open_device_id",
+    Assignment.device_id,
+    postgresql_where=_ASSIGNMENT_OPEN_WHERE,
+    sqlite_where=_ASSIGNMENT_OPEN_WHERE
+)
+
 class MaintenanceLog(Base):
     __tablename__ = "maintenance_logs"
 
@@ -174,7 +241,7 @@ class AuditLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # Nullable for system actions or if user deleted
     action = Column(String) # e.g. "DEVICE_ASSIGNED", "LICENSE_CREATED"
     details = Column(String, nullable=True) # JSON string or text
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     
     # Enhanced audit fields for undo/revert functionality
     entity_type = Column(String, nullable=True) # "device", "employee", "assignment"
@@ -231,8 +298,8 @@ class Sale(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     sale_date = Column(DateTime, default=datetime.datetime.utcnow)
-    buyer_name = Column(String, nullable=False)
-    buyer_dni = Column(String, nullable=False)
+    buyer_name = Column(String, nullable=False, index=True)
+    buyer_dni = Column(String, nullable=False, index=True)
     buyer_email = Column(String, nullable=True)
     buyer_phone = Column(String, nullable=True)
     buyer_address = Column(String, nullable=True)
@@ -346,3 +413,29 @@ class SoftwareProfile(Base):
     # Relationships
     created_by = relationship("User", foreign_keys=[created_by_user_id])
 
+
+
+class DataVersion(Base):
+    """
+    Monotonic change counter per table, bumped in a short transaction of its own
+    right after the write commits (see services/data_versions.py). Read endpoints
+    derive their ETag from it.
+    """
+    __tablename__ = "data_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+class StoredFile(Base):
+    """
+    Generated or temporary file on disk (actas, previews, uploads), tracked for
+    size-bounded LRU eviction by services/storage.py.
+    """
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, unique=True, nullable=False)  # Absolute path
+    area = Column(String, nullable=False, index=True)   # Key of services.storage.AREAS
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
@@ -7,137 +7,164 @@ import os
 import io
 from PIL import Image, ExifTags, ImageFilter, ImageOps
 from copy import deepcopy
+from functools import lru_cache
+import re
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from utils import template_cache, acta_cache, image_derivatives
+
+
+W_P = qn('w:p')
+W_R = qn('w:r')
+W_T = qn('w:t')
+XML_SPACE = qn('xml:space')
+# Run content that ends a stretch of text (a placeholder cannot span it)
+RUN_BREAKS = {qn('w:tab'): "\t", qn('w:br'): "\n", qn('w:cr'): "\n"}
+RUN_TEXT_SPECIALS = re.compile(r"[\t\r\n]")
+
+def _trie_pattern(node):
+    """Regex for the keys stored in a character trie (longest alternative first)."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != ""]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Greedy optional: prefer the longer key, fall back to the one ending here
+    return f"(?:{body})?" if "" in node else body
+
+@lru_cache(maxsize=64)
+def build_placeholder_matcher(keys):
+    """
+    Compiled matcher for a set of placeholder keys: the keys are merged into a
+    trie and emitted as one regex, so each position of the text is tested against
+    all keys at once (shared prefixes such as '{{' are compared a single time).
+    """
+    trie = {}
+    for key in keys:
+        if not key:
+            continue
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return re.compile(_trie_pattern(trie)) if trie else None
 
-
-def replace_text_in_paragraph(paragraph, placeholders):
+def _collect_paragraph_pieces(root):
     """
-    Smart replacement for text in a paragraph.
-    1. Tries to replace inside individual runs first (preserves formatting).
-    2. Fallback to aggressive replacement if placeholders remain (split across runs).
+    One walk over an XML tree. Returns, per <w:p> (text boxes included), the list
+    of (w:t element, text) pieces in document order; tabs and breaks become
+    (None, "\t"/"\n") so matches cannot span them.
     """
-    
-    # 1. Try to replace in runs (Preserves formatting)
-    # This handles cases where the placeholder is in a single run (e.g. bolded variable)
-    if paragraph.runs:
-        for run in paragraph.runs:
-            # Check fast against run text
-            if '{' in run.text:
-                for key, value in placeholders.items():
-                    if key in run.text:
-                        # Replace in run, keeping its style
-                        run.text = run.text.replace(key, str(value))
-                        # print(f"DEBUG: Replaced '{key}' in run (conserving format)")
-
-    # 2. Check if we missed any (Split runs case)
-    # If text is still containing placeholders (e.g. "{{VAR" in run1 and "}}" in run2)
-    # we proceed to the aggressive replacement which rewrites the paragraph.
-    full_text = paragraph.text
-    needs_replacement = False
-    for key in placeholders:
-        if key in full_text:
-            needs_replacement = True
-            break
-    
-    if not needs_replacement:
-        return
-    
-    # 3. Fallback: Aggressive replacement (original logic)
-    # Replace all placeholders in the full text
-    new_text = full_text
-    replaced_count = 0
-    for key, value in placeholders.items():
-        if key in new_text:
-            new_text = new_text.replace(key, str(value))
-            replaced_count += 1
-            print(f"DEBUG: Replaced '{key}' with '{value}' in paragraph (aggressive)")
-    
-    # If text changed, clear and recreate
-    if new_text != full_text:
-        # Save formatting from first run if exists
-        bold = False
-        italic = False
-        font_name = None
-        font_size = None
-        
-        if paragraph.runs:
-            first_run = paragraph.runs[0]
-            bold = first_run.bold
-            italic = first_run.italic
-            if first_run.font:
-                font_name = first_run.font.name
-                font_size = first_run.font.size
-        
-        # Clear all runs
-        for run in paragraph.runs:
-            run.text = ""
-        
-        # Add new run with replaced text
-        new_run = paragraph.add_run(new_text)
-        if bold is not None:
-            new_run.bold = bold
-        if italic is not None:
-            new_run.italic = italic
-        if font_name:
-            new_run.font.name = font_name
-        if font_size:
-            new_run.font.size = font_size
-
-
-def replace_text_in_table(table, placeholders):
-    for row in table.rows:
-        for cell in row.cells:
-            for paragraph in cell.paragraphs:
-                replace_text_in_paragraph(paragraph, placeholders)
-            # Recursively handle nested tables
-            for nested_table in cell.tables:
-                replace_text_in_table(nested_table, placeholders)
+    paragraphs = []
+
+    def walk(element, pieces):
+        for child in element:
+            tag = child.tag
+            if tag == W_P:
+                own = []
+                paragraphs.append(own)
+                walk(child, own)
+            elif tag == W_T:
+                if pieces is not None:
+                    pieces.append((child, child.text or ""))
+            elif tag in RUN_BREAKS and element.tag == W_R:
+                if pieces is not None:
+                    pieces.append((None, RUN_BREAKS[tag]))
+            else:
+                walk(child, pieces)
+
+    walk(root, None)
+    return paragraphs
+
+def _set_text_element(t, text):
+    """Write text into a w:t; tabs/newlines become <w:tab/>/<w:br/> siblings in the same run."""
+    chunks = RUN_TEXT_SPECIALS.split(text)
+    separators = RUN_TEXT_SPECIALS.findall(text)
+    t.text = chunks[0]
+    if chunks[0] != chunks[0].strip():
+        t.set(XML_SPACE, 'preserve')
+    anchor = t
+    for separator, chunk in zip(separators, chunks[1:]):
+        special = OxmlElement('w:tab' if separator == "\t" else 'w:br')
+        anchor.addnext(special)
+        anchor = special
+        if chunk:
+            new_t = OxmlElement('w:t')
+            new_t.text = chunk
+            if chunk != chunk.strip():
+                new_t.set(XML_SPACE, 'preserve')
+            anchor.addnext(new_t)
+            anchor = new_t
+
+def _replace_in_pieces(pieces, matcher, values):
+    """Apply all matches of one paragraph. Returns the number of replacements."""
+    text = "".join(piece_text for _, piece_text in pieces)
+    matches = list(matcher.finditer(text))
+    if not matches:
+        return 0
+
+    offsets = []
+    position = 0
+    for _, piece_text in pieces:
+        offsets.append(position)
+        position += len(piece_text)
+
+    new_texts = [piece_text for _, piece_text in pieces]
+    replaced = 0
+    # Right to left, so text before each match is still at its original offsets
+    for match in reversed(matches):
+        start, end = match.span()
+        first = next(i for i in range(len(pieces)) if offsets[i] + len(pieces[i][1]) > start)
+        last = next(i for i in range(first, len(pieces)) if offsets[i] + len(pieces[i][1]) >= end)
+        if any(pieces[i][0] is None for i in range(first, last + 1)):
+            continue
+        value = values[match.group(0)]
+        head = new_texts[first][:start - offsets[first]]
+        if first == last:
+            new_texts[first] = head + value + new_texts[first][end - offsets[first]:]
+        else:
+            # The value goes in the run where the placeholder starts (keeps its format);
+            # the rest of the placeholder is removed from the following runs
+            new_texts[first] = head + value
+            for i in range(first + 1, last):
+                new_texts[i] = ""
+            new_texts[last] = new_texts[last][end - offsets[last]:]
+        replaced += 1
+
+    for (t, old_text), new_text in zip(pieces, new_texts):
+        if t is not None and new_text != old_text:
+            _set_text_element(t, new_text)
+    return replaced
 
 def process_document_placeholders(doc, placeholders):
     """
     Applies placeholder replacement to all parts of a Document:
-    Main body, Headers, Footers, and Tables.
-    Also handles Text Boxes and other complex elements by scanning the XML.
+    Main body (tables, nested tables and text boxes), Headers and Footers.
+    Single XML traversal per part: the text of each paragraph is joined across
+    its runs once, all keys are matched with one precompiled matcher, and each
+    value is written into the run where its placeholder starts, so run
+    formatting is preserved even when Word split the placeholder across runs.
     """
-    # 1. Standard body replacement (maintains formatting where possible)
-    for p in doc.paragraphs:
-        replace_text_in_paragraph(p, placeholders)
-    for t in doc.tables:
-        replace_text_in_table(t, placeholders)
-    
-    # 2. Headers and Footers
-    for section in doc.sections:
-        for p in section.header.paragraphs: replace_text_in_paragraph(p, placeholders)
-        for t in section.header.tables: replace_text_in_table(t, placeholders)
-        for p in section.footer.paragraphs: replace_text_in_paragraph(p, placeholders)
-        for t in section.footer.tables: replace_text_in_table(t, placeholders)
-    
-    # 3. GLOBAL XML REPLACEMENT (Deep Scan for Text Boxes, Shapes, etc.)
-    # This is a fallback but handles things like Text Box content
-    from docx.oxml.ns import qn
-    
-    # We'll look at all <w:t> elements in all parts of the document
-    def scan_xml_elements(parent_element):
-        for t in parent_element.iter(qn('w:t')):
-            if not t.text: continue
-            new_text = t.text
-            is_replaced = False
-            for key, value in placeholders.items():
-                if key in new_text:
-                    new_text = new_text.replace(key, str(value))
-                    is_replaced = True
-            
-            if is_replaced:
-                t.text = new_text
-                # print(f"DEBUG (XML): Replaced in element text: {new_text[:50]}...")
-    
-    # Scan main body XML
-    scan_xml_elements(doc._element)
-    
-    # Scan headers and footers XML
-    for section in doc.sections:
-        scan_xml_elements(section.header._element)
-        scan_xml_elements(section.footer._element)
+    values = {key: str(value) for key, value in placeholders.items() if key}
+    matcher = build_placeholder_matcher(tuple(sorted(values)))
+    if matcher is None:
+        return
 
+    roots = [doc.element.body]
+    for section in doc.sections:
+        roots.append(section.header._element)
+        roots.append(section.footer._element)
+
+    replaced = 0
+    seen = set()
+    for root in roots:
+        # Linked headers/footers are shared between sections
+        if id(root) in seen:
+            continue
+        seen.add(id(root))
+        for pieces in _collect_paragraph_pieces(root):
+            if pieces:
+                replaced += _replace_in_pieces(pieces, matcher, values)
+    print(f"DEBUG: Replaced {replaced} placeholders in a single pass")
 
 def copy_cell_format(source_cell, target_cell):
     """Copy formatting from source cell to target cell"""
@@ -164,8 +191,14 @@ def copy_cell_format(source_cell, target_cell):
 def get_optimized_image(image_path, is_serial=False):
     """
     Carga la imagen optimizada para el documento.
-    Asume que la imagen ya fue procesada en el upload, pero asegura formato compatible.
+    Usa la copia reducida generada en el upload (utils.image_derivatives); si no
+    se puede, recodifica la imagen original.
     """
+    try:
+        return image_derivatives.get_derivative(image_path)
+    except Exception as e:
+        print(f"WARNING: No acta derivative for {image_path}, re-encoding original: {e}")
+
     try:
         img = Image.open(image_path)
         
@@ -259,7 +292,7 @@ def replace_placeholder_with_image(doc, placeholder, image_path, width_inches=2.
     return replaced
 
 
-def insert_devices_table_at_placeholder(doc, devices_info, template=None, placeholder_text='{{TABLA}}'):
+def insert_devices_table_at_placeholder(doc, devices_info, template=None, placeholder_text='{{TABLA}}', compiled=None):
     """
     Busca el placeholder de tabla e inserta una tabla de dispositivos en esa posición.
     
@@ -268,11 +301,12 @@ def insert_devices_table_at_placeholder(doc, devices_info, template=None, placeh
         devices_info: Lista de dispositivos a insertar en la tabla
         template: Objeto DocumentTemplate con mapeo de variables (opcional)
         placeholder_text: Texto del placeholder a buscar como fallback (default: '{{TABLA}}')
+        compiled: CompiledTemplate del documento (opcional); si el placeholder no está
+                  en el template se retorna False sin recorrer el documento
     
     Returns:
         True si se insertó la tabla, False si no se encontró el placeholder
     """
-    import json
     from docx.oxml import OxmlElement
     from docx.oxml.ns import qn
     
@@ -281,11 +315,8 @@ def insert_devices_table_at_placeholder(doc, devices_info, template=None, placeh
     
     if template and template.variables:
         try:
-            # Parsear variables JSON
-            if isinstance(template.variables, str):
-                variables = json.loads(template.variables)
-            else:
-                variables = template.variables
+            # Parsear variables JSON (cacheado por contenido)
+            variables = template_cache.parse_variables(template)
             
             # Variables de tabla que buscamos
             table_variables = [
@@ -331,6 +362,11 @@ def insert_devices_table_at_placeholder(doc, devices_info, template=None, placeh
         f"{{{{ {actual_placeholder.lower()} }}}}",
     ]
     
+    # Ancla de tabla ausente en el template: no hace falta recorrer párrafos ni tablas
+    if compiled is not None and not any(compiled.contains(variant) for variant in placeholder_variants):
+        print(f"DEBUG: Table placeholder not in compiled template. Tried variants: {placeholder_variants}")
+        return False
+    
     # Función recursiva para buscar en tablas anidadas
     def search_in_tables(tables, level=0):
         nonlocal tabla_paragraph, tabla_para_element, tabla_cell
@@ -668,20 +704,15 @@ def build_placeholders_from_template(template, employee_data, devices_info=None)
     Returns:
         Dict de placeholders {placeholder: valor}
     """
-    import json
-    
     placeholders = {}
     
     # Si no hay template o no tiene variables, retornar vacío
     if not template or not template.variables:
         return placeholders
     
-    # Parse variables JSON
+    # Parse variables JSON (cacheado por contenido)
     try:
-        if isinstance(template.variables, str):
-            variables = json.loads(template.variables)
-        else:
-            variables = template.variables
+        variables = template_cache.parse_variables(template)
     except Exception as e:
         print(f"ERROR: Could not parse template variables: {e}")
         return placeholders
@@ -822,28 +853,8 @@ def build_placeholders_from_template(template, employee_data, devices_info=None)
     return placeholders
 
 
-def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: list, employee_dni: str = "", employee_company: str = "", template_path: str = None, template=None, acta_observations: str = None, decommission_data: dict = None):
-    # Generates a PDF for a batch of devices with dynamic table rows.
-    # Uses the provided template_path or defaults to acta_template.docx.
-    # Args:
-    #     decommission_data: Optional dict with decommission-specific data: (fabrication_year, purchase_reason, device_image_path, serial_image_path)
-    # Setup Output
-    filename = f"acta_{assignment_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    output_dir = os.path.join(os.path.dirname(__file__), "generated_pdfs")
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
-
-    # Observaciones por defecto si están vacías
-    if not acta_observations or acta_observations.strip() == "-" or acta_observations.strip() == "":
-        acta_observations = "Entrega de equipos de cómputo y accesorios para el desempeño de funciones laborales."
-    
-    # Load Template
-    is_decommission = decommission_data is not None
-    
-    if template and hasattr(template, 'file_path'):
-        template_path = template.file_path
-        print(f"DEBUG: Using template path from DB object: {template_path}")
-
+def _resolve_batch_template_path(template_path, is_decommission):
+    """Ruta absoluta del template de acta/baja, con los fallbacks por defecto."""
     if template_path:
         # Resolver ruta absoluta siempre para evitar errores de contexto
         if not os.path.isabs(template_path):
@@ -883,7 +894,38 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
         print(f"DEBUG: SUCCESS - Loading template at: {template_path}")
     
     print(f"DEBUG: Final Template Path decided: {template_path}")
-    doc = Document(template_path)
+    return template_path
+
+def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: list, employee_dni: str = "", employee_company: str = "", template_path: str = None, template=None, acta_observations: str = None, decommission_data: dict = None, use_cache: bool = False):
+    # Generates a PDF for a batch of devices with dynamic table rows.
+    # Uses the provided template_path or defaults to acta_template.docx.
+    # Args:
+    #     decommission_data: Optional dict with decommission-specific data: (fabrication_year, purchase_reason, device_image_path, serial_image_path)
+    #     use_cache: Return a shared cached render when the inputs are unchanged (see utils.acta_cache); the path must not be moved or deleted
+    # Setup Output
+    filename = f"acta_{assignment_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+    output_dir = os.path.join(os.path.dirname(__file__), "generated_pdfs")
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, filename)
+
+    # Observaciones por defecto si están vacías
+    if not acta_observations or acta_observations.strip() == "-" or acta_observations.strip() == "":
+        acta_observations = "Entrega de equipos de cómputo y accesorios para el desempeño de funciones laborales."
+    
+    # Load Template
+    is_decommission = decommission_data is not None
+    
+    if template and hasattr(template, 'file_path'):
+        template_path = template.file_path
+        print(f"DEBUG: Using template path from DB object: {template_path}")
+
+    # Plantilla compilada (cacheada por id/ruta y revalidada por mtime del archivo)
+    compiled = template_cache.get_compiled(
+        template_path,
+        lambda path: _resolve_batch_template_path(path, is_decommission),
+        template_id=getattr(template, 'id', None),
+        kind='baja' if is_decommission else 'batch'
+    )
     date_str = get_spanish_date()
     
     print(f"DEBUG: Preparing placeholders. Template object present: {template is not None}")
@@ -971,6 +1013,40 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
             "{{ USUARIO }}": name_upper
         }
     
+    print(f"DEBUG: Preparing placeholders for {name_upper} (DNI: {dni_str})")
+    
+    # Add prefixed variables for computer devices
+    for dev in devices_info:
+        dtype = (dev.get('type', '') or '').upper()
+        # Primary variants - use 'or ""' to handle None values
+        placeholders[f"{{{{SERIE_{dtype}}}}}"] = (dev.get('serial', '') or '').upper()
+        placeholders[f"{{{{MARCA_{dtype}}}}}"] = (dev.get('brand', '') or '').upper()
+        placeholders[f"{{{{MODELO_{dtype}}}}}"] = (dev.get('model', '') or '').upper()
+        placeholders[f"{{{{HOSTNAME_{dtype}}}}}"] = (dev.get('hostname', '') or '').upper()
+        # Variants with spaces
+        placeholders[f"{{{{ SERIE_{dtype} }}}}"] = (dev.get('serial', '') or '').upper()
+        placeholders[f"{{{{ MARCA_{dtype} }}}}"] = (dev.get('brand', '') or '').upper()
+        placeholders[f"{{{{ MODELO_{dtype} }}}}"] = (dev.get('model', '') or '').upper()
+        placeholders[f"{{{{ HOSTNAME_{dtype} }}}}"] = (dev.get('hostname', '') or '').upper()
+    
+    print(f"DEBUG: Final placeholders count: {len(placeholders)}")
+
+    # === RENDER CACHE ===
+    # Mismo template y mismos valores => mismo documento (las bajas llevan imágenes: sin caché)
+    cache_key = None
+    if use_cache and not is_decommission:
+        cache_key = acta_cache.render_key(
+            'batch', compiled.digest, placeholders, devices_info, acta_observations, date_str, t_type,
+            template_cache.parse_variables(template)
+        )
+        cached_path = acta_cache.get(cache_key)
+        if cached_path:
+            print(f"DEBUG: Acta served from render cache: {cached_path}")
+            return cached_path
+        filepath = acta_cache.temp_path(cache_key)
+
+    doc = compiled.new_document()
+
     # === PROCESS IMAGES ===
     # Check for image variables in template mapping
     device_image_placeholder = 'DEVICE_IMAGE_PATH' # Fallback
@@ -979,8 +1055,7 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
     # Si tenemos un template con mapeo, buscar los nombres de los placeholders reales
     if template and template.variables:
         try:
-            import json
-            mapping = json.loads(template.variables) if isinstance(template.variables, str) else template.variables
+            mapping = template_cache.parse_variables(template)
             for var in mapping:
                 if var.get('map_to') == 'DEVICE_IMAGE_PATH':
                     device_image_placeholder = var.get('name')
@@ -1021,30 +1096,12 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
         print(f"DEBUG: Replacing {serial_image_placeholder} with {final_serial_img}")
         replace_placeholder_with_image(doc, serial_image_placeholder, final_serial_img)
 
-    
-    print(f"DEBUG: Preparing placeholders for {name_upper} (DNI: {dni_str})")
-    
-    # Add prefixed variables for computer devices
-    for dev in devices_info:
-        dtype = (dev.get('type', '') or '').upper()
-        # Primary variants - use 'or ""' to handle None values
-        placeholders[f"{{{{SERIE_{dtype}}}}}"] = (dev.get('serial', '') or '').upper()
-        placeholders[f"{{{{MARCA_{dtype}}}}}"] = (dev.get('brand', '') or '').upper()
-        placeholders[f"{{{{MODELO_{dtype}}}}}"] = (dev.get('model', '') or '').upper()
-        placeholders[f"{{{{HOSTNAME_{dtype}}}}}"] = (dev.get('hostname', '') or '').upper()
-        # Variants with spaces
-        placeholders[f"{{{{ SERIE_{dtype} }}}}"] = (dev.get('serial', '') or '').upper()
-        placeholders[f"{{{{ MARCA_{dtype} }}}}"] = (dev.get('brand', '') or '').upper()
-        placeholders[f"{{{{ MODELO_{dtype} }}}}"] = (dev.get('model', '') or '').upper()
-        placeholders[f"{{{{ HOSTNAME_{dtype} }}}}"] = (dev.get('hostname', '') or '').upper()
-    
-    print(f"DEBUG: Final placeholders count: {len(placeholders)}")
 
     # === TRY TO INSERT TABLE AT PLACEHOLDER FIRST (BEFORE REPLACING OTHER PLACEHOLDERS) ===
     # Skip table insertion for Decommission (Baja) reports as per user request
     tabla_inserted = False
     if not is_decommission:
-        tabla_inserted = insert_devices_table_at_placeholder(doc, devices_info, template=template)
+        tabla_inserted = insert_devices_table_at_placeholder(doc, devices_info, template=template, compiled=compiled)
 
     
     if tabla_inserted:
@@ -1053,14 +1110,15 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
         print("DEBUG: Table NOT inserted (placeholder not found or error)")
     
     # === REPLACE ALL OTHER PLACEHOLDERS ===
-    process_document_placeholders(doc, placeholders)
+    # Solo los placeholders que existen en el template (el resto no puede coincidir)
+    process_document_placeholders(doc, compiled.used_placeholders(placeholders))
     
     if tabla_inserted or is_decommission:
         # Si se insertó la tabla o es una baja (que usa placeholders individuales), guardar y retornar
         # No queremos ejecutar la lógica legada de asignaciones en una baja.
         print(f"DEBUG: Saving and returning {('DECOMMISSION' if is_decommission else 'TABLE')} document.")
         doc.save(filepath)
-        return filepath
+        return acta_cache.store(cache_key, filepath) if cache_key else filepath
 
     # === LEGACY/FIXED TABLE LOGIC ===
     # Get main table for signature section
@@ -1299,24 +1357,13 @@ def generate_batch_acta(assignment_id: int, employee_name: str, devices_info: li
         print("DEBUG: Could not find devices table in template")
 
     doc.save(filepath)
-    return filepath
-
+    return acta_cache.store(cache_key, filepath) if cache_key else filepath
 
 
 
-def generate_mobile_acta(assignment_id: int, employee_name: str, devices_info: list, employee_dni: str = "", employee_company: str = "", template_path: str = None, template=None, acta_observations: str = None):
-    # Generates acta for mobile devices using provided or default mobile template.
-    # Setup Output
-    filename = f"acta_celular_{assignment_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    output_dir = os.path.join(os.path.dirname(__file__), "generated_pdfs")
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
 
-    # Observaciones por defecto si están vacías
-    if not acta_observations or acta_observations.strip() == "-" or acta_observations.strip() == "":
-        acta_observations = "Entrega de equipos de comunicación y accesorios para el desempeño de funciones laborales."
-
-    # Load Mobile Template
+def _resolve_mobile_template_path(template_path):
+    """Ruta absoluta del template de acta de celular, con el fallback por defecto."""
     if template_path:
         # Si la ruta no es absoluta, resolverla relativa al directorio backend
         if not os.path.isabs(template_path):
@@ -1336,7 +1383,28 @@ def generate_mobile_acta(assignment_id: int, employee_name: str, devices_info: l
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Mobile template not found at {template_path}")
     
-    doc = Document(template_path)
+    return template_path
+
+def generate_mobile_acta(assignment_id: int, employee_name: str, devices_info: list, employee_dni: str = "", employee_company: str = "", template_path: str = None, template=None, acta_observations: str = None, use_cache: bool = False):
+    # Generates acta for mobile devices using provided or default mobile template.
+    # use_cache: see generate_batch_acta
+    # Setup Output
+    filename = f"acta_celular_{assignment_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+    output_dir = os.path.join(os.path.dirname(__file__), "generated_pdfs")
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, filename)
+
+    # Observaciones por defecto si están vacías
+    if not acta_observations or acta_observations.strip() == "-" or acta_observations.strip() == "":
+        acta_observations = "Entrega de equipos de comunicación y accesorios para el desempeño de funciones laborales."
+
+    # Load Mobile Template (compilado y cacheado)
+    compiled = template_cache.get_compiled(
+        template_path,
+        _resolve_mobile_template_path,
+        template_id=getattr(template, 'id', None),
+        kind='mobile'
+    )
     date_str = get_spanish_date()
 
     # Prepare placeholders
@@ -1415,8 +1483,23 @@ def generate_mobile_acta(assignment_id: int, employee_name: str, devices_info: l
         placeholders[f"{{{{MODELO_{dtype}}}}}"] = dev.get('model', '').upper()
         placeholders[f"{{{{IMEI_{dtype}}}}}"] = dev.get('imei', '').upper()
 
+    # === RENDER CACHE ===
+    cache_key = None
+    if use_cache:
+        cache_key = acta_cache.render_key(
+            'mobile', compiled.digest, placeholders, devices_info, date_str,
+            template_cache.parse_variables(template)
+        )
+        cached_path = acta_cache.get(cache_key)
+        if cached_path:
+            print(f"DEBUG: Acta served from render cache: {cached_path}")
+            return cached_path
+        filepath = acta_cache.temp_path(cache_key)
+
+    doc = compiled.new_document()
+
     # === REPLACE IN ALL DOCUMENT PARTS ===
-    process_document_placeholders(doc, placeholders)
+    process_document_placeholders(doc, compiled.used_placeholders(placeholders))
     
     # Find devices table
     def find_devices_table(tables):
@@ -1493,7 +1576,7 @@ def generate_mobile_acta(assignment_id: int, employee_name: str, devices_info: l
                         p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
     doc.save(filepath)
-    return filepath
+    return acta_cache.store(cache_key, filepath) if cache_key else filepath
 
 
 from utils import doc_utils
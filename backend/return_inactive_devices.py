@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import engine
+from services.data_versions import bump_versions
 from sqlalchemy import text
 
 def return_inactive_employee_devices():
@@ -75,13 +76,16 @@ def return_inactive_employee_devices():
                     WHERE id = :assignment_id
                 """), {"assignment_id": assignment_id})
                 
-                # Cambiar estado del dispositivo a available
+                # Cambiar estado del dispositivo a available y limpiar el poseedor actual
                 conn.execute(text("""
                     UPDATE devices 
-                    SET status = 'available' 
+                    SET status = 'available', current_assignment_id = NULL, current_employee_id = NULL 
                     WHERE id = :device_id
                 """), {"device_id": device_id})
                 
+                # Raw SQL bypasses the ORM hooks: invalidate ETags of /devices/, /employees/...
+                bump_versions(conn, ["assignments", "devices"])
+                
                 conn.commit()
                 
                 print(f"OK Devuelto: {device_type} de {empleado}")
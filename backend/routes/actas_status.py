@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import Annotated, List, Optional
 from datetime import datetime, timedelta
-import database, models
+import database, models, auth
+from services import bulk_actas
+from utils import pdf_render
 
 router = APIRouter()
 
@@ -22,10 +25,16 @@ def get_actas_status(
     
     # 1. OPTIMIZED: Get all active employees with eager loaded assignments and devices
     # This avoids N+1 queries for assignments and looking up devices
+    # Only employees currently holding a device can have assignment actas (see the
+    # "if not active_assignments: continue" below), so pre-filter on the device pointer
+    current_holders = db.query(models.Device.current_employee_id).filter(
+        models.Device.current_employee_id != None
+    )
     active_employees = db.query(models.Employee).options(
         joinedload(models.Employee.assignments).joinedload(models.Assignment.device)
     ).filter(
-        models.Employee.is_active == True
+        models.Employee.is_active == True,
+        models.Employee.id.in_(current_holders)
     ).all()
     
     # 2. OPTIMIZED: Pre-fetch all relevant sales
@@ -341,3 +350,38 @@ def get_actas_status(
                            (terminations_total - terminations_signed)
         }
     }
+
+@router.get("/actas-status/bulk-download")
+def bulk_download_actas(
+    location: Optional[str] = None,
+    pending_only: bool = True,
+    acta_type: Optional[str] = None,  # 'computer', 'mobile' or both when omitted
+    search: Optional[str] = None,
+    output_format: Annotated[str, Query(alias="format")] = "docx",  # 'docx' or 'pdf' (converted in the render processes)
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    Generate the assignment actas (computer / mobile) of every employee matching
+    the filter and download them as one ZIP. Renders run in parallel in a process
+    pool and each acta is streamed into the ZIP as soon as it is ready.
+    """
+    if acta_type and acta_type not in bulk_actas.ACTA_TYPES:
+        raise HTTPException(status_code=400, detail=f"acta_type must be one of: {', '.join(bulk_actas.ACTA_TYPES)}")
+    output_format = pdf_render.check_format(output_format)
+
+    actas = bulk_actas.select_actas(db, location=location, pending_only=pending_only, acta_type=acta_type, search=search)
+    if not actas:
+        raise HTTPException(status_code=404, detail="No actas match the filter")
+
+    print(f"DEBUG: Bulk acta download by {current_user.username}: {len(actas)} actas")
+    zip_filename = f"ACTAS{' PENDIENTES' if pending_only else ''} - {datetime.now().strftime('%d-%m-%Y')}.zip"
+    return StreamingResponse(
+        bulk_actas.stream_actas_zip(actas, output_format=output_format),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{zip_filename}"',
+            "Cache-Control": "no-cache",
+            "X-Actas-Count": str(len(actas))
+        }
+    )
@@ -5,10 +5,12 @@ from models import Device, Employee, Assignment, DeviceStatus, DeviceType
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from sqlalchemy import func
+from services import data_versions
 
 router = APIRouter(prefix="/alerts")
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/", response_model=List[Dict[str, Any]],
+            dependencies=[Depends(data_versions.etag_guard("devices", "employees"))])
 def get_alerts(db: Session = Depends(get_db)):
     alerts = []
     
@@ -47,17 +49,17 @@ def get_alerts(db: Session = Depends(get_db)):
     # We find duplicate assignments first
     from sqlalchemy.orm import aliased
     
-    # Subquery for laptop counts
+    # Laptop counts per current holder (denormalized pointer on devices)
     laptop_counts = db.query(
-        Assignment.employee_id, func.count(Assignment.id).label('count')
-    ).join(Device).filter(
+        Device.current_employee_id, func.count(Device.id).label('count')
+    ).filter(
         Device.device_type == 'laptop',
-        Assignment.returned_date == None
-    ).group_by(Assignment.employee_id).having(func.count(Assignment.id) > 1).all()
+        Device.current_employee_id != None
+    ).group_by(Device.current_employee_id).having(func.count(Device.id) > 1).all()
     
     if laptop_counts:
         # Get all affected employee IDs
-        emp_ids = [r.employee_id for r in laptop_counts]
+        emp_ids = [r.current_employee_id for r in laptop_counts]
         # Bulk fetch employees
         employees_map = {
             e.id: e for e in db.query(Employee).filter(Employee.id.in_(emp_ids)).all()
@@ -77,30 +79,26 @@ def get_alerts(db: Session = Depends(get_db)):
 
     # --- 3. COMPLIANCE ALERTS (Optimized) ---
     
-    # Optimized: Eager load assignments and devices to avoid N+1 loop
-    from sqlalchemy.orm import joinedload
+    # Optimized: one query for the employees currently holding laptops/headphones
+    # (denormalized pointer on devices) instead of loading every assignment
+    holdings = db.query(
+        Device.current_employee_id, Device.device_type
+    ).filter(
+        Device.current_employee_id != None,
+        Device.device_type.in_(['laptop', 'auriculares', 'headset'])
+    ).distinct().all()
+    
+    laptop_holders = {emp_id for emp_id, dtype in holdings if dtype == 'laptop'}
+    headphone_holders = {emp_id for emp_id, dtype in holdings if dtype in ['auriculares', 'headset']}
     
     # Filter only active employees to reduce set
-    active_employees = db.query(Employee).options(
-        joinedload(Employee.assignments).joinedload(Assignment.device)
-    ).filter(
+    active_employees = db.query(Employee).filter(
         Employee.is_active == True
     ).all()
     
     for emp in active_employees:
-        # In-memory checks (fast because data is preloaded)
-        has_laptop = False
-        has_headphones = False
-        
-        active_assignments = [a for a in emp.assignments if a.returned_date is None]
-        
-        for a in active_assignments:
-            if not a.device:
-                continue
-            if a.device.device_type == 'laptop':
-                has_laptop = True
-            elif a.device.device_type in ['auriculares', 'headset']:
-                has_headphones = True
+        has_laptop = emp.id in laptop_holders
+        has_headphones = emp.id in headphone_holders
         
         if not has_laptop:
              alerts.append({
@@ -1,39 +1,34 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 import database, models
+from services import shared_cache, data_versions
 
 router = APIRouter()
 
-# Simple in-memory cache (5 minutes TTL) - now supports multiple locations
-_analytics_cache = {}
-
 def get_cached_analytics(db: Session, location: Optional[str] = None):
     """
     Get analytics with caching to avoid recalculating frequently.
-    Cache expires after 5 minutes.
+    Entries are shared across workers (see services/shared_cache.py), expire after
+    CACHE_TTL_SECONDS and are invalidated by the inventory/assignment/termination/
+    sale/decommission write routes.
     Separate cache entries for each location.
     """
-    now = datetime.now()
+    cache = shared_cache.get_cache()
     cache_key = location if location else "all"
     
     # Check if cache is valid for this location
-    if (cache_key in _analytics_cache and 
-        _analytics_cache[cache_key]["data"] is not None and 
-        _analytics_cache[cache_key]["timestamp"] is not None and 
-        now - _analytics_cache[cache_key]["timestamp"] < timedelta(minutes=5)):
-        return _analytics_cache[cache_key]["data"]
+    analytics = cache.get(shared_cache.ANALYTICS_NAMESPACE, cache_key)
+    if analytics is not None:
+        return analytics
     
     # Calculate analytics using aggregated queries
     analytics = calculate_analytics(db, location)
     
     # Update cache for this location
-    _analytics_cache[cache_key] = {
-        "data": analytics,
-        "timestamp": now
-    }
+    cache.set(shared_cache.ANALYTICS_NAMESPACE, cache_key, analytics)
     
     return analytics
 
@@ -204,18 +199,18 @@ def calculate_analytics(db: Session, location: str = None):
         
         # Cache metadata
         "cached_at": datetime.now().isoformat(),
-        "cache_expires_in_seconds": 300,  # 5 minutes
+        "cache_expires_in_seconds": shared_cache.CACHE_TTL_SECONDS,
         "filtered_by_location": location if location else "all"
     }
 
-@router.get("/analytics/")
+@router.get("/analytics/", dependencies=[Depends(data_versions.etag_guard("devices", "assignments", "employees"))])
 def get_analytics(
     location: Optional[str] = Query(None, description="Filter analytics by location (e.g., 'Callao', 'Lima')"),
     db: Session = Depends(database.get_db)
 ):
     """
     Get analytics dashboard data with caching.
-    Results are cached for 5 minutes to improve performance.
+    Results are cached (5 minutes by default) and refreshed after writes.
     
     Args:
         location: Optional location filter
@@ -229,6 +224,5 @@ def refresh_analytics_cache(db: Session = Depends(database.get_db)):
     Force refresh the analytics cache for all locations.
     Useful after bulk operations.
     """
-    global _analytics_cache
-    _analytics_cache = {}
+    shared_cache.invalidate(shared_cache.ANALYTICS_NAMESPACE)
     return get_cached_analytics(db)
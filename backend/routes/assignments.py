@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from typing import List, Annotated
 from sqlalchemy.orm import Session
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import database, schemas, crud, pdf_generator
 import models
-from services import audit, email
+from services import audit, email, shared_cache
 import auth
 import os
+from utils import zip_stream, pdf_render
 
 router = APIRouter()
 
@@ -99,6 +100,9 @@ def assign_device_batch(batch: schemas.AssignmentBatchCreate, db: Session = Depe
         
         db.commit()
         print("DEBUG: Batch assignment committed successfully")
+
+        # Assignments changed: drop cached /analytics/ in every worker
+        shared_cache.invalidate()
         
         return created_assignments
     except Exception as e:
@@ -158,6 +162,8 @@ def assign_device(assignment: schemas.AssignmentCreate, background_tasks: Backgr
     if db_assignment.employee.email:
          email.send_assignment_notification(db_assignment.employee.full_name, db_assignment.employee.email, db_assignment.device.model, db_assignment.device.serial_number)
 
+    shared_cache.invalidate()
+
     return db_assignment
 
 @router.post("/return/{device_id}")
@@ -165,30 +171,20 @@ def return_device(device_id: int, db: Session = Depends(database.get_db)):
     device = crud.return_device(db, device_id)
     if not device:
         raise HTTPException(status_code=400, detail="Device not assigned or not found")
+    shared_cache.invalidate()
     return {"status": "returned", "device_serial": device.serial_number}
 
-@router.get("/assignments/{assignment_id}/pdf")
-@router.get("/assignments/{assignment_id}/acta")  # Alternative endpoint
-@router.get("/assignments/{assignment_id}/download-acta") # Explicit endpoint requested by frontend
-def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
-    print(f"DEBUG: get_acta_pdf called for assignment {assignment_id}")
-    import zipfile
-    from io import BytesIO
-    from fastapi.responses import StreamingResponse
+ACTA_TYPES = ("computer", "mobile")
+
+def render_assignment_actas(db: Session, assignment: models.Assignment, acta_types=ACTA_TYPES):
+    """
+    Render the delivery actas of the employee behind `assignment` (all their active
+    assignments). Returns [(docx path, download filename)], one per requested type
+    ("computer", "mobile") that the employee actually has devices for.
+    The paths are shared render-cache entries (utils.acta_cache): don't move or delete them.
+    """
     from datetime import datetime
-    
-    # Get assignment
-    assignment = db.query(models.Assignment).filter(models.Assignment.id == assignment_id).first()
-    
-    if not assignment:
-        raise HTTPException(status_code=404, detail="Assignment not found")
-    
-    # Reload relationships
-    db.refresh(assignment)
-    
-    if not assignment.employee or not assignment.device:
-        raise HTTPException(status_code=400, detail="Assignment missing employee or device data")
-    
+
     # Get ALL active assignments for this employee
     employee_id = assignment.employee_id
     all_assignments = db.query(models.Assignment).filter(
@@ -220,6 +216,10 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
     
     # Categorize devices
     computer_devices, mobile_devices = pdf_generator.categorize_devices(devices_info)
+    if "computer" not in acta_types:
+        computer_devices = []
+    if "mobile" not in acta_types:
+        mobile_devices = []
     
     print(f"DEBUG: Computer devices: {len(computer_devices)}, Mobile devices: {len(mobile_devices)}")
     
@@ -228,13 +228,13 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
         models.DocumentTemplate.template_type == "ASSIGNMENT_COMPUTER",
         models.DocumentTemplate.is_default == True,
         models.DocumentTemplate.is_active == True
-    ).first()
+    ).first() if computer_devices else None
     
     mobile_template = db.query(models.DocumentTemplate).filter(
         models.DocumentTemplate.template_type == "ASSIGNMENT_MOBILE",
         models.DocumentTemplate.is_default == True,
         models.DocumentTemplate.is_active == True
-    ).first()
+    ).first() if mobile_devices else None
     
     comp_template_path = comp_template.file_path if comp_template else None
     mobile_template_path = mobile_template.file_path if mobile_template else None
@@ -246,8 +246,7 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
     employee_company = assignment.employee.company or "TRANSTOTAL AGENCIA MARITIMA S.A."
     
     # Date for filename
-    now = datetime.now()
-    date_str = now.strftime("%d-%m-%Y")
+    date_str = datetime.now().strftime("%d-%m-%Y")
     
     generated_files = []
     
@@ -262,7 +261,8 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
             employee_company, # Usar company aquí
             template_path=comp_template_path,
             template=comp_template,
-            acta_observations=assignment.notes
+            acta_observations=assignment.notes,
+            use_cache=True
         )
         computer_filename = f"ACTA DE ENTREGA EQUIPO COMPUTO - {employee_name.upper()} - {date_str}.docx"
         generated_files.append((computer_acta_path, computer_filename))
@@ -278,14 +278,25 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
             employee_company, # Usar company aquí
             template_path=mobile_template_path,
             template=mobile_template,
-            acta_observations=assignment.notes
+            acta_observations=assignment.notes,
+            use_cache=True
         )
         mobile_filename = f"ACTA DE ENTREGA DE CELULAR - {employee_name.upper()} - {date_str}.docx"
         generated_files.append((mobile_acta_path, mobile_filename))
     
-    # If no devices, error
-    if not generated_files:
-        raise HTTPException(status_code=400, detail="No devices found for this employee")
+    return generated_files
+
+@router.get("/assignments/{assignment_id}/pdf")
+@router.get("/assignments/{assignment_id}/acta")  # Alternative endpoint
+@router.get("/assignments/{assignment_id}/download-acta") # Explicit endpoint requested by frontend
+def get_acta_pdf(
+    assignment_id: int,
+    db: Session = Depends(database.get_db),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
+):
+    print(f"DEBUG: get_acta_pdf called for assignment {assignment_id}")
+    output_format = pdf_render.check_format(output_format)
+    generated_files, zip_filename = assignment_acta_files(db, assignment_id, output_format)
     
     # If only one type, return single file
     if len(generated_files) == 1:
@@ -293,52 +304,63 @@ def get_acta_pdf(assignment_id: int, db: Session = Depends(database.get_db)):
         return FileResponse(
             path=file_path,
             filename=filename,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            media_type=pdf_render.PDF_MEDIA_TYPE if output_format == "pdf" else pdf_render.DOCX_MEDIA_TYPE,
             headers={
                 "Content-Disposition": f'attachment; filename="{filename}"',
                 "Cache-Control": "no-cache"
             }
         )
     
-    # If both types, create ZIP
-    print("DEBUG: Creating ZIP with both actas")
+    # If both types, stream a ZIP built on the fly (nothing staged in generated_pdfs)
+    print("DEBUG: Streaming ZIP with both actas")
+    return StreamingResponse(
+        zip_stream.stream_files(generated_files),
+        media_type='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{zip_filename}"',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
+def assignment_acta_files(db: Session, assignment_id: int, output_format: str = "docx"):
+    """
+    Render the actas of an assignment for download (GET /assignments/{id}/acta and
+    the assignment_acta background job). Returns ([(path, filename)], zip filename);
+    with more than one file the caller bundles them with utils.zip_stream.
+    """
+    from datetime import datetime
     
-    # Save ZIP to disk instead of streaming
-    zip_filename = f"ACTAS - {employee_name.upper()} - {date_str}.zip"
-    # Get the backend directory (parent of routes)
-    backend_dir = os.path.dirname(os.path.dirname(__file__))
-    output_dir = os.path.join(backend_dir, "generated_pdfs")
-    os.makedirs(output_dir, exist_ok=True)  # Ensure directory exists
-    zip_path = os.path.join(output_dir, f"actas_{assignment.id}_{now.strftime('%Y%m%d_%H%M%S')}.zip")
+    # Get assignment
+    assignment = db.query(models.Assignment).filter(models.Assignment.id == assignment_id).first()
     
-    try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for file_path, filename in generated_files:
-                # Verify file exists
-                if not os.path.exists(file_path):
-                    print(f"ERROR: File not found: {file_path}")
-                    raise HTTPException(status_code=500, detail=f"Generated file not found: {filename}")
-                
-                print(f"DEBUG: Adding to ZIP: {filename} from {file_path}")
-                # Add file to ZIP with custom name
-                zip_file.write(file_path, arcname=filename)
-        
-        print(f"DEBUG: ZIP saved to: {zip_path}")
-        
-        return FileResponse(
-            path=zip_path,
-            filename=zip_filename,
-            media_type='application/zip',
-            headers={
-                'Content-Disposition': f'attachment; filename="{zip_filename}"',
-                'Cache-Control': 'no-cache'
-            }
-        )
-    except Exception as e:
-        print(f"ERROR creating ZIP: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error creating ZIP: {str(e)}")
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    
+    # Reload relationships
+    db.refresh(assignment)
+    
+    if not assignment.employee or not assignment.device:
+        raise HTTPException(status_code=400, detail="Assignment missing employee or device data")
+    
+    generated_files = render_assignment_actas(db, assignment)
+    
+    employee_name = assignment.employee.full_name
+    date_str = datetime.now().strftime("%d-%m-%Y")
+    
+    # If no devices, error
+    if not generated_files:
+        raise HTTPException(status_code=400, detail="No devices found for this employee")
+    
+    if output_format == "pdf":
+        generated_files = [(pdf_render.ensure_pdf(path), pdf_render.pdf_filename(filename)) for path, filename in generated_files]
+    
+    for file_path, filename in generated_files:
+        # Verify file exists (a streamed response can't become an error once it started)
+        if not os.path.exists(file_path):
+            print(f"ERROR: File not found: {file_path}")
+            raise HTTPException(status_code=500, detail=f"Generated file not found: {filename}")
+    
+    return generated_files, f"ACTAS - {employee_name.upper()} - {date_str}.zip"
 
 # GET all assignments
 @router.get("/assignments/", response_model=List[schemas.AssignmentWithDevice])
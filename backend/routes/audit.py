@@ -4,7 +4,8 @@ from database import get_db
 from typing import List, Optional
 import json
 from datetime import datetime
-import auth
+import auth, crud
+from services import shared_cache
 from models import AuditLog, User, Device, Employee, Assignment
 
 router = APIRouter(prefix="/audit-logs")
@@ -136,9 +137,17 @@ def revert_audit_log(
 
     # Restore state
     for key, value in previous_state.items():
-        if hasattr(entity, key) and key not in ['id', 'created_at', 'updated_at', 'metadata']: 
+        # current_assignment_id/current_employee_id are maintained by the assignment flows, never restored
+        if hasattr(entity, key) and key not in ['id', 'created_at', 'updated_at', 'metadata', 'current_assignment_id', 'current_employee_id']: 
              setattr(entity, key, value)
     
+    # Restoring an assignment can reopen or close it; keep the device's current holder in sync
+    if isinstance(entity, Assignment) and entity.device:
+        if entity.returned_date is None:
+            crud.set_current_assignment(entity.device, entity)
+        elif entity.device.current_assignment_id == entity.id:
+            crud.set_current_assignment(entity.device, None)
+    
     # Update log status
     log.reverted_at = datetime.utcnow()
     log.reverted_by_user_id = current_user.id
@@ -149,4 +158,5 @@ def revert_audit_log(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to revert: {str(e)}")
 
+    shared_cache.invalidate()
     return {"message": "Action reverted successfully"}
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Annotated
 from database import get_db
 import models, schemas, crud
+from services import shared_cache, image_pipeline
 from auth import get_current_user
+from utils import pdf_render, image_derivatives
 
 router = APIRouter()
 
@@ -103,6 +108,9 @@ def create_decommission(
     except Exception as e:
         print(f"Error generating Decommission PDF: {e}")
         # Don't fail the transaction, just log error. PDF can be regenerated manually if feature added.
+
+    # Retired device: drop cached /analytics/ in every worker
+    shared_cache.invalidate()
     
     return new_decommission
 
@@ -120,13 +128,14 @@ def read_decommissions(
 def download_decommission_acta(
     decommission_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
 ):
     """
-    Download the decommission acta (DOCX file)
+    Download the decommission acta (DOCX file, or PDF with ?format=pdf)
     """
-    from fastapi.responses import FileResponse
     import os
+    pdf_render.check_format(output_format)
     
     # Get decommission record
     decommission = db.query(models.Decommission).filter(models.Decommission.id == decommission_id).first()
@@ -146,22 +155,23 @@ def download_decommission_acta(
     print(f"DEBUG: Serving download for Decommission {decommission_id}: {decommission.acta_path}")
     print(f"DEBUG: File size: {os.path.getsize(decommission.acta_path)} bytes")
     
-    return FileResponse(
-        path=decommission.acta_path,
-        filename=filename,
-        media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    )
+    return pdf_render.acta_response(decommission.acta_path, filename, output_format)
+
+DECOMMISSION_UPLOAD_DIR = "uploads/decommission"
 
 @router.post("/upload-image")
 async def upload_decommission_image(
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    wait: bool = True
 ):
     """
     Sube una imagen relacionada con la baja (equipo o serie).
     Retorna la ruta relativa del archivo guardado.
+    El procesamiento corre en el pool de imágenes (services.image_pipeline), fuera del event loop.
+    Con wait=false responde 202 de inmediato con un job_id para consultar
+    GET /decommission/upload-image/jobs/{job_id}. Si la cola está llena responde 429 con Retry-After.
     """
     import os
-    import shutil
     import uuid
     
     # Validar extensión
@@ -169,26 +179,179 @@ async def upload_decommission_image(
         raise HTTPException(status_code=400, detail="Solo se permiten imágenes (png, jpg, jpeg, webp)")
     
     # Directorio de uploads para bajas
-    UPLOAD_DIR = "uploads/decommission"
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(DECOMMISSION_UPLOAD_DIR, exist_ok=True)
     
     # Generar nombre único
     file_ext = os.path.splitext(file.filename)[1]
     filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    file_path = os.path.join(DECOMMISSION_UPLOAD_DIR, filename)
     
+    # Read file content
+    content = await file.read()
+
+    # Process and save using utility logic (Smart Crop, EXIF Rotate) in a worker process
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Process and save using utility logic (Smart Crop, EXIF Rotate)
-        from utils.image_processing import process_and_save_image
-        process_and_save_image(content, file_path)
-            
-        return {"file_path": file_path}
+        future = image_pipeline.submit(content, file_path)
+    except image_pipeline.PipelineFull as e:
+        raise HTTPException(status_code=429, detail="Hay demasiadas imágenes en proceso, reintente en unos segundos",
+                            headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al guardar imagen: {str(e)}")
 
+    if not wait:
+        return JSONResponse(status_code=202, content={
+            "job_id": filename,
+            "status": "processing",
+            "file_path": file_path,
+            "status_url": f"/decommission/upload-image/jobs/{filename}"
+        })
+
+    try:
+        await asyncio.wrap_future(future)
+    except Exception as e:
+        # The pipeline already kept the original file (same as a failed process_and_save_image)
+        print(f"ERROR: Image processing failed for {file_path}: {e}")
+    return {"file_path": file_path}
+
+# Seconds between retries while a batch upload waits for room in the image pipeline
+BATCH_RETRY_SECONDS = 1.0
+
+def _upload_size(file: UploadFile) -> int:
+    """Size of an uploaded file without reading it (the form parser already spooled it)."""
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+async def _read_batch(batch: list) -> list:
+    """[(content, file_path)] of one chunk; files are read only when their chunk is submitted."""
+    items = []
+    for upload in batch:
+        await upload["file"].seek(0)
+        items.append((await upload["file"].read(), upload["file_path"]))
+    return items
+
+@router.post("/upload-images")
+async def upload_decommission_images(
+    files: List[UploadFile] = File(...),
+    stream: bool = True
+):
+    """
+    Sube varias imágenes de bajas (p. ej. equipo y serie de cada unidad de un lote).
+    Cada imagen se procesa igual que en /upload-image, pero la detección YOLO corre
+    por lotes de IMAGE_BATCH_SIZE imágenes en una sola pasada del modelo.
+    Respuesta (stream=true): Server-Sent Events, un evento `file` por imagen procesada
+    ({index, filename, file_path, processed, done, total}) y un evento final `done`
+    con la lista completa. Con stream=false responde solo la lista al terminar.
+    Si la cola está llena al empezar responde 429 con Retry-After; 413 si una imagen
+    o el total superan IMAGE_BATCH_MAX_FILE_MB / IMAGE_BATCH_MAX_MB.
+    """
+    import os
+    import uuid
+
+    if len(files) > image_pipeline.MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Máximo {image_pipeline.MAX_BATCH_FILES} imágenes por carga")
+    total_bytes = 0
+    for file in files:
+        if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+            raise HTTPException(status_code=400, detail=f"Solo se permiten imágenes (png, jpg, jpeg, webp): {file.filename}")
+        size = _upload_size(file)
+        if size > image_pipeline.MAX_BATCH_FILE_BYTES:
+            raise HTTPException(status_code=413, detail=f"La imagen {file.filename} supera el máximo de "
+                                                        f"{image_pipeline.MAX_BATCH_FILE_BYTES // (1024 * 1024)} MB")
+        total_bytes += size
+    if total_bytes > image_pipeline.MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"La carga supera el máximo de "
+                                                    f"{image_pipeline.MAX_BATCH_BYTES // (1024 * 1024)} MB")
+
+    os.makedirs(DECOMMISSION_UPLOAD_DIR, exist_ok=True)
+    uploads = []
+    for index, file in enumerate(files):
+        file_path = os.path.join(DECOMMISSION_UPLOAD_DIR, f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}")
+        uploads.append({"index": index, "filename": file.filename, "file_path": file_path, "file": file})
+
+    batches = image_pipeline.chunks(uploads)
+    try:
+        first = image_pipeline.submit_batch(await _read_batch(batches[0]))
+    except image_pipeline.PipelineFull as e:
+        raise HTTPException(status_code=429, detail="Hay demasiadas imágenes en proceso, reintente en unos segundos",
+                            headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar imágenes: {str(e)}")
+
+    async def results():
+        """Resultado de cada imagen a medida que terminan sus lotes; los siguientes se encolan cuando hay lugar."""
+        pending = {asyncio.wrap_future(first): batches[0]}
+        queued = 1
+        items = None  # contenido del siguiente lote, leído al intentar encolarlo
+        while pending or queued < len(batches):
+            while queued < len(batches):
+                if items is None:
+                    items = await _read_batch(batches[queued])
+                try:
+                    future = image_pipeline.submit_batch(items)
+                except image_pipeline.PipelineFull:
+                    break
+                except Exception as e:
+                    # Sin pipeline: guardar los originales de lo que falta (como un process_and_save_image fallido)
+                    print(f"ERROR: Could not queue batch images, saving originals: {e}")
+                    for batch in batches[queued:]:
+                        for (content, file_path), upload in zip(items or await _read_batch(batch), batch):
+                            with open(file_path, "wb") as f:
+                                f.write(content)
+                            yield {"index": upload["index"], "filename": upload["filename"],
+                                   "file_path": file_path, "processed": False}
+                        items = None
+                    queued = len(batches)
+                    break
+                pending[asyncio.wrap_future(future)] = batches[queued]
+                queued += 1
+                items = None
+            if not pending:
+                if queued < len(batches):
+                    # Full with other uploads' images
+                    await asyncio.sleep(BATCH_RETRY_SECONDS)
+                continue
+            finished, _ = await asyncio.wait(pending, timeout=BATCH_RETRY_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                batch = pending.pop(task)
+                try:
+                    processed = task.result()[0]
+                except Exception as e:
+                    # The pipeline already kept the originals (same as a failed process_and_save_image)
+                    print(f"ERROR: Batch image processing failed: {e}")
+                    processed = [False] * len(batch)
+                for upload, ok in zip(batch, processed):
+                    yield {"index": upload["index"], "filename": upload["filename"],
+                           "file_path": upload["file_path"], "processed": ok}
+
+    if not stream:
+        return {"files": sorted([r async for r in results()], key=lambda r: r["index"])}
+
+    async def events():
+        done = []
+        async for result in results():
+            done.append(result)
+            yield f"event: file\ndata: {json.dumps({**result, 'done': len(done), 'total': len(uploads)})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'files': sorted(done, key=lambda r: r['index'])})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/upload-image/jobs/{job_id}")
+def get_upload_image_job(job_id: str):
+    """Estado de una imagen subida con wait=false: 'processing' o 'done' (con file_path)."""
+    import os
+
+    if os.path.basename(job_id) != job_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    file_path = os.path.join(DECOMMISSION_UPLOAD_DIR, job_id)
+    status = image_pipeline.job_status(file_path)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": status, "file_path": file_path if status == "done" else None}
+
 @router.put("/{decommission_id}", response_model=schemas.DecommissionResponse)
 def update_decommission(
     decommission_id: int,
@@ -312,9 +475,14 @@ def delete_decommission(
                 print(f"DEBUG: Deleted file {file_path}")
         except Exception as e:
             print(f"ERROR: Failed to delete file {file_path}: {e}")
+    for image_path in (db_decommission.device_image_path, db_decommission.serial_image_path):
+        if image_path:
+            image_derivatives.remove_derivatives(image_path)
 
     # 4. Delete Record
     db.delete(db_decommission)
     db.commit()
+
+    shared_cache.invalidate()
     
     return None
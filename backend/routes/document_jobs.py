@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Annotated, Dict, Any
+import asyncio
+import json
+import os
+import models, auth
+from services import document_jobs
+from utils import pdf_render
+
+router = APIRouter(prefix="/documents/jobs")
+
+# Seconds between status checks while an SSE client follows a job
+EVENTS_POLL_SECONDS = 0.5
+
+def _job_response(job: dict) -> dict:
+    """Public view of a job (no server paths)"""
+    response = {key: job[key] for key in ("id", "kind", "params", "status", "attempts", "error",
+                                          "created_by", "created_at", "started_at", "finished_at")}
+    response["filename"] = job["result_filename"]
+    response["download_url"] = f"/documents/jobs/{job['id']}/download" if job["status"] == "done" else None
+    return response
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = document_jobs.get_store().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("", status_code=202)
+def create_job(
+    kind: str = Body(...),
+    params: Dict[str, Any] = Body(default={}),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    Enqueue an acta render. Kinds: assignment_acta (assignment_id),
+    termination_acta_computer / termination_acta_mobile (termination_id), sale_acta (sale_id).
+    Returns the job immediately; poll GET /documents/jobs/{id} or follow /events.
+    """
+    try:
+        job = document_jobs.enqueue(kind, params, created_by=current_user.username)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _job_response(job)
+
+@router.get("")
+def list_jobs(limit: int = 50, current_user: models.User = Depends(auth.get_current_active_user)):
+    """Latest jobs of the current user"""
+    document_jobs.ensure_dispatcher()
+    return [_job_response(job) for job in document_jobs.get_store().list(min(limit, 200), created_by=current_user.username)]
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Job status: queued, running, done or failed"""
+    document_jobs.ensure_dispatcher()
+    return _job_response(_get_job_or_404(job_id))
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: one `status` event per change, the stream ends when the job finishes"""
+    _get_job_or_404(job_id)
+    document_jobs.ensure_dispatcher()
+
+    async def stream():
+        last_status = None
+        while True:
+            job = document_jobs.get_store().get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps(_job_response(job))}\n\n"
+            if job["status"] in document_jobs.FINISHED_STATUSES:
+                return
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/{job_id}/download")
+def download_job_result(job_id: str, output_format: Annotated[str, Query(alias="format")] = "docx"):
+    """Download the generated document of a finished job (?format=pdf converts a DOCX result)"""
+    pdf_render.check_format(output_format)
+    job = _get_job_or_404(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=410, detail="Generated file no longer available")
+    if job["media_type"] == pdf_render.DOCX_MEDIA_TYPE:
+        return pdf_render.acta_response(job["result_path"], job["result_filename"], output_format,
+                                        headers={"Cache-Control": "no-cache"})
+    return FileResponse(
+        path=job["result_path"],
+        filename=job["result_filename"],
+        media_type=job["media_type"],
+        headers={"Cache-Control": "no-cache"}
+    )
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.responses import StreamingResponse
 import io
 import qrcode
 from sqlalchemy.orm import Session
-from sqlalchemy import case, asc, desc, or_, and_
+from sqlalchemy import asc, desc, or_, and_, select, false, Numeric
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 from typing import List
+import base64
+import json
+from decimal import Decimal, InvalidOperation
 import database, schemas, crud
 import models
-from services import audit
+from services import audit, device_search, list_counts, shared_cache, data_versions, sparse_fields
+from utils.fast_json import ORJSONResponse
 import auth
 
 router = APIRouter()
@@ -35,9 +40,123 @@ def create_device(device: schemas.DeviceCreate, db: Session = Depends(database.g
     except Exception:
         pass # Don't fail request if log fails
 
+    # Inventory changed: drop cached /analytics/ in every worker
+    shared_cache.invalidate()
+
     return new_device
 
-@router.get("/devices/")
+def _device_sort_keys(sort_by: str = None, sort_order: str = 'asc'):
+    """
+    Build the ORDER BY keys for the device list as (expression, descending) tuples.
+    Shared by offset and cursor pagination so both walk the same ordering.
+    """
+    # Ranks are generated columns on devices (see models.DEVICE_TYPE_RANK_SQL and friends):
+    # type_rank: Laptop > Monitor > Celular > Kit > Auriculares > Mochila > others
+    # status_rank: Available > Assigned > Sold > Retired > others
+    # status_group_rank: Active (available/assigned/maintenance) = 1, Inactive = 2
+    type_ordering = models.Device.type_rank
+    status_ordering = models.Device.status_rank
+    status_group_ordering = models.Device.status_group_rank
+
+    if sort_by:
+        is_desc = sort_order == 'desc'
+
+        if sort_by == 'brand':
+            keys = [(models.Device.brand, is_desc)]
+        elif sort_by == 'model':
+            # Sort by brand then model for better experience
+            keys = [(models.Device.brand, is_desc), (models.Device.model, is_desc)]
+        elif sort_by == 'serial_number':
+            keys = [(models.Device.serial_number, is_desc)]
+        elif sort_by == 'hostname':
+            keys = [(models.Device.hostname, is_desc)]
+        elif sort_by == 'status':
+            keys = [(models.Device.status, is_desc)]
+        elif sort_by == 'device_type':
+            # When sorting by type, we also want available items first within that type
+            keys = [(type_ordering, is_desc), (status_ordering, False)]
+        else:
+            keys = []
+        # id breaks ties so pages never overlap or skip rows with equal values
+        return keys + [(models.Device.id, False)]
+
+    # Default sort (served by the ix_devices_default_sort partial index):
+    # 1. Active vs Inactive (Active first)
+    # 2. Device Type (Laptop > Monitor ...)
+    # 3. Status (Available > Assigned ...)
+    # 4. Brand
+    return [
+        (status_group_ordering, False),
+        (type_ordering, False),
+        (status_ordering, False),
+        (models.Device.brand, False),
+        (models.Device.id, True)
+    ]
+
+def _encode_cursor(values, direction: str, signature: str) -> str:
+    """Pack a sort-key tuple into an opaque, URL-safe cursor token (numeric keys as exact strings)."""
+    payload = json.dumps({"k": [str(v) if isinstance(v, Decimal) else v for v in values], "d": direction, "s": signature},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(token: str, signature: str):
+    """Unpack a cursor token. Returns (values, direction) or raises HTTP 400."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values, direction = payload["k"], payload["d"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if payload.get("s") != signature or direction not in ('next', 'prev'):
+        # Cursor was issued for a different sort; it cannot be resumed here
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    return values, direction
+
+def _cursor_value(expr, value):
+    """Decimal keys (the numeric search rank) travel as strings; anything else as JSON."""
+    if value is not None and isinstance(expr.type, Numeric) and expr.type.asdecimal:
+        try:
+            return Decimal(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+def _keyset_filter(keys, values, forward: bool, nulls_largest: bool):
+    """
+    Row-value comparison "(k1, k2, ...) > (v1, v2, ...)" honouring per-key direction.
+    Expanded into OR/AND terms because keys can mix ASC and DESC.
+    NULLs are placed where the database sorts them (largest on PostgreSQL, smallest
+    on SQLite), so the cursor walks the same ordering as skip/limit pages.
+    """
+    clauses = []
+    for i, (expr, is_desc) in enumerate(keys):
+        step = _key_less if is_desc == forward else _key_greater
+        clauses.append(and_(*[_key_equal(keys[j][0], values[j]) for j in range(i)],
+                            step(expr, values[i], nulls_largest)))
+    return or_(*clauses)
+
+def _is_nullable(expr) -> bool:
+    return isinstance(expr, InstrumentedAttribute) and expr.property.columns[0].nullable
+
+def _key_equal(expr, value):
+    return expr.is_(None) if value is None else expr == value
+
+def _key_less(expr, value, nulls_largest: bool):
+    if value is None:
+        return expr.isnot(None) if nulls_largest else false()
+    if not nulls_largest and _is_nullable(expr):
+        return or_(expr < value, expr.is_(None))
+    return expr < value
+
+def _key_greater(expr, value, nulls_largest: bool):
+    if value is None:
+        return false() if nulls_largest else expr.isnot(None)
+    if nulls_largest and _is_nullable(expr):
+        return or_(expr > value, expr.is_(None))
+    return expr > value
+
+@router.get("/devices/", dependencies=[Depends(data_versions.etag_guard("devices", "assignments", "employees"))])
 def read_devices(
     skip: int = 0, 
     limit: int = 50,  # Reducido de 100 a 50 para mejor rendimiento
@@ -48,19 +167,39 @@ def read_devices(
     include_deleted: bool = False,
     sort_by: str = None,
     sort_order: str = 'asc',
+    cursor: str = None,
+    count: str = 'exact',
+    fields: str = None,
+    response: Response = None,
     db: Session = Depends(database.get_db)
 ):
     """
     Get devices with pagination and server-side filtering.
     Returns paginated response with metadata.
+
+    `count` controls the skip/limit total: `exact` (default), `estimate`
+    (planner estimate or a short-lived cached count, flagged with
+    `total_is_estimate`) or `none` (no total, only `has_more`).
+
+    Pass `cursor` (empty for the first page, then `next_cursor`/`prev_cursor`
+    from a previous response) to use keyset pagination instead of skip/limit.
+    Every cursor page costs the same regardless of depth; `total`/`pages`
+    are not computed in this mode.
+
+    Pass `fields` (e.g. `fields=serial_number,brand,model,status`) to get only
+    those columns per item; `current_employee_name` and `assignments` (history)
+    can be requested too. Rows are read as tuples without building ORM objects
+    and serialized with orjson.
     """
     from sqlalchemy.orm import subqueryload
-    from math import ceil
     
-    # Base query with eager loading to avoid N+1 queries
-    query = db.query(models.Device).options(
-        subqueryload(models.Device.assignments)
-    )
+    list_counts.validate_count_mode(count)
+    field_names = sparse_fields.parse_fields(fields, DEVICE_LIST_FIELDS) if fields else None
+    
+    # Base query with eager loading to avoid N+1 queries (full objects only)
+    query = db.query(models.Device)
+    if field_names is None:
+        query = query.options(subqueryload(models.Device.assignments))
     
     # Filter out deleted devices unless explicitly requested
     if not include_deleted:
@@ -71,31 +210,13 @@ def read_devices(
     query = query.filter(models.Device.device_type != 'charger')
     
     # Apply server-side filters
+    # Search matches device columns or the current assignee's name/DNI
+    # (trigram-indexed and ranked on PostgreSQL, plain ILIKE elsewhere)
+    search_rank = None
     if search:
-        search_filter = f"%{search}%"
-        
-        query = query.filter(
-            or_(
-                models.Device.device_type.ilike(search_filter),
-                models.Device.serial_number.ilike(search_filter),
-                models.Device.brand.ilike(search_filter),
-                models.Device.model.ilike(search_filter),
-                models.Device.hostname.ilike(search_filter),
-                models.Device.inventory_code.ilike(search_filter),
-                # Check active assignments for employee matches
-                models.Device.assignments.any(
-                    and_(
-                        models.Assignment.returned_date == None,
-                        models.Assignment.employee.has(
-                            or_(
-                                models.Employee.full_name.ilike(search_filter),
-                                models.Employee.dni.ilike(search_filter)
-                            )
-                        )
-                    )
-                )
-            )
-        )
+        query = query.filter(device_search.device_search_filter(search))
+        if not sort_by and device_search.trigram_available(db):
+            search_rank = device_search.device_search_rank(search)
     
     # Support multiple values separated by commas for Excel-style filters
     if device_type:
@@ -110,86 +231,136 @@ def read_devices(
         locations = [l.strip() for l in location.split(',')]
         query = query.filter(models.Device.location.in_(locations))
     
-    # Apply sorting
-    # Define custom ordering for device types
-    type_ordering = case(
-        (models.Device.device_type == 'laptop', 1),
-        (models.Device.device_type == 'monitor', 2),
-        (models.Device.device_type == 'celular', 3),
-        (models.Device.device_type == 'kit teclado/mouse', 4),
-        (models.Device.device_type == 'auriculares', 5),
-        (models.Device.device_type == 'mochila', 6),
-        else_=100
-    )
+    sort_keys = _device_sort_keys(sort_by, sort_order)
+    if search_rank is not None:
+        # Best matches first, default ordering breaks ties
+        sort_keys = [(search_rank, True)] + sort_keys
 
-    # Define custom ordering for status (Available > Assigned > Sold > Retired)
-    status_ordering = case(
-        (models.Device.status == 'available', 1),
-        (models.Device.status == 'assigned', 2),
-        (models.Device.status == 'sold', 3),
-        (models.Device.status == 'retired', 4),
-        else_=5
-    )
+    if field_names is not None:
+        # Sparse fieldset: same filters/ordering, but select only the requested columns
+        query = query.with_entities(*_device_field_columns(field_names))
 
-    # Define ordering for Status Groups (Active=1, Inactive=2)
-    # This ensures Sold/Retired items appear at the very end
-    status_group_ordering = case(
-        (models.Device.status.in_(['available', 'assigned', 'maintenance']), 1),
-        (models.Device.status.in_(['sold', 'retired']), 2),
-        else_=2
-    )
+    if cursor is not None:
+        sort_signature = f"{sort_by or ('relevance' if search_rank is not None else '')}:{sort_order}"
+        width = len(_device_field_columns(field_names)) if field_names is not None else None
+        page = _read_devices_page_by_cursor(query, sort_keys, cursor, limit, sort_signature, width)
+        if field_names is None:
+            return page
+        page["items"] = _device_field_items(db, page["items"], field_names)
+        return ORJSONResponse(page, headers=response.headers)
 
     # Apply sorting
-    if sort_by:
-        # from sqlalchemy import asc, desc # Moved to top level
-        direction = desc if sort_order == 'desc' else asc
-        
-        if sort_by == 'brand':
-            query = query.order_by(direction(models.Device.brand))
-        elif sort_by == 'model':
-            # Sort by brand then model for better experience
-            query = query.order_by(direction(models.Device.brand), direction(models.Device.model))
-        elif sort_by == 'serial_number':
-            query = query.order_by(direction(models.Device.serial_number))
-        elif sort_by == 'hostname':
-            query = query.order_by(direction(models.Device.hostname))
-        elif sort_by == 'status':
-            query = query.order_by(direction(models.Device.status))
-        elif sort_by == 'device_type':
-            # Use custom ordering logic
-            direction_func = desc if sort_order == 'desc' else asc
-            # When sorting by type, we also want available items first within that type
-            query = query.order_by(direction_func(type_ordering), asc(status_ordering))
-    else:
-        # Default sort: 
-        # 1. Active vs Inactive (Active first)
-        # 2. Device Type (Laptop > Monitor ...)
-        # 3. Status (Available > Assigned ...)
-        # 4. Brand
-        query = query.order_by(
-            asc(status_group_ordering), 
-            asc(type_ordering), 
-            asc(status_ordering), 
-            models.Device.brand, 
-            models.Device.id.desc()
-        )
+    query = query.order_by(*[desc(expr) if is_desc else asc(expr) for expr, is_desc in sort_keys])
     
-    # Count total before pagination
-    total = query.count()
+    # Count total before pagination (exact, estimated or skipped)
+    filter_signature = (search, device_type, status, location, include_deleted)
+    total, is_estimate = list_counts.count_total(db, query, count, "devices", filter_signature)
     
     # Apply pagination
-    devices = query.offset(skip).limit(limit).all()
-    
-    # Calculate total pages
-    pages = ceil(total / limit) if limit > 0 else 0
+    devices, has_more = list_counts.fetch_page(query, skip, limit, count)
     
     # Return paginated response
+    page = {
+        "items": devices,
+        **list_counts.page_metadata(total, is_estimate, has_more, skip, limit)
+    }
+    if field_names is None:
+        return page
+    page["items"] = _device_field_items(db, devices, field_names)
+    return ORJSONResponse(page, headers=response.headers)
+
+# Device columns the schemas.Device response exposes (no internal sort/audit columns)
+DEVICE_RESPONSE_COLUMNS = {
+    name: column for name, column in sparse_fields.column_fields(models.Device).items()
+    if name in schemas.Device.model_fields
+}
+
+# Fields accepted by GET /devices/?fields=: those columns plus these computed ones
+DEVICE_EXTRA_FIELDS = ("current_employee_name", "assignments")
+DEVICE_LIST_FIELDS = tuple(DEVICE_RESPONSE_COLUMNS) + DEVICE_EXTRA_FIELDS
+
+def _device_field_columns(field_names):
+    """SELECT list for a device sparse fieldset (assignments are loaded separately)."""
+    columns = DEVICE_RESPONSE_COLUMNS
+    selected = []
+    for name in field_names:
+        if name == "assignments":
+            continue
+        if name == "current_employee_name":
+            selected.append(
+                select(models.Employee.full_name)
+                .where(models.Employee.id == models.Device.current_employee_id)
+                .scalar_subquery()
+                .label(name)
+            )
+        else:
+            selected.append(columns[name])
+    return selected
+
+def _device_field_items(db: Session, rows, field_names):
+    """Row tuples -> dicts; attaches the assignment history only when requested."""
+    names = [name for name in field_names if name != "assignments"]
+    items = sparse_fields.rows_to_dicts(rows, names)
+    if "assignments" in field_names and items:
+        assignment_columns = sparse_fields.column_fields(models.Assignment)
+        history = db.query(*assignment_columns.values())\
+            .filter(models.Assignment.device_id.in_([item["id"] for item in items]))\
+            .order_by(models.Assignment.assigned_date)\
+            .all()
+        by_device = {}
+        for assignment in sparse_fields.rows_to_dicts(history, list(assignment_columns)):
+            by_device.setdefault(assignment["device_id"], []).append(assignment)
+        for item in items:
+            item["assignments"] = by_device.get(item["id"], [])
+    return items
+
+def _read_devices_page_by_cursor(query, sort_keys, cursor: str, limit: int, signature: str, width: int = None):
+    """
+    Keyset pagination for read_devices.
+    Seeks past the cursor's sort-key tuple instead of OFFSET, so the database
+    never sorts and discards the rows of earlier pages.
+    `width` is the number of selected columns for sparse fieldsets (None: one Device entity).
+    """
+    # Same ORDER BY as skip/limit pages (nullable columns included, see _keyset_filter);
+    # _device_sort_keys always ends with id, so every position is unique.
+    keys = sort_keys
+
+    direction = 'next'
+    if cursor:
+        values, direction = _decode_cursor(cursor, signature)
+        if len(values) != len(keys):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        values = [_cursor_value(expr, value) for (expr, _), value in zip(keys, values)]
+        nulls_largest = query.session.get_bind().dialect.name in ('postgresql', 'oracle')
+        query = query.filter(_keyset_filter(keys, values, forward=direction == 'next', nulls_largest=nulls_largest))
+
+    # Walking backwards: flip every key, then restore display order below
+    forward = direction == 'next'
+    ordering = [desc(expr) if is_desc == forward else asc(expr) for expr, is_desc in keys]
+
+    # Select the key values alongside each device and fetch one extra row to detect more pages
+    rows = query.add_columns(*[expr for expr, _ in keys]).order_by(*ordering).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    key_start = width or 1
+    devices = [row[0] if width is None else tuple(row[:width]) for row in rows]
+    first_key = list(rows[0][key_start:]) if rows else None
+    last_key = list(rows[-1][key_start:]) if rows else None
+
+    # Going forward there is a previous page whenever we started from a cursor;
+    # going backward there is always a next page (the one we came from).
+    has_next = has_more if forward else bool(rows)
+    has_prev = bool(cursor) if forward else has_more
+
     return {
         "items": devices,
-        "total": total,
-        "skip": skip,
         "limit": limit,
-        "pages": pages
+        "has_more": has_next,
+        "next_cursor": _encode_cursor(last_key, 'next', signature) if has_next and last_key else None,
+        "prev_cursor": _encode_cursor(first_key, 'prev', signature) if has_prev and first_key else None
     }
 
 @router.get("/devices/{device_id}", response_model=schemas.DeviceDetail)
@@ -230,6 +401,8 @@ def update_device_status(device_id: int, status_update: schemas.DeviceUpdate, db
         
     db.commit()
     db.refresh(db_device)
+    shared_cache.invalidate()
+
     return db_device
 
 @router.put("/devices/{device_id}", response_model=schemas.Device)
@@ -296,6 +469,8 @@ def update_device(device_id: int, device_update: schemas.DeviceUpdate, db: Sessi
         )
     except Exception:
         pass
+
+    shared_cache.invalidate()
     
     return db_device
 
@@ -304,11 +479,53 @@ def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(data
     db_employee = crud.get_employee_by_email(db, email=employee.email)
     if db_employee:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_employee(db=db, employee=employee)
+    db_employee = crud.create_employee(db=db, employee=employee)
+    shared_cache.invalidate()
+    return db_employee
 
-@router.get("/employees/", response_model=List[schemas.EmployeeDetail])
-def read_employees(skip: int = 0, limit: int = 100, search: str = None, active_only: bool = False, db: Session = Depends(database.get_db)):
-    return crud.get_employees(db, skip=skip, limit=limit, search=search, active_only=active_only)
+@router.get("/employees/", response_model=List[schemas.EmployeeDetail],
+            dependencies=[Depends(data_versions.etag_guard("employees", "assignments", "devices"))])
+def read_employees(skip: int = 0, limit: int = 100, search: str = None, active_only: bool = False,
+                   fields: str = None, response: Response = None, db: Session = Depends(database.get_db)):
+    """
+    List employees with their assignments.
+    Pass `fields` (e.g. `fields=full_name,dni,location`) to get only those columns,
+    read as row tuples and serialized with orjson; add `assignments` to include
+    each assignment with its device columns.
+    """
+    if not fields:
+        return crud.get_employees(db, skip=skip, limit=limit, search=search, active_only=active_only)
+    
+    field_names = sparse_fields.parse_fields(fields, EMPLOYEE_LIST_FIELDS)
+    names = [name for name in field_names if name != "assignments"]
+    columns = sparse_fields.column_fields(models.Employee)
+    query = crud.filter_employee_list(
+        db.query(*[columns[name] for name in names]), search=search, active_only=active_only
+    )
+    items = sparse_fields.rows_to_dicts(query.offset(skip).limit(limit).all(), names)
+    
+    if "assignments" in field_names and items:
+        assignment_columns = sparse_fields.column_fields(models.Assignment)
+        # Same device fields the full response exposes (no internal sort columns)
+        device_columns = DEVICE_RESPONSE_COLUMNS
+        rows = db.query(*assignment_columns.values(), *device_columns.values())\
+            .join(models.Device, models.Assignment.device_id == models.Device.id)\
+            .filter(models.Assignment.employee_id.in_([item["id"] for item in items]))\
+            .order_by(models.Assignment.id)\
+            .all()
+        by_employee = {}
+        split = len(assignment_columns)
+        for row in rows:
+            assignment = dict(zip(assignment_columns, row[:split]))
+            assignment["device"] = dict(zip(device_columns, row[split:]))
+            by_employee.setdefault(assignment["employee_id"], []).append(assignment)
+        for item in items:
+            item["assignments"] = by_employee.get(item["id"], [])
+    
+    return ORJSONResponse(items, headers=response.headers)
+
+# Fields accepted by GET /employees/?fields=: every column plus the assignment list
+EMPLOYEE_LIST_FIELDS = tuple(sparse_fields.column_fields(models.Employee)) + ("assignments",)
 
 @router.get("/employees/{employee_id}", response_model=schemas.EmployeeDetail)
 def read_employee(employee_id: int, db: Session = Depends(database.get_db)):
@@ -396,6 +613,7 @@ def update_employee(employee_id: int, employee_update: schemas.EmployeeUpdate, d
     db_employee = crud.update_employee(db, employee_id=employee_id, employee_update=employee_update)
     if db_employee is None:
         raise HTTPException(status_code=404, detail="Employee not found")
+    shared_cache.invalidate()
     return db_employee
 
 @router.delete("/devices/{device_id}", response_model=schemas.Device)
@@ -432,6 +650,8 @@ def delete_device(device_id: int, db: Session = Depends(database.get_db), curren
         )
     except Exception:
         pass
+
+    shared_cache.invalidate()
     
     return db_device
 
@@ -469,5 +689,7 @@ def delete_employee(employee_id: int, db: Session = Depends(database.get_db), cu
         )
     except Exception:
         pass
+
+    shared_cache.invalidate()
     
     return db_employee
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Annotated
 from datetime import datetime
-from math import ceil
-import database, schemas, models, auth
+import database, schemas, models, auth, crud
+from services import list_counts, shared_cache
+from utils import pdf_render
 import os
 import shutil
 from pathlib import Path
@@ -63,6 +64,7 @@ def create_sale(
             if active_assignment:
                 active_assignment.returned_date = datetime.utcnow()
                 active_assignment.return_observations = f"Sold to {sale.buyer_name} (Sale ID Pending)"
+            crud.set_current_assignment(device, None)
         
         devices.append(device)
     
@@ -110,6 +112,9 @@ def create_sale(
     
     db.commit()
     db.refresh(db_sale)
+
+    # Sold devices leave the inventory: drop cached /analytics/ in every worker
+    shared_cache.invalidate()
     
     return db_sale
 
@@ -167,24 +172,24 @@ def search_employees_with_devices(
         )
     ).limit(10).all()
     
+    # Devices currently held by these employees, in one query (denormalized pointer on devices)
+    held_devices = {}
+    if employees:
+        devices = db.query(models.Device).filter(
+            models.Device.current_employee_id.in_([emp.id for emp in employees]),
+            models.Device.device_type.in_(['laptop', 'monitor'])
+        ).order_by(models.Device.current_assignment_id).all()
+        for device in devices:
+            held_devices.setdefault(device.current_employee_id, []).append(device)
+    
     result = []
     for emp in employees:
-        # Get active assignments for this employee
-        assignments = db.query(models.Assignment).filter(
-            models.Assignment.employee_id == emp.id,
-            models.Assignment.returned_date == None
-        ).all()
-        
         # Find laptop and monitors (can have multiple monitors)
         laptop = None
         monitors = []  # Changed to list to support multiple monitors
         
-        for assignment in assignments:
-            device = db.query(models.Device).filter(
-                models.Device.id == assignment.device_id
-            ).first()
-            
-            if device and device.status == models.DeviceStatus.ASSIGNED:
+        for device in held_devices.get(emp.id, []):
+            if device.status == models.DeviceStatus.ASSIGNED:
                 if device.device_type == 'laptop' and not laptop:
                     laptop = {
                         "id": device.id,
@@ -222,11 +227,15 @@ def list_sales(
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None,
+    count: str = 'exact',
     db: Session = Depends(database.get_db)
 ):
     """
     List all sales with pagination and search
+    `count` = exact | estimate | none (see services/list_counts.py).
     """
+    list_counts.validate_count_mode(count)
+    
     # Use joinedload to prevent N+1 queries when accessing sold_devices and items later
     from sqlalchemy.orm import joinedload
     query = db.query(models.Sale).options(
@@ -241,14 +250,13 @@ def list_sales(
             (models.Sale.buyer_dni.ilike(f"%{search}%"))
         )
     
-    # Count total
-    total = query.count()
+    # Count total (exact, estimated or skipped)
+    total, is_estimate = list_counts.count_total(db, query, count, "sales", search)
     
     # Apply pagination and ordering
-    sales = query.order_by(models.Sale.sale_date.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    sales, has_more = list_counts.fetch_page(
+        query.order_by(models.Sale.sale_date.desc()), skip, limit, count
+    )
     
     # Enrich with device count and items
     result = []
@@ -271,15 +279,9 @@ def list_sales(
             'items': items_data
         })
     
-    # Calculate pages
-    pages = ceil(total / limit) if limit > 0 else 0
-    
     return {
         "items": result,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "pages": pages
+        **list_counts.page_metadata(total, is_estimate, has_more, skip, limit)
     }
 
 @router.get("/{sale_id}", response_model=schemas.SaleDetail)
@@ -318,6 +320,8 @@ def delete_sale(
     # Delete sale record
     db.delete(sale)
     db.commit()
+
+    shared_cache.invalidate()
     
     return {"message": "Sale deleted and devices reverted to available"}
 
@@ -388,13 +392,15 @@ def download_sale_acta(sale_id: int, db: Session = Depends(database.get_db)):
 def generate_sale_acta(
     sale_id: int, 
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
 ):
     """
     Generate Sale Acta PDF using the uploaded template (or 'Acta de Venta' template).
+    Returns the DOCX unless ?format=pdf.
     """
-    from fastapi.responses import FileResponse
     import pdf_generator
+    pdf_render.check_format(output_format)
     
     sale = db.query(models.Sale).filter(models.Sale.id == sale_id).first()
     if not sale:
@@ -485,11 +491,7 @@ def generate_sale_acta(
         if not generated_path or not os.path.exists(generated_path):
              raise HTTPException(status_code=500, detail="Error generando el PDF (archivo no creado)")
              
-        return FileResponse(
-            path=generated_path,
-            filename=f"Acta_Venta_Generada_{sale.buyer_name}.docx", # Returns DOCX initially
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        return pdf_render.acta_response(generated_path, f"Acta_Venta_Generada_{sale.buyer_name}.docx", output_format)
         
     except Exception as e:
         print(f"Error generating sale acta: {e}")
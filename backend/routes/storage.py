@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+import models, auth
+from services import storage
+
+router = APIRouter(prefix="/storage")
+
+@router.get("/report")
+def storage_report(current_user: models.User = Depends(auth.get_current_admin_user)):
+    """
+    Disk usage of generated/temporary files per area (protected = still referenced
+    from the database), what a sweep would delete now, and the last sweep's result.
+    """
+    plan = storage.sweep(dry_run=True)
+    return {
+        "settings": {
+            "areas": storage.AREAS,
+            "budget_bytes": storage.BUDGET_BYTES,
+            "min_age_seconds": storage.MIN_AGE_SECONDS,
+            "temp_max_age_hours": storage.TEMP_MAX_AGE_HOURS,
+            "sweep_seconds": storage.SWEEP_SECONDS,
+        },
+        "current": plan,
+        "last_sweep": storage.last_sweep(),
+    }
+
+@router.post("/sweep")
+def run_storage_sweep(dry_run: bool = False, current_user: models.User = Depends(auth.get_current_admin_user)):
+    """Run a housekeeping sweep now (?dry_run=true only reports)."""
+    return storage.sweep(dry_run=dry_run)
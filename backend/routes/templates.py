@@ -1,9 +1,8 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Body
-from utils import doc_utils
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Body, Query
+from utils import doc_utils, template_cache, acta_cache, pdf_render
 from sqlalchemy.orm import Session
 from database import get_db
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Annotated
 import shutil
 import os
 import uuid
@@ -85,11 +84,13 @@ async def preview_template(
     temp_filename: Optional[str] = None,
     template_id: Optional[int] = None,
     data: Dict[str, Any] = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
 ):
     """
-    Generate a preview (filled DOCX) from a temp upload OR existing template + data.
+    Generate a preview (filled DOCX, or PDF with ?format=pdf) from a temp upload OR existing template + data.
     """
+    pdf_render.check_format(output_format)
     source_path = None
     
     if temp_filename:
@@ -123,14 +124,8 @@ async def preview_template(
     if not success:
         raise HTTPException(status_code=500, detail="Failed to generate preview")
         
-    # Ideally convert to PDF here, but for now return DOCX.
-    # Frontend handles blob. Chrome might download it instead of previewing.
-    
-    return FileResponse(
-        dest_path, 
-        media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        filename="preview.docx"
-    )
+    # ?format=pdf: browsers can show the PDF inline instead of downloading the DOCX
+    return pdf_render.acta_response(dest_path, "preview.docx", output_format)
 
 @router.get("/", response_model=List[schemas.TemplateResponse])
 def get_templates(db: Session = Depends(get_db)):
@@ -139,6 +134,11 @@ def get_templates(db: Session = Depends(get_db)):
     # Explicitly check if list is empty to avoid null/undefined on one frontend path? No, empty list is fine.
     return templates
 
+@router.get("/cache/stats")
+def get_template_cache_stats():
+    """Hit/miss counters of the compiled template cache and the rendered acta cache (this worker only)"""
+    return {**template_cache.stats(), "rendered_actas": acta_cache.stats()}
+
 @router.post("/", response_model=schemas.TemplateResponse)
 def create_template(
     template: schemas.TemplateCreate,
@@ -193,6 +193,7 @@ def delete_template(
     try:
         db.delete(template)
         db.commit()
+        template_cache.invalidate(template_id)
         
         # Optionally remove file
         if os.path.exists(template.file_path):
@@ -225,6 +226,8 @@ def set_default_template(
     # Set this one as default
     template.is_default = True
     db.commit()
+    # Defaults changed for the whole type: drop every compiled template
+    template_cache.invalidate()
     
     return {"message": "Template set as default successfully", "template_id": template_id}
 
@@ -246,6 +249,7 @@ def update_template(
     try:
         db.commit()
         db.refresh(db_template)
+        template_cache.invalidate(template_id)
         return db_template
     except Exception as e:
         db.rollback()
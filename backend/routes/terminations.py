@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Annotated
 from datetime import datetime
 import database, schemas, crud, models, auth
+from services import list_counts, shared_cache
+from utils import pdf_render
 
 router = APIRouter()
 
@@ -58,6 +60,7 @@ def create_termination(
         # Update device status to available
         device = assignment.device
         device.status = models.DeviceStatus.AVAILABLE
+        crud.set_current_assignment(device, None)
     
     # Mark employee as inactive
     employee.is_active = False
@@ -66,6 +69,9 @@ def create_termination(
     
     db.commit()
     db.refresh(db_termination)
+
+    # Returned devices/inactive employee: drop cached /analytics/ in every worker
+    shared_cache.invalidate()
     
     return db_termination
 
@@ -74,14 +80,17 @@ def list_terminations(
     skip: int = 0,
     limit: int = 20,  # Reducido de 100 a 20 porque las terminaciones son más pesadas
     search: str = None,
+    count: str = 'exact',
     db: Session = Depends(database.get_db)
 ):
     """
     List all terminations with search capability, pagination, and optimized queries.
     Uses eager loading to avoid N+1 query problem.
+    `count` = exact | estimate | none (see services/list_counts.py).
     """
     from sqlalchemy.orm import joinedload, selectinload
-    from math import ceil
+    
+    list_counts.validate_count_mode(count)
     
     # Base query with eager loading - load everything in one go
     query = db.query(models.Termination)\
@@ -100,14 +109,13 @@ def list_terminations(
             (models.Employee.email.ilike(search_pattern))
         )
     
-    # Count total before pagination
-    total = query.count()
+    # Count total before pagination (exact, estimated or skipped)
+    total, is_estimate = list_counts.count_total(db, query, count, "terminations", search)
     
     # Apply pagination and ordering
-    terminations = query.order_by(models.Termination.termination_date.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    terminations, has_more = list_counts.fetch_page(
+        query.order_by(models.Termination.termination_date.desc()), skip, limit, count
+    )
     
     # Enrich with equipment count and acta availability
     # Now we can do this without additional queries because of eager loading
@@ -164,16 +172,10 @@ def list_terminations(
             returned_devices=returned_devices_list
         ))
     
-    # Calculate total pages
-    pages = ceil(total / limit) if limit > 0 else 0
-    
     # Return paginated response
     return {
         "items": result,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "pages": pages
+        **list_counts.page_metadata(total, is_estimate, has_more, skip, limit)
     }
 
 @router.get("/terminations/{termination_id}", response_model=schemas.TerminationDetail)
@@ -194,9 +196,13 @@ def get_termination(termination_id: int, db: Session = Depends(database.get_db))
     )
 
 @router.get("/terminations/{termination_id}/acta-computer")
-async def download_computer_acta(termination_id: int, db: Session = Depends(database.get_db)):
+async def download_computer_acta(
+    termination_id: int,
+    db: Session = Depends(database.get_db),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
+):
     """Generate and download computer equipment return acta"""
-    from fastapi.responses import FileResponse
+    pdf_render.check_format(output_format)
     import pdf_generator
     
     termination = db.query(models.Termination).filter(models.Termination.id == termination_id).first()
@@ -265,16 +271,20 @@ async def download_computer_acta(termination_id: int, db: Session = Depends(data
         template_variables=template_vars
     )
     
-    return FileResponse(
+    return pdf_render.acta_response(
         file_path,
-        media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        filename=f'Acta_Recepcion_Computadora_{termination.employee.full_name.replace(" ", "_")}_{termination_id}.docx'
+        f'Acta_Recepcion_Computadora_{termination.employee.full_name.replace(" ", "_")}_{termination_id}.docx',
+        output_format
     )
 
 @router.get("/terminations/{termination_id}/acta-mobile")
-async def download_mobile_acta(termination_id: int, db: Session = Depends(database.get_db)):
+async def download_mobile_acta(
+    termination_id: int,
+    db: Session = Depends(database.get_db),
+    output_format: Annotated[str, Query(alias="format")] = "docx"  # 'docx' or 'pdf'
+):
     """Generate and download mobile equipment return acta"""
-    from fastapi.responses import FileResponse
+    pdf_render.check_format(output_format)
     import pdf_generator
     
     termination = db.query(models.Termination).filter(models.Termination.id == termination_id).first()
@@ -323,10 +333,10 @@ async def download_mobile_acta(termination_id: int, db: Session = Depends(databa
         template_variables=template_vars
     )
     
-    return FileResponse(
+    return pdf_render.acta_response(
         file_path,
-        media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        filename=f'Acta_Recepcion_Celular_{termination.employee.full_name.replace(" ", "_")}_{termination_id}.docx'
+        f'Acta_Recepcion_Celular_{termination.employee.full_name.replace(" ", "_")}_{termination_id}.docx',
+        output_format
     )
 
 @router.delete("/terminations/{termination_id}")
@@ -362,6 +372,7 @@ def delete_termination(
         # Update device status back to ASSIGNED
         if assignment.device:
             assignment.device.status = models.DeviceStatus.ASSIGNED
+            crud.set_current_assignment(assignment.device, assignment)
         
     # Revert employee status
     if employee:
@@ -373,5 +384,7 @@ def delete_termination(
     # Delete termination record
     db.delete(termination)
     db.commit()
+
+    shared_cache.invalidate()
     
     return {"message": "Termination deleted and effects reverted successfully"}
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-import models
+import models, crud
 import json
 import datetime
 
@@ -68,13 +68,16 @@ def log_action_with_snapshot(
 def get_entity_snapshot(entity) -> dict:
     """
     Convert a SQLAlchemy model instance to a dictionary snapshot.
-    Excludes relationships and internal SQLAlchemy attributes.
+    Excludes relationships, internal SQLAlchemy attributes and database-generated
+    columns (they cannot be written back on revert).
     """
     if entity is None:
         return None
     
     snapshot = {}
     for column in entity.__table__.columns:
+        if column.computed is not None:
+            continue
         value = getattr(entity, column.name)
         # Convert datetime to ISO string for JSON serialization
         if isinstance(value, datetime.datetime):
@@ -127,7 +130,7 @@ def revert_action(db: Session, audit_log_id: int, user_id: int):
                 # Restore previous values
                 if device:
                     for key, value in snapshot_before.items():
-                        if key not in ['id', 'deleted_at', 'deleted_by_user_id']:
+                        if key not in ['id', 'deleted_at', 'deleted_by_user_id', 'current_assignment_id', 'current_employee_id']:
                             setattr(device, key, value)
                 else:
                     return False, "Device not found"
@@ -163,6 +166,7 @@ def revert_action(db: Session, audit_log_id: int, user_id: int):
                     device = assignment.device
                     if device:
                         device.status = models.DeviceStatus.AVAILABLE
+                        crud.set_current_assignment(device, None)
                 else:
                     return False, "Assignment not found or already returned"
             
@@ -174,6 +178,7 @@ def revert_action(db: Session, audit_log_id: int, user_id: int):
                     device = assignment.device
                     if device:
                         device.status = models.DeviceStatus.ASSIGNED
+                        crud.set_current_assignment(device, assignment)
                 else:
                     return False, "Assignment not found or not returned"
         
@@ -0,0 +1,141 @@
+"""
+Bulk acta generation: every (pending) assignment acta matching a filter,
+rendered in a process pool and streamed back as one ZIP.
+
+The selection reuses routes.actas_status (same pending/signed rules as the
+status screen). Each render runs in a pool process with its own DB session and
+returns the .docx bytes; the parent adds every finished document to the ZIP
+stream as soon as it arrives (utils.zip_stream), so the archive is never
+staged on disk and only a few documents are held in memory at a time.
+
+Workers: BULK_ACTA_WORKERS (default: number of CPUs). The pool is created on
+first use and kept for the life of the process, so template compilation
+(utils.template_cache) is warm for the following bulk downloads.
+"""
+import os
+import threading
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from utils import process_pool
+from utils.zip_stream import ZipStream
+
+BULK_WORKERS = int(os.getenv("BULK_ACTA_WORKERS", "0")) or os.cpu_count() or 2
+
+# Renders submitted per worker ahead of the ZIP writer (bounds memory)
+IN_FLIGHT_PER_WORKER = 2
+
+ACTA_TYPES = ("computer", "mobile")
+
+# actas_status record type -> acta type
+STATUS_TYPES = {"assignment_computer": "computer", "assignment_mobile": "mobile"}
+
+def select_actas(db, location: str = None, pending_only: bool = True, acta_type: str = None, search: str = None):
+    """
+    [{assignment_id, employee_id, employee_name, type}] for the assignment actas
+    that match the filter, as listed by GET /actas-status/.
+    """
+    from routes import actas_status
+
+    status = actas_status.get_actas_status(status_filter="pending" if pending_only else None, search=search, db=db)
+    selected = []
+    for key, kind in STATUS_TYPES.items():
+        if acta_type and kind != acta_type:
+            continue
+        for record in status[key]:
+            if location and (record["employee_location"] or "").lower() != location.lower():
+                continue
+            selected.append({
+                "assignment_id": record["assignment_id"],
+                "employee_id": record["employee_id"],
+                "employee_name": record["employee_name"],
+                "type": kind,
+            })
+    return selected
+
+def render_acta(assignment_id: int, acta_type: str, output_format: str = "docx"):
+    """Render one acta and return [(filename, docx or pdf bytes)]. Executed in a pool process."""
+    import database, models
+    import services.data_versions  # keep table versions/ETags right if a render writes
+    from routes.assignments import render_assignment_actas
+    from utils import pdf_render
+
+    db = database.SessionLocal()
+    try:
+        assignment = db.query(models.Assignment).filter(models.Assignment.id == assignment_id).first()
+        if not assignment or not assignment.employee:
+            raise ValueError(f"Assignment {assignment_id} not found")
+        documents = []
+        # Paths are render-cache entries: unchanged actas are not rendered again
+        for path, filename in render_assignment_actas(db, assignment, (acta_type,)):
+            if output_format == "pdf":
+                path, filename = pdf_render.ensure_pdf(path), pdf_render.pdf_filename(filename)
+            with open(path, "rb") as f:
+                documents.append((filename, f.read()))
+        return documents
+    finally:
+        db.close()
+
+_pool = None
+_lock = threading.Lock()
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = process_pool.new_spawn_pool(BULK_WORKERS)
+    return _pool
+
+def stream_actas_zip(actas: list, pool: ProcessPoolExecutor = None, output_format: str = "docx"):
+    """
+    Generator of ZIP bytes with one .docx (or .pdf) per rendered acta, in completion order.
+    Actas that fail are listed in ERRORES.txt at the end of the archive (the
+    response has already started, so a failure can't become an HTTP error).
+    """
+    pool = pool or get_pool()
+    zip_stream = ZipStream()
+    pending = iter(actas)
+    running = {}
+    errors = []
+    max_in_flight = BULK_WORKERS * IN_FLIGHT_PER_WORKER
+    started = datetime.now()
+
+    def submit_next():
+        acta = next(pending, None)
+        if acta is not None:
+            running[pool.submit(render_acta, acta["assignment_id"], acta["type"], output_format)] = acta
+        return acta is not None
+
+    try:
+        while len(running) < max_in_flight and submit_next():
+            pass
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                acta = running.pop(future)
+                try:
+                    documents = future.result()
+                    if not documents:
+                        raise ValueError("No devices of this type")
+                    for filename, data in documents:
+                        # .docx is already deflated; PDFs still compress
+                        zip_stream.add(filename, data, compression=zipfile.ZIP_DEFLATED if output_format == "pdf" else zipfile.ZIP_STORED)
+                except Exception as e:
+                    if not isinstance(e, ValueError):
+                        traceback.print_exception(e)
+                    errors.append(f"{acta['employee_name']} (asignación {acta['assignment_id']}, {acta['type']}): {e}")
+                submit_next()
+            chunk = zip_stream.drain()
+            if chunk:
+                yield chunk
+        if errors:
+            zip_stream.add("ERRORES.txt", "\r\n".join(errors).encode("utf-8"))
+        yield zip_stream.close()
+        print(f"DEBUG: Bulk actas ZIP: {len(actas) - len(errors)} ok, {len(errors)} errors "
+              f"in {(datetime.now() - started).total_seconds():.1f}s")
+    finally:
+        # Client disconnected (or error): drop renders that haven't started
+        for future in running:
+            future.cancel()
@@ -0,0 +1,161 @@
+"""
+Per-table data versions and conditional GETs (ETag / If-None-Match).
+
+Every ORM flush (and every ORM bulk UPDATE/DELETE such as query.update()) records
+the tables it touched; once the session commits, their rows in `data_versions` are
+bumped in a short transaction of their own. Bumping inside the writer's transaction
+held the counter row lock until commit, which serialized every writer of a table
+and could deadlock writers touching the same tables in a different order. The
+counters are locked in table_name order for the same reason. (Between the commit
+and the bump a reader can still get the previous ETag for a moment; the next
+request sees the new one.) Read endpoints declare the tables they depend on with
+`dependencies=[Depends(etag_guard(...))]`; the guard builds a weak ETag from those
+versions plus the request path and query string, and answers a matching
+If-None-Match with 304 before the endpoint runs its queries.
+
+Raw SQL writes (text()) do not go through the ORM and are not versioned; scripts
+that use them should call bump_versions() themselves.
+"""
+import hashlib
+from typing import Iterable
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.orm import Session
+from database import get_db
+import models
+
+DataVersion = models.DataVersion
+
+def _insert_missing(connection, table_name: str):
+    """Create the counter row for a table, tolerating a concurrent insert."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        connection.execute(insert(DataVersion).values(table_name=table_name, version=1))
+        return
+    connection.execute(
+        dialect_insert(DataVersion)
+        .values(table_name=table_name, version=1)
+        .on_conflict_do_nothing(index_elements=["table_name"])
+    )
+
+def bump_versions(connection, table_names: Iterable[str]):
+    """Increment the version of each table (creating missing counters)."""
+    table_names = sorted(set(table_names) - {DataVersion.__tablename__})
+    if not table_names:
+        return
+    # Lock the counters in a fixed order first: two bumps of overlapping table sets
+    # then wait for each other instead of deadlocking (FOR UPDATE is a no-op on SQLite)
+    existing = set(connection.execute(
+        select(DataVersion.table_name)
+        .where(DataVersion.table_name.in_(table_names))
+        .order_by(DataVersion.table_name)
+        .with_for_update()
+    ).scalars())
+    if existing:
+        connection.execute(
+            update(DataVersion)
+            .where(DataVersion.table_name.in_(existing))
+            .values(version=DataVersion.version + 1)
+        )
+    for table_name in table_names:
+        if table_name not in existing:
+            _insert_missing(connection, table_name)
+
+PENDING_KEY = "data_versions_pending"
+
+def _mark_pending(session, tables):
+    session.info.setdefault(PENDING_KEY, set()).update(tables)
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    tables = set()
+    for obj in list(session.new) + list(session.deleted):
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(obj.__table__.name)
+    if tables:
+        _mark_pending(session, tables)
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    """Bump the tables this transaction wrote, in a separate short transaction."""
+    tables = session.info.pop(PENDING_KEY, None)
+    if not tables:
+        return
+    bind = session.get_bind()
+    engine = getattr(bind, "engine", bind)
+    try:
+        with engine.begin() as connection:
+            bump_versions(connection, tables)
+    except Exception as e:
+        # The write is already committed; a missed bump only delays ETag changes until the next write
+        print(f"WARNING: Could not bump data versions for {sorted(tables)}: {e}")
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    # Only when the whole transaction is rolled back; a savepoint rollback keeps
+    # the outer transaction's pending tables (an extra bump is harmless)
+    if previous_transaction.parent is None and previous_transaction.nested is False:
+        session.info.pop(PENDING_KEY, None)
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    # query.update()/query.delete() and ORM-enabled insert/update/delete() statements bypass the flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return None
+    result = orm_execute_state.invoke_statement()
+    _mark_pending(orm_execute_state.session, {mapper.local_table.name})
+    return result
+
+def current_versions(db: Session, table_names: Iterable[str]) -> dict:
+    """Current version per table (0 for tables never written)."""
+    table_names = sorted(set(table_names))
+    rows = db.execute(
+        select(DataVersion.table_name, DataVersion.version)
+        .where(DataVersion.table_name.in_(table_names))
+    ).all()
+    versions = dict(rows)
+    return {name: versions.get(name, 0) for name in table_names}
+
+def compute_etag(request: Request, versions: dict) -> str:
+    """Weak ETag over the request path, query parameters and table versions."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    state = ",".join(f"{name}:{version}" for name, version in sorted(versions.items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}|{state}".encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on both sides
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def etag_guard(*table_names: str):
+    """
+    Route dependency: set the ETag for the response, or short-circuit with 304
+    when the client's If-None-Match still matches the current table versions.
+    """
+    def dependency(request: Request, response: Response, db: Session = Depends(get_db)):
+        etag = compute_etag(request, current_versions(db, table_names))
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
@@ -0,0 +1,85 @@
+"""
+Device search for the inventory list.
+
+On PostgreSQL with the pg_trgm extension (see migrations/add_search_trigram_indexes.py)
+the ILIKE predicates below are served by GIN trigram indexes and results are ranked by
+trigram word similarity. Without the extension (e.g. SQLite) the same predicates run as
+plain ILIKE filters and no ranking is applied.
+"""
+from sqlalchemy import or_, func, select, text, cast, Numeric
+from sqlalchemy.orm import Session
+import models
+
+# Device columns matched by the search box (each has a gin_trgm_ops index)
+DEVICE_SEARCH_COLUMNS = [
+    models.Device.device_type,
+    models.Device.serial_number,
+    models.Device.brand,
+    models.Device.model,
+    models.Device.hostname,
+    models.Device.inventory_code,
+]
+
+# Current assignee columns matched by the search box (each has a gin_trgm_ops index)
+EMPLOYEE_SEARCH_COLUMNS = [
+    models.Employee.full_name,
+    models.Employee.dni,
+]
+
+# Extension availability per database URL, checked once per process
+_trigram_support = {}
+
+def trigram_available(db: Session) -> bool:
+    """Return True if the connected database has pg_trgm installed."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _trigram_support:
+        available = False
+        if bind.dialect.name == "postgresql":
+            try:
+                available = db.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).first() is not None
+            except Exception as e:
+                print(f"WARNING: Could not check pg_trgm extension: {e}")
+                db.rollback()
+        _trigram_support[key] = available
+    return _trigram_support[key]
+
+def device_search_filter(search: str):
+    """
+    WHERE clause matching devices by their own columns or by the name/DNI of the
+    employee currently holding them (Device.current_employee_id).
+    The assignee match is a semi-join (current_employee_id IN ...) so the employee
+    trigram indexes drive it instead of a correlated EXISTS per device.
+    """
+    pattern = f"%{search}%"
+    matching_employees = select(models.Employee.id).where(
+        or_(*[column.ilike(pattern) for column in EMPLOYEE_SEARCH_COLUMNS])
+    )
+    return or_(
+        *[column.ilike(pattern) for column in DEVICE_SEARCH_COLUMNS],
+        models.Device.current_employee_id.in_(matching_employees)
+    )
+
+def device_search_rank(search: str):
+    """
+    Relevance score (0..1, higher is better) of a device for the search term:
+    the best trigram word similarity across device and current-assignee columns.
+    Only valid when trigram_available() is True.
+    word_similarity() is a float4; the score is cast to numeric so it survives a
+    round trip through a pagination cursor exactly (ties compare equal).
+    """
+    device_scores = [
+        func.word_similarity(search, func.coalesce(column, ''))
+        for column in DEVICE_SEARCH_COLUMNS
+    ]
+    assignee_score = select(
+        func.greatest(*[
+            func.word_similarity(search, func.coalesce(column, ''))
+            for column in EMPLOYEE_SEARCH_COLUMNS
+        ])
+    ).where(
+        models.Employee.id == models.Device.current_employee_id
+    ).scalar_subquery()
+    return cast(func.greatest(*device_scores, func.coalesce(assignee_score, 0)), Numeric(7, 6))
@@ -0,0 +1,343 @@
+"""
+Background document (acta) generation jobs.
+
+POST /documents/jobs enqueues a render and returns a job id; the render runs in
+a process pool instead of the request thread, and the client polls the job (or
+follows it with SSE) and downloads the result when it is done.
+
+Queue: a local SQLite file (DOCUMENT_JOBS_PATH, default cache/document_jobs.sqlite3),
+so no external broker is needed. Every API worker on the host shares it and jobs
+are claimed atomically, so several processes can dispatch from the same queue.
+
+Workers: each API process starts a dispatcher thread on first use that keeps up
+to DOCUMENT_JOB_WORKERS (default 2) renders running in a process pool. Set it to 0
+to only enqueue from the API and run a dedicated worker instead:
+
+    python -m services.document_jobs
+
+Job kinds reuse the on-demand acta endpoints (see JOB_KINDS); each render opens
+its own DB session in the worker process. The assignment acta endpoint streams a
+ZIP when the employee has both a computer and a mobile acta, so that job has its
+own runner (render_assignment_acta) that writes the ZIP to generated_pdfs instead.
+"""
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from utils import process_pool
+
+JOBS_PATH = os.getenv("DOCUMENT_JOBS_PATH", "cache/document_jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("DOCUMENT_JOB_WORKERS", "2"))
+
+# Where multi-file results (ZIPs) are written; swept by services.storage like other generated files
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generated_pdfs")
+
+# A job still "running" after this long is assumed lost (worker killed) and requeued
+STALE_JOB_SECONDS = int(os.getenv("DOCUMENT_JOB_STALE_SECONDS", "900"))
+MAX_ATTEMPTS = 3
+
+FINISHED_STATUSES = ("done", "failed")
+
+# kind -> (module, endpoint function, required params)
+JOB_KINDS = {
+    "assignment_acta": ("services.document_jobs", "render_assignment_acta", ("assignment_id",)),
+    "termination_acta_computer": ("routes.terminations", "download_computer_acta", ("termination_id",)),
+    "termination_acta_mobile": ("routes.terminations", "download_mobile_acta", ("termination_id",)),
+    "sale_acta": ("routes.sales", "generate_sale_acta", ("sale_id",)),
+}
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+class JobStore:
+    """Jobs table in a SQLite file shared by every process on the host."""
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS document_jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " result_path TEXT,"
+                " result_filename TEXT,"
+                " media_type TEXT,"
+                " error TEXT,"
+                " created_by TEXT,"
+                " created_at TEXT NOT NULL,"
+                " started_at TEXT,"
+                " finished_at TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_document_jobs_status_created ON document_jobs (status, created_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Autocommit; multi-statement operations open their own BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def create(self, kind: str, params: dict, created_by: str = None) -> dict:
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO document_jobs (id, kind, params, status, created_by, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), created_by, _now())
+            )
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        conn = self._connect()
+        try:
+            return self._to_dict(conn.execute("SELECT * FROM document_jobs WHERE id = ?", (job_id,)).fetchone())
+        finally:
+            conn.close()
+
+    def list(self, limit: int = 50, created_by: str = None):
+        conn = self._connect()
+        try:
+            if created_by:
+                rows = conn.execute(
+                    "SELECT * FROM document_jobs WHERE created_by = ? ORDER BY created_at DESC LIMIT ?", (created_by, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM document_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            return [self._to_dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def claim_next(self):
+        """Atomically move the oldest queued job to running and return it (or None)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM document_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE document_jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (_now(), row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def finish(self, job_id: str, result_path: str, result_filename: str, media_type: str):
+        self._update(job_id, status="done", result_path=result_path, result_filename=result_filename,
+                     media_type=media_type, error=None, finished_at=_now())
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error, finished_at=_now())
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE document_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def requeue_stale(self, max_age_seconds: int = STALE_JOB_SECONDS) -> int:
+        """Requeue jobs left running by a dead worker (or fail them after MAX_ATTEMPTS)."""
+        cutoff = datetime.fromtimestamp(time.time() - max_age_seconds).isoformat(timespec="seconds")
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE document_jobs SET status = 'failed', error = 'Worker lost', finished_at = ? "
+                "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (_now(), cutoff, MAX_ATTEMPTS)
+            )
+            return conn.execute(
+                "UPDATE document_jobs SET status = 'queued' WHERE status = 'running' AND started_at < ?",
+                (cutoff,)
+            ).rowcount
+        finally:
+            conn.close()
+
+def validate_job(kind: str, params: dict) -> dict:
+    """Check kind/params and normalize ids to int. Raises ValueError with a message."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'. Allowed: {', '.join(sorted(JOB_KINDS))}")
+    _, _, required = JOB_KINDS[kind]
+    missing = [name for name in required if params.get(name) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing params for '{kind}': {', '.join(missing)}")
+    try:
+        return {name: int(params[name]) for name in required}
+    except (TypeError, ValueError):
+        raise ValueError(f"Params for '{kind}' must be integer ids: {', '.join(required)}")
+
+def render_assignment_acta(assignment_id: int, db):
+    """assignment_acta job: the acta file, or a ZIP on disk when there are several."""
+    from fastapi.responses import FileResponse
+    from routes.assignments import assignment_acta_files
+    from utils import pdf_render, zip_stream
+
+    generated_files, zip_filename = assignment_acta_files(db, assignment_id)
+    if len(generated_files) == 1:
+        file_path, filename = generated_files[0]
+        return FileResponse(path=file_path, filename=filename, media_type=pdf_render.DOCX_MEDIA_TYPE)
+    zip_path = zip_stream.write_files(
+        generated_files, os.path.join(RESULTS_DIR, f"actas_{assignment_id}_{uuid.uuid4().hex}.zip")
+    )
+    return FileResponse(path=zip_path, filename=zip_filename, media_type="application/zip")
+
+def execute_job(job_id: str, store_path: str = JOBS_PATH):
+    """Run one claimed job. Executed in a pool process (also usable inline)."""
+    import importlib
+    from fastapi import HTTPException
+    import database
+    import services.data_versions  # keep table versions/ETags right if a render writes
+
+    store = JobStore(store_path)
+    job = store.get(job_id)
+    if job is None:
+        return
+    module_name, function_name, _ = JOB_KINDS[job["kind"]]
+    endpoint = getattr(importlib.import_module(module_name), function_name)
+
+    db = database.SessionLocal()
+    try:
+        kwargs = dict(job["params"], db=db)
+        if "current_user" in inspect.signature(endpoint).parameters:
+            kwargs["current_user"] = None
+        result = endpoint(**kwargs)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+        result_path = getattr(result, "path", None)
+        if not result_path or not os.path.exists(result_path):
+            raise RuntimeError("The render did not produce a file")
+        store.finish(job_id, os.path.abspath(result_path),
+                     getattr(result, "filename", None) or os.path.basename(result_path),
+                     getattr(result, "media_type", None) or "application/octet-stream")
+        print(f"DEBUG: Document job {job_id} ({job['kind']}) done: {result_path}")
+    except HTTPException as e:
+        store.fail(job_id, str(e.detail))
+    except Exception as e:
+        traceback.print_exc()
+        store.fail(job_id, str(e))
+    finally:
+        db.close()
+
+class JobDispatcher:
+    """Claims queued jobs and keeps up to `workers` of them running in a process pool."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = max(1, workers)
+        self._slots = threading.Semaphore(self.workers)
+        self._wakeup = threading.Event()
+        self._pool = process_pool.new_spawn_pool(self.workers)
+        self._thread = threading.Thread(target=self._run, name="document-job-dispatcher", daemon=True)
+
+    def start(self):
+        self.store.requeue_stale()
+        self._thread.start()
+
+    def notify(self):
+        """Wake the dispatcher right away (a job was just enqueued)."""
+        self._wakeup.set()
+
+    def run_forever(self):
+        self.store.requeue_stale()
+        self._run()
+
+    def _run(self):
+        last_stale_check = time.time()
+        while True:
+            self._slots.acquire()
+            try:
+                job = self.store.claim_next()
+            except Exception as e:
+                print(f"WARNING: Could not claim document job: {e}")
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wakeup.wait(timeout=1)
+                self._wakeup.clear()
+                if time.time() - last_stale_check > 60:
+                    self.store.requeue_stale()
+                    last_stale_check = time.time()
+                continue
+            future = self._pool.submit(execute_job, job["id"], self.store.path)
+            future.add_done_callback(lambda f, job_id=job["id"]: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: str, future):
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            # The worker process itself died (e.g. killed); the job never recorded its outcome
+            print(f"ERROR: Document job {job_id} crashed its worker: {error}")
+            self.store.fail(job_id, f"Worker crashed: {error}")
+
+_store = None
+_dispatcher = None
+_lock = threading.Lock()
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = JobStore(JOBS_PATH)
+    return _store
+
+def ensure_dispatcher():
+    """Start this process's dispatcher on first use (no-op when DOCUMENT_JOB_WORKERS=0)."""
+    global _dispatcher
+    if JOB_WORKERS <= 0:
+        return None
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                dispatcher = JobDispatcher(get_store(), JOB_WORKERS)
+                dispatcher.start()
+                _dispatcher = dispatcher
+    return _dispatcher
+
+def enqueue(kind: str, params: dict, created_by: str = None) -> dict:
+    job = get_store().create(kind, validate_job(kind, params), created_by)
+    dispatcher = ensure_dispatcher()
+    if dispatcher:
+        dispatcher.notify()
+    return job
+
+if __name__ == "__main__":
+    # Use the importable module so pool processes unpickle services.document_jobs.execute_job
+    from services import document_jobs
+    workers = int(os.getenv("DOCUMENT_JOB_WORKERS", "0")) or 2
+    print(f"[->] Document job worker: {workers} processes, queue {document_jobs.JOBS_PATH}")
+    document_jobs.JobDispatcher(document_jobs.get_store(), workers).run_forever()
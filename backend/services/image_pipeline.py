@@ -0,0 +1,244 @@
+"""
+Decommission photo processing off the event loop.
+
+process_and_save_image (EXIF rotate, YOLO, edge detection, JPEG encode) is CPU
+bound; called inside the async upload endpoint it froze every other request on
+that worker. Uploads are now handed to a process pool:
+
+    future = image_pipeline.submit(content, file_path)   # raises PipelineFull
+    await asyncio.wrap_future(future)                     # or poll job_status()
+
+Backpressure: at most IMAGE_QUEUE_SIZE images (running + waiting) per API
+process; beyond that submit() raises PipelineFull with a Retry-After estimate
+from the recent processing times, which the route turns into a 429.
+
+Workers: IMAGE_WORKERS (default 2) spawned processes, each loading its own
+detection model on first use (utils.object_detection). With YOLO_WARMUP=1,
+start_warmup() brings the workers up and loads the model at startup.
+
+Batch uploads (POST /decommission/upload-images) go through submit_batch():
+the images are split into chunks of IMAGE_BATCH_SIZE, each processed by one
+worker with a single batched detection pass (process_and_save_images).
+
+If a worker process dies (killed, out of memory) the pool is broken for good;
+the pipeline then starts a new pool and runs the affected task once more on it.
+Submits that find the pool broken do the same.
+
+Job state lives on disk so any API process can answer a poll: while an image
+is in the pipeline a `<file>.pending` marker sits next to its final path, and
+the job is done once the marker is gone.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from utils import process_pool
+
+IMAGE_WORKERS = max(1, int(os.getenv("IMAGE_WORKERS", "2")))
+QUEUE_SIZE = max(1, int(os.getenv("IMAGE_QUEUE_SIZE", "16")))
+# Images per worker task (and per detection pass) in batch uploads
+BATCH_SIZE = max(1, int(os.getenv("IMAGE_BATCH_SIZE", "8")))
+# Most images accepted by one batch upload request
+MAX_BATCH_FILES = max(1, int(os.getenv("IMAGE_BATCH_MAX_FILES", "50")))
+# Size limits of a batch upload, per image and for the whole request
+MAX_BATCH_FILE_BYTES = int(float(os.getenv("IMAGE_BATCH_MAX_FILE_MB", "20")) * 1024 * 1024)
+MAX_BATCH_BYTES = int(float(os.getenv("IMAGE_BATCH_MAX_MB", "200")) * 1024 * 1024)
+
+PENDING_SUFFIX = ".pending"
+
+# Processing time per image assumed for Retry-After until real timings are known
+DEFAULT_IMAGE_SECONDS = 2.0
+
+class PipelineFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Image pipeline is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+def pending_marker(save_path: str) -> str:
+    return save_path + PENDING_SUFFIX
+
+def _init_worker():
+    from utils import object_detection
+    if object_detection.WARMUP_AT_STARTUP:
+        object_detection.warmup()
+
+def process_image(content: bytes, save_path: str) -> tuple:
+    """Executed in a pool process. Returns (process_and_save_image result, seconds spent)."""
+    from utils.image_processing import process_and_save_image
+    started = time.perf_counter()
+    ok = process_and_save_image(content, save_path)
+    return ok, time.perf_counter() - started
+
+def process_images(items: list) -> tuple:
+    """Executed in a pool process. Returns (process_and_save_images results, seconds spent)."""
+    from utils.image_processing import process_and_save_images
+    started = time.perf_counter()
+    results = process_and_save_images(items)
+    return results, time.perf_counter() - started
+
+def chunks(items: list) -> list:
+    """Split a batch upload into submit_batch() tasks (never larger than the queue)."""
+    size = min(BATCH_SIZE, QUEUE_SIZE)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _noop():
+    return os.getpid()
+
+class ImagePipeline:
+    """Process pool with a bounded number of images in flight."""
+
+    def __init__(self, workers: int = IMAGE_WORKERS, queue_size: int = QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_seconds = DEFAULT_IMAGE_SECONDS
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return process_pool.new_spawn_pool(self.workers, initializer=_init_worker)
+
+    def _replace_pool(self, broken):
+        """Start a new pool if `broken` is still the current one; returns the current pool."""
+        with self._lock:
+            replaced = self._pool is broken
+            if replaced:
+                self._pool = self._new_pool()
+            pool = self._pool
+        if replaced:
+            print("WARNING: Image worker pool broken (a worker died), started a new one")
+            broken.shutdown(wait=False)
+        return pool
+
+    def _pool_submit(self, fn, args) -> tuple:
+        """(pool, future) of fn(*args); a broken pool is replaced and the submit tried once more."""
+        pool = self._pool
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool:
+            pool = self._replace_pool(pool)
+            return pool, pool.submit(fn, *args)
+
+    def retry_after(self) -> int:
+        """Seconds the workers need to get through the images already queued."""
+        with self._lock:
+            return max(1, math.ceil(self._avg_seconds * self._in_flight / self.workers))
+
+    def submit(self, content: bytes, save_path: str):
+        """Queue one image; returns a concurrent.futures.Future of process_image's result."""
+        return self._submit(process_image, [(content, save_path)], content, save_path)
+
+    def submit_batch(self, items: list):
+        """
+        Queue [(content, save_path)] as one task (one detection pass); returns a Future of
+        process_images' result. All or nothing: PipelineFull if they don't all fit.
+        """
+        return self._submit(process_images, items, items)
+
+    def _submit(self, fn, items: list, *args):
+        with self._lock:
+            full = self._in_flight + len(items) > self.queue_size
+            if not full:
+                self._in_flight += len(items)
+        if full:
+            raise PipelineFull(self.retry_after())
+        for _, save_path in items:
+            open(pending_marker(save_path), "wb").close()
+        result = Future()
+        try:
+            self._dispatch(result, fn, items, args, retries=1)
+        except Exception:
+            self._release(len(items))
+            for _, save_path in items:
+                _remove(pending_marker(save_path))
+            raise
+        return result
+
+    def _dispatch(self, result, fn, items: list, args: tuple, retries: int):
+        pool, future = self._pool_submit(fn, args)
+        future.add_done_callback(lambda f: self._on_done(f, pool, result, fn, items, args, retries))
+
+    def _release(self, count: int, seconds: float = None):
+        with self._lock:
+            self._in_flight -= count
+            if seconds is not None:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds / count
+
+    def _on_done(self, future, pool, result, fn, items: list, args: tuple, retries: int):
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A worker died with this task in flight: run it again on a new pool
+            self._replace_pool(pool)
+            if retries > 0:
+                print(f"WARNING: Image worker died, retrying {len(items)} image(s) on a new pool")
+                try:
+                    self._dispatch(result, fn, items, args, retries - 1)
+                    return
+                except Exception as e:
+                    error = e
+        self._release(len(items), future.result()[1] if not future.cancelled() and error is None else None)
+        for content, save_path in items:
+            if error is not None:
+                # The worker process died (e.g. killed): keep the original, like process_and_save_image does on errors
+                print(f"ERROR: Image worker crashed processing {save_path}: {error}")
+                with open(save_path, "wb") as f:
+                    f.write(content)
+            _remove(pending_marker(save_path))
+        if future.cancelled():
+            result.cancel()
+        elif error is not None:
+            result.set_exception(error)
+        else:
+            result.set_result(future.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "queue_size": self.queue_size, "in_flight": self._in_flight,
+                    "avg_seconds": round(self._avg_seconds, 3)}
+
+    def warmup(self):
+        """Start every worker process (their initializer loads the model when YOLO_WARMUP is set)."""
+        for _, future in [self._pool_submit(_noop, ()) for _ in range(self.workers)]:
+            future.result()
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline() -> ImagePipeline:
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = ImagePipeline()
+    return _pipeline
+
+def submit(content: bytes, save_path: str):
+    return get_pipeline().submit(content, save_path)
+
+def submit_batch(items: list):
+    return get_pipeline().submit_batch(items)
+
+def job_status(save_path: str):
+    """'processing' while the image is in the pipeline, 'done' once saved, None if unknown."""
+    if os.path.exists(pending_marker(save_path)):
+        return "processing"
+    if os.path.exists(save_path):
+        return "done"
+    return None
+
+def start_warmup():
+    """Startup hook: with YOLO_WARMUP=1, start the workers and load their model in the background."""
+    from utils import object_detection
+    if not object_detection.WARMUP_AT_STARTUP:
+        return None
+    thread = threading.Thread(target=lambda: get_pipeline().warmup(), name="image-pipeline-warmup", daemon=True)
+    thread.start()
+    return thread
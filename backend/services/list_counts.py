@@ -0,0 +1,127 @@
+"""
+Total counts for paginated list endpoints (`count=` query parameter).
+
+- exact:    COUNT(*) over the filtered query on every request (default, previous behaviour).
+- estimate: on PostgreSQL, the planner's row estimate for the filtered query when it is
+            large enough for an exact count to be expensive; otherwise an exact count
+            cached per endpoint + filter signature for ESTIMATE_TTL_SECONDS.
+- none:     no count at all; the endpoint fetches limit + 1 rows and reports `has_more`.
+"""
+import json
+import threading
+from math import ceil
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, Query
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+# How long a cached count is served before it is recomputed
+ESTIMATE_TTL_SECONDS = 30
+
+# Below this many estimated rows an exact count is cheap, so use it (and cache it)
+PLANNER_ESTIMATE_MIN_ROWS = 10000
+
+# Most cached counts kept per process (signatures include free search text)
+COUNT_CACHE_MAX_ENTRIES = 2048
+
+# (scope, signature) -> (expires_at, total), least recently used first
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def validate_count_mode(count: str) -> str:
+    if count not in COUNT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid count mode '{count}'. Use one of: {', '.join(COUNT_MODES)}"
+        )
+    return count
+
+def _count_query(query: Query) -> Query:
+    """Strip ordering and eager loads; neither changes the number of rows."""
+    return query.order_by(None).enable_eagerloads(False)
+
+def planner_row_estimate(db: Session, query: Query) -> Optional[int]:
+    """Row estimate from EXPLAIN on PostgreSQL, None elsewhere or on failure."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        compiled = _count_query(query).statement.compile(dialect=bind.dialect)
+        raw = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        print(f"WARNING: Could not read planner estimate: {e}")
+        db.rollback()
+        return None
+
+def count_total(db: Session, query: Query, count: str, scope: str, signature: Hashable):
+    """
+    Total rows for `query` according to the count mode.
+    `scope` names the endpoint and `signature` identifies its filters (used as the cache key).
+    Returns (total, is_estimate); total is None for count=none.
+    """
+    if count == "none":
+        return None, False
+    if count == "exact":
+        return _count_query(query).count(), False
+
+    key = (scope, signature)
+    now = time.monotonic()
+    cached = _cached_count(key, now)
+    if cached is not None:
+        return cached, True
+
+    estimate = planner_row_estimate(db, query)
+    if estimate is not None and estimate >= PLANNER_ESTIMATE_MIN_ROWS:
+        total = estimate
+    else:
+        total = _count_query(query).count()
+
+    with _count_cache_lock:
+        _count_cache[key] = (now + ESTIMATE_TTL_SECONDS, total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.popitem(last=False)
+    return total, True
+
+def _cached_count(key, now: float) -> Optional[int]:
+    """Fresh cached total for `key`, or None (expired entries are dropped)."""
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del _count_cache[key]
+            return None
+        _count_cache.move_to_end(key)
+        return entry[1]
+
+def fetch_page(query: Query, skip: int, limit: int, count: str):
+    """
+    Fetch one offset page. With count=none one extra row is read to detect
+    whether another page exists. Returns (rows, has_more or None).
+    """
+    if count != "none":
+        return query.offset(skip).limit(limit).all(), None
+    rows = query.offset(skip).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def page_metadata(total: Optional[int], is_estimate: bool, has_more: Optional[bool], skip: int, limit: int) -> dict:
+    """Pagination fields shared by the list endpoints."""
+    if total is None:
+        return {"skip": skip, "limit": limit, "has_more": has_more}
+    metadata = {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "pages": ceil(total / limit) if limit > 0 else 0
+    }
+    if is_estimate:
+        metadata["total_is_estimate"] = True
+    return metadata
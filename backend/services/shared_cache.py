@@ -0,0 +1,198 @@
+"""
+Shared cache for computed dashboard data (e.g. /analytics/).
+
+Entries live in a namespace; write routes call `invalidate(namespace)` after
+committing so every worker drops its copy instead of waiting for the TTL.
+
+Backends (ANALYTICS_CACHE_BACKEND):
+- lru:      in-process LRU dict. Invalidations only reach the current worker.
+- sqlite:   entries in a local SQLite file (ANALYTICS_CACHE_PATH) shared by all
+            workers on the same host; an invalidation deletes the rows.
+- postgres: in-process LRU per worker, invalidations broadcast to every worker
+            (on any host) with LISTEN/NOTIFY on the application database.
+- auto:     postgres when the database is PostgreSQL, lru otherwise (default).
+"""
+import json
+import os
+import select
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ANALYTICS_NAMESPACE = "analytics"
+
+CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+
+NOTIFY_CHANNEL = "shared_cache_invalidate"
+
+class LRUCacheBackend:
+    """Per-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value, ttl: int = CACHE_TTL_SECONDS):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time() + ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+class SQLiteCacheBackend:
+    """Entries stored as JSON in a SQLite file shared by the workers of one host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, namespace: str, key: str):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value, ttl: int = CACHE_TTL_SECONDS):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), time.time() + ttl)
+                )
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        finally:
+            conn.close()
+
+    def invalidate(self, namespace: str):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        finally:
+            conn.close()
+
+class PostgresNotifyCacheBackend:
+    """
+    Per-process LRU whose invalidations are broadcast with NOTIFY; a daemon thread
+    in every worker LISTENs and drops the namespace locally. If the listener loses
+    its connection it reconnects; meanwhile entries still expire after the TTL.
+    """
+
+    def __init__(self, engine, max_entries: int = 256):
+        self.engine = engine
+        self.local = LRUCacheBackend(max_entries)
+        self._listener = threading.Thread(target=self._listen, name="shared-cache-listener", daemon=True)
+        self._listener.start()
+
+    def get(self, namespace: str, key: str):
+        return self.local.get(namespace, key)
+
+    def set(self, namespace: str, key: str, value, ttl: int = CACHE_TTL_SECONDS):
+        self.local.set(namespace, key, value, ttl)
+
+    def invalidate(self, namespace: str):
+        self.local.invalidate(namespace)
+        try:
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("SELECT pg_notify(%(channel)s, %(namespace)s)",
+                                     {"channel": NOTIFY_CHANNEL, "namespace": namespace})
+        except Exception as e:
+            print(f"WARNING: Could not publish cache invalidation: {e}")
+
+    def _listen(self):
+        while True:
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                dbapi_conn = raw.driver_connection
+                dbapi_conn.autocommit = True
+                with dbapi_conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select.select([dbapi_conn], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notification = dbapi_conn.notifies.pop(0)
+                        self.local.invalidate(notification.payload)
+            except Exception as e:
+                print(f"WARNING: Cache invalidation listener disconnected: {e}")
+                time.sleep(5)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+
+_cache_backend = None
+_cache_backend_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide cache backend, created on first use from ANALYTICS_CACHE_BACKEND."""
+    global _cache_backend
+    if _cache_backend is None:
+        with _cache_backend_lock:
+            if _cache_backend is None:
+                _cache_backend = _create_backend(os.getenv("ANALYTICS_CACHE_BACKEND", "auto").lower())
+    return _cache_backend
+
+def _create_backend(name: str):
+    from database import engine
+
+    if name == "auto":
+        name = "postgres" if engine.dialect.name == "postgresql" else "lru"
+    if name == "sqlite":
+        return SQLiteCacheBackend(os.getenv("ANALYTICS_CACHE_PATH", "cache/shared_cache.sqlite3"))
+    if name == "postgres":
+        return PostgresNotifyCacheBackend(engine)
+    if name != "lru":
+        print(f"WARNING: Unknown ANALYTICS_CACHE_BACKEND '{name}', using in-process LRU")
+    return LRUCacheBackend()
+
+def invalidate(namespace: str = ANALYTICS_NAMESPACE):
+    """Drop a namespace in every worker. Call after committing a write."""
+    try:
+        get_cache().invalidate(namespace)
+    except Exception as e:
+        # A failed invalidation must never fail the write; the TTL still applies
+        print(f"WARNING: Cache invalidation failed for '{namespace}': {e}")
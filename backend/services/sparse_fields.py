@@ -0,0 +1,40 @@
+"""
+Sparse fieldsets (`?fields=a,b,c`) for list endpoints.
+
+Instead of loading ORM objects (and their relationships), the endpoint selects
+only the requested columns as row tuples and turns them into plain dicts, which
+are then serialized with utils.fast_json.ORJSONResponse.
+"""
+from typing import Dict, Iterable, List
+from fastapi import HTTPException
+from sqlalchemy import inspect
+
+def column_fields(model) -> Dict[str, object]:
+    """Map of column attribute name -> instrumented attribute for a model."""
+    return {attr.key: getattr(model, attr.key) for attr in inspect(model).column_attrs}
+
+def parse_fields(fields: str, allowed: Iterable[str]) -> List[str]:
+    """
+    Validate a comma separated field list. `id` is always included (first) so
+    clients can key rows and related data can be attached.
+    """
+    allowed = set(allowed)
+    names = ["id"]
+    unknown = []
+    for name in (f.strip() for f in fields.split(",")):
+        if not name or name in names:
+            continue
+        if name not in allowed:
+            unknown.append(name)
+        else:
+            names.append(name)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}"
+        )
+    return names
+
+def rows_to_dicts(rows, names: List[str]) -> List[dict]:
+    """Row tuples -> dicts keyed by the selected field names."""
+    return [dict(zip(names, row)) for row in rows]
@@ -0,0 +1,305 @@
+"""
+Housekeeping for generated and temporary files.
+
+generated_pdfs/, actas/, templates/temp/ (uploads and previews from
+routes/templates.py) and uploads/decommission/ are written on every acta and
+upload and never cleaned up by the routes. A sweep:
+
+1. syncs the `stored_files` table with the disk (new files are registered with
+   their mtime as last access, vanished ones dropped, sizes refreshed);
+2. deletes temp files not accessed for STORAGE_TEMP_MAX_AGE_HOURS;
+3. if the tracked total is over STORAGE_BUDGET_MB, deletes the least recently
+   accessed files until it fits.
+
+Files still referenced from the database (PROTECTED_COLUMNS, compared by path
+and by file name, so relative paths and URLs count too) and the acta copies
+of referenced photos (utils.image_derivatives) are never deleted,
+and neither is anything accessed in the last STORAGE_MIN_AGE_SECONDS (a file
+that was just generated may not be saved on its row yet).
+
+A dry run (GET /storage/report, --dry-run) computes the same plan without
+writing anything; the table is only synced by real sweeps.
+
+Downloads call record_access() so a file served again moves to the back of
+the eviction order. Each API process sweeps every STORAGE_SWEEP_SECONDS
+(default 3600, 0 disables it) on a daemon thread; it can also run from cron:
+
+    python -m services.storage [--dry-run]
+"""
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+import database, models
+from utils import image_derivatives
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# area -> directory (as written by pdf_generator and the routes)
+AREAS = {
+    "generated_pdfs": os.path.join(BACKEND_DIR, "generated_pdfs"),
+    "actas": os.path.join(BACKEND_DIR, "actas"),
+    "templates_temp": "templates/temp",
+    "decommission_uploads": "uploads/decommission",
+}
+
+# Areas whose files are only needed for a short while (previews, pending uploads)
+TEMP_AREAS = ("templates_temp",)
+
+# Columns that point at files which must be kept
+PROTECTED_COLUMNS = (
+    models.Assignment.pdf_acta_path,
+    models.Assignment.return_acta_computer_path,
+    models.Assignment.return_acta_mobile_path,
+    models.Termination.computer_acta_path,
+    models.Termination.mobile_acta_path,
+    models.Sale.acta_path,
+    models.Decommission.acta_path,
+    models.Decommission.device_image_path,
+    models.Decommission.serial_image_path,
+    models.DocumentTemplate.file_path,
+)
+
+BUDGET_BYTES = int(float(os.getenv("STORAGE_BUDGET_MB", "2048")) * 1024 * 1024)
+MIN_AGE_SECONDS = int(os.getenv("STORAGE_MIN_AGE_SECONDS", "3600"))
+TEMP_MAX_AGE_HOURS = float(os.getenv("STORAGE_TEMP_MAX_AGE_HOURS", "24"))
+SWEEP_SECONDS = int(os.getenv("STORAGE_SWEEP_SECONDS", "3600"))
+
+# Delay of the first sweep after startup
+FIRST_SWEEP_DELAY_SECONDS = 60
+
+StoredFile = models.StoredFile
+
+_sweep_lock = threading.Lock()
+_last_sweep = None
+_thread = None
+_thread_lock = threading.Lock()
+
+def _normalize(path: str) -> str:
+    return os.path.realpath(os.path.abspath(path))
+
+def _scan() -> dict:
+    """{absolute path: (area, size, mtime)} of every file in AREAS."""
+    files = {}
+    for area, directory in AREAS.items():
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = _normalize(os.path.join(root, name))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (area, stat.st_size, stat.st_mtime)
+    return files
+
+def _referenced(db) -> tuple:
+    """(absolute paths, file names) referenced from PROTECTED_COLUMNS."""
+    paths, names = set(), set()
+    for column in PROTECTED_COLUMNS:
+        for (value,) in db.query(column).filter(column.isnot(None), column != "").distinct():
+            value = value.strip()
+            paths.add(_normalize(value))
+            names.add(os.path.basename(value.replace("\\", "/")))
+    return paths, names
+
+def _original_name(path: str):
+    """File name (without extension) of the photo a derivative was made from, else None."""
+    name = os.path.basename(path)
+    return name.split(image_derivatives.SUFFIX)[0] if image_derivatives.is_derivative(name) else None
+
+def _tracked(db) -> dict:
+    """{path: row mapping} of stored_files."""
+    return {row.path: row for row in db.execute(select(StoredFile.__table__)).mappings()}
+
+def _sync_plan(rows: dict, files: dict) -> tuple:
+    """Changes that bring stored_files in line with the scan: (gone paths, new rows, updated values)."""
+    gone = [path for path in rows if path not in files]
+    new_rows, updates = [], []
+    for path, (area, size, mtime) in files.items():
+        modified = datetime.utcfromtimestamp(mtime)
+        row = rows.get(path)
+        if row is None:
+            new_rows.append({"path": path, "area": area, "size_bytes": size,
+                             "created_at": modified, "last_accessed_at": modified})
+        elif row["size_bytes"] != size or row["area"] != area or row["last_accessed_at"] < modified:
+            # Rewritten in place: a write counts as an access
+            updates.append({"path": path, "area": area, "size_bytes": size,
+                            "last_accessed_at": max(row["last_accessed_at"], modified)})
+    return gone, new_rows, updates
+
+def _sync(db, files: dict) -> dict:
+    """Bring stored_files in line with the scan; returns {path: row mapping}."""
+    gone, new_rows, updates = _sync_plan(_tracked(db), files)
+    if gone:
+        db.execute(delete(StoredFile.__table__).where(StoredFile.path.in_(gone)))
+    for values in updates:
+        db.execute(
+            update(StoredFile.__table__)
+            .where(StoredFile.path == values["path"])
+            .values(area=values["area"], size_bytes=values["size_bytes"], last_accessed_at=values["last_accessed_at"])
+        )
+    if new_rows:
+        db.execute(StoredFile.__table__.insert(), new_rows)
+    db.commit()
+    return _tracked(db)
+
+def _synced_view(db, files: dict) -> dict:
+    """What _sync would leave in stored_files, computed in memory (dry runs write nothing)."""
+    rows = {path: dict(row) for path, row in _tracked(db).items()}
+    gone, new_rows, updates = _sync_plan(rows, files)
+    for path in gone:
+        del rows[path]
+    for values in updates:
+        rows[values["path"]].update(values)
+    for values in new_rows:
+        rows[values["path"]] = values
+    return rows
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        print(f"WARNING: Could not delete {path}: {e}")
+        return False
+
+def sweep(dry_run: bool = False, budget_bytes: int = BUDGET_BYTES) -> dict:
+    """
+    Run one housekeeping pass. With dry_run only report what would be deleted:
+    nothing is written, not even the stored_files sync (GET /storage/report).
+    """
+    global _last_sweep
+    with _sweep_lock:
+        started = time.time()
+        now = datetime.utcnow()
+        db = database.SessionLocal()
+        try:
+            try:
+                rows = _synced_view(db, _scan()) if dry_run else _sync(db, _scan())
+            except IntegrityError:
+                # Another process registered the same files first; its sweep covers this round
+                db.rollback()
+                print("DEBUG: Storage sweep skipped (concurrent sweep)")
+                return {"skipped": True}
+            referenced_paths, referenced_names = _referenced(db)
+            referenced_stems = {os.path.splitext(name)[0] for name in referenced_names}
+
+            def is_protected(row) -> bool:
+                if row["path"] in referenced_paths or os.path.basename(row["path"]) in referenced_names:
+                    return True
+                # Acta copy of a referenced photo (utils.image_derivatives)
+                return _original_name(row["path"]) in referenced_stems
+
+            recent = now - timedelta(seconds=MIN_AGE_SECONDS)
+            temp_expiry = now - timedelta(hours=TEMP_MAX_AGE_HOURS)
+            candidates = sorted(
+                (row for row in rows.values() if row["last_accessed_at"] < recent and not is_protected(row)),
+                key=lambda row: row["last_accessed_at"]
+            )
+            total = sum(row["size_bytes"] for row in rows.values())
+            to_delete = {row["path"]: row for row in candidates
+                         if row["area"] in TEMP_AREAS and row["last_accessed_at"] < temp_expiry}
+            remaining = total - sum(row["size_bytes"] for row in to_delete.values())
+            for row in candidates:
+                if remaining <= budget_bytes:
+                    break
+                if row["path"] not in to_delete:
+                    to_delete[row["path"]] = row
+                    remaining -= row["size_bytes"]
+
+            deleted = []
+            for row in to_delete.values():
+                if dry_run or _remove(row["path"]):
+                    deleted.append(row)
+            if deleted and not dry_run:
+                db.execute(delete(StoredFile.__table__).where(StoredFile.path.in_([row["path"] for row in deleted])))
+                db.commit()
+
+            areas = {}
+            for row in rows.values():
+                area = areas.setdefault(row["area"], {"files": 0, "bytes": 0, "protected_files": 0, "protected_bytes": 0,
+                                                      "oldest_access": None})
+                area["files"] += 1
+                area["bytes"] += row["size_bytes"]
+                if is_protected(row):
+                    area["protected_files"] += 1
+                    area["protected_bytes"] += row["size_bytes"]
+                if area["oldest_access"] is None or row["last_accessed_at"] < area["oldest_access"]:
+                    area["oldest_access"] = row["last_accessed_at"]
+            deleted_bytes = sum(row["size_bytes"] for row in deleted)
+            result = {
+                "dry_run": dry_run,
+                "finished_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "seconds": round(time.time() - started, 3),
+                "budget_bytes": budget_bytes,
+                "total_files": len(rows),
+                "total_bytes": total,
+                "deleted_files": len(deleted),
+                "deleted_bytes": deleted_bytes,
+                "remaining_bytes": total - deleted_bytes,
+                "over_budget": total - deleted_bytes > budget_bytes,
+                "areas": areas,
+                "deleted": [{"path": row["path"], "area": row["area"], "size_bytes": row["size_bytes"],
+                             "last_accessed_at": row["last_accessed_at"]} for row in deleted[:100]],
+            }
+            if not dry_run:
+                _last_sweep = result
+                print(f"DEBUG: Storage sweep: {len(deleted)} files ({deleted_bytes} bytes) deleted, "
+                      f"{result['remaining_bytes']} of {budget_bytes} bytes used")
+            return result
+        finally:
+            db.close()
+
+def last_sweep():
+    """Result of the last sweep run by this process (None before the first one)."""
+    return _last_sweep
+
+def record_access(path: str):
+    """Mark a tracked file as just used (called when it is served); never raises."""
+    path = _normalize(path)
+    db = database.SessionLocal()
+    try:
+        result = db.execute(
+            update(StoredFile.__table__)
+            .where(StoredFile.path == path)
+            .values(last_accessed_at=datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        db.rollback()
+        print(f"WARNING: Could not record access to {path}: {e}")
+        return False
+    finally:
+        db.close()
+
+def _run_periodically():
+    time.sleep(FIRST_SWEEP_DELAY_SECONDS)
+    while True:
+        try:
+            sweep()
+        except Exception:
+            traceback.print_exc()
+        time.sleep(SWEEP_SECONDS)
+
+def start_housekeeping():
+    """Start this process's sweeper thread (no-op when STORAGE_SWEEP_SECONDS=0)."""
+    global _thread
+    if SWEEP_SECONDS <= 0:
+        return None
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run_periodically, name="storage-housekeeping", daemon=True)
+            _thread.start()
+    return _thread
+
+if __name__ == "__main__":
+    import sys
+    import json
+    models.Base.metadata.create_all(bind=database.engine)
+    print(json.dumps(sweep(dry_run="--dry-run" in sys.argv), indent=2, default=str))
@@ -0,0 +1,106 @@
+"""
+Script para verificar/reconstruir el puntero desnormalizado devices.current_assignment_id /
+devices.current_employee_id a partir de la tabla assignments (returned_date IS NULL).
+
+Uso:
+    python sync_current_assignments.py          # solo reporta inconsistencias
+    python sync_current_assignments.py --fix    # corrige (backfill)
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+import models
+import services.data_versions  # version bumps for the pointer fixes (ETags)
+
+def expected_current_assignments(db):
+    """
+    Map device_id -> (assignment_id, employee_id) for the open assignment of each device.
+    If a device has several open assignments (see check_duplicate_assignments.py), the
+    most recent one wins.
+    """
+    open_assignments = db.query(
+        models.Assignment.device_id,
+        models.Assignment.id,
+        models.Assignment.employee_id
+    ).filter(
+        models.Assignment.returned_date == None,
+        models.Assignment.device_id != None
+    ).order_by(
+        models.Assignment.device_id,
+        models.Assignment.assigned_date,
+        models.Assignment.id
+    ).all()
+    
+    expected = {}
+    for device_id, assignment_id, employee_id in open_assignments:
+        expected[device_id] = (assignment_id, employee_id)
+    return expected
+
+def sync_current_assignments(fix: bool = False):
+    """Compare the stored pointers with the assignments table and optionally repair them"""
+    
+    print("=" * 100)
+    print("VERIFICACION DE PUNTERO current_assignment_id / current_employee_id")
+    print("=" * 100)
+    
+    db = SessionLocal()
+    try:
+        expected = expected_current_assignments(db)
+        
+        devices = db.query(
+            models.Device.id,
+            models.Device.serial_number,
+            models.Device.current_assignment_id,
+            models.Device.current_employee_id
+        ).all()
+        
+        mismatches = []
+        for device_id, serial, current_assignment_id, current_employee_id in devices:
+            wanted = expected.get(device_id, (None, None))
+            if (current_assignment_id, current_employee_id) != wanted:
+                mismatches.append((device_id, serial, (current_assignment_id, current_employee_id), wanted))
+        
+        print(f"\nDispositivos revisados: {len(devices)}")
+        print(f"Dispositivos con asignacion abierta: {len(expected)}")
+        print(f"Inconsistencias: {len(mismatches)}\n")
+        
+        if mismatches:
+            print(f"{'Device':<10} {'Serie':<25} {'Actual (asig, emp)':<25} {'Esperado (asig, emp)'}")
+            print("-" * 100)
+            for device_id, serial, actual, wanted in mismatches[:200]:
+                print(f"{device_id:<10} {str(serial or 'N/A'):<25} {str(actual):<25} {wanted}")
+            if len(mismatches) > 200:
+                print(f"... y {len(mismatches) - 200} mas")
+        
+        if fix and mismatches:
+            print("\nCorrigiendo punteros...")
+            for device_id, _, _, (assignment_id, employee_id) in mismatches:
+                db.query(models.Device).filter(models.Device.id == device_id).update({
+                    "current_assignment_id": assignment_id,
+                    "current_employee_id": employee_id
+                }, synchronize_session=False)
+            db.commit()
+            print(f"OK {len(mismatches)} dispositivos actualizados")
+        
+        return mismatches
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        mismatches = sync_current_assignments(fix="--fix" in sys.argv)
+        # Non-zero exit in check mode so it can be used as a consistency gate
+        if mismatches and "--fix" not in sys.argv:
+            sys.exit(1)
+        print("\nOK Proceso completado")
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,149 @@
+"""
+Caché de actas renderizadas (utils.acta_cache).
+Verifica que las mismas entradas de render_key() reutilizan el documento guardado,
+que cambiar el digest de la plantilla, un valor de placeholder, una fila de equipo
+o la fecha produce otra clave (y por lo tanto un fallo de caché), y que al superar
+ACTA_CACHE_MAX_FILES se descartan las entradas menos usadas junto con su .pdf.
+
+Uso:
+    python tests/test_acta_cache.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import copy
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import acta_cache
+
+def sample_inputs():
+    """Entradas con la misma forma que usa pdf_generator para las actas por lote"""
+    placeholders = {
+        "{{NOMBRE}}": "ANA PÉREZ",
+        "{{RUT}}": "11.111.111-1",
+        "{{SERIE_COMPUTADOR}}": "SN-001",
+    }
+    devices_info = [
+        {"type": "computer", "serial": "sn-001", "brand": "Dell", "model": "Latitude 5420"},
+        {"type": "monitor", "serial": "sn-002", "brand": "LG", "model": "24MK430"},
+    ]
+    return {
+        "digest": "a" * 64,
+        "placeholders": placeholders,
+        "devices_info": devices_info,
+        "observations": "Sin observaciones",
+        "date_str": "17 de octubre de 2026",
+        "variables": ["NOMBRE", "RUT", "SERIE_COMPUTADOR"],
+    }
+
+def key_for(inputs):
+    return acta_cache.render_key(
+        "batch", inputs["digest"], inputs["placeholders"], inputs["devices_info"],
+        inputs["observations"], inputs["date_str"], "assignment", inputs["variables"]
+    )
+
+def use_cache_dir(max_files=None):
+    """Apunta la caché a un directorio temporal; devuelve lo necesario para restaurarla"""
+    previous = (acta_cache.CACHE_DIR, acta_cache.MAX_FILES)
+    acta_cache.CACHE_DIR = tempfile.mkdtemp()
+    if max_files is not None:
+        acta_cache.MAX_FILES = max_files
+    return previous
+
+def restore_cache_dir(previous):
+    shutil.rmtree(acta_cache.CACHE_DIR, ignore_errors=True)
+    acta_cache.CACHE_DIR, acta_cache.MAX_FILES = previous
+
+def render(key, content=b"docx"):
+    """Simula un render: escribe en temp_path() y lo guarda con store()"""
+    tmp = acta_cache.temp_path(key)
+    with open(tmp, "wb") as f:
+        f.write(content)
+    return acta_cache.store(key, tmp)
+
+def test_same_inputs_hit_the_cache():
+    previous = use_cache_dir()
+    try:
+        key = key_for(sample_inputs())
+        assert acta_cache.get(key) is None
+
+        stored = render(key, b"primer render")
+        assert stored == acta_cache.path_for(key)
+        assert not [name for name in os.listdir(acta_cache.CACHE_DIR) if name.endswith(".tmp")]
+
+        # Entradas iguales pero construidas de nuevo (otro orden de claves) => misma clave
+        again = sample_inputs()
+        again["placeholders"] = dict(reversed(list(again["placeholders"].items())))
+        assert key_for(again) == key
+        hit = acta_cache.get(key_for(again))
+        assert hit == stored
+        with open(hit, "rb") as f:
+            assert f.read() == b"primer render"
+    finally:
+        restore_cache_dir(previous)
+
+def test_changed_inputs_miss_the_cache():
+    previous = use_cache_dir()
+    try:
+        base = sample_inputs()
+        render(key_for(base))
+
+        changes = {
+            "digest de plantilla": lambda inputs: inputs.update(digest="b" * 64),
+            "valor de placeholder": lambda inputs: inputs["placeholders"].update({"{{RUT}}": "22.222.222-2"}),
+            "fila de equipo": lambda inputs: inputs["devices_info"][1].update(serial="sn-003"),
+            "equipo agregado": lambda inputs: inputs["devices_info"].append({"type": "mouse", "serial": "sn-004"}),
+            "fecha": lambda inputs: inputs.update(date_str="18 de octubre de 2026"),
+        }
+        keys = {key_for(base)}
+        for label, change in changes.items():
+            changed = copy.deepcopy(base)
+            change(changed)
+            key = key_for(changed)
+            assert key not in keys, f"Cambiar {label} no cambió la clave"
+            assert acta_cache.get(key) is None, f"Cambiar {label} no debería reutilizar el acta"
+            keys.add(key)
+        # La entrada original sigue disponible
+        assert acta_cache.get(key_for(base)) is not None
+    finally:
+        restore_cache_dir(previous)
+
+def test_eviction_removes_sibling_pdf():
+    previous = use_cache_dir(max_files=3)
+    try:
+        keys = [acta_cache.render_key("batch", index) for index in range(5)]
+        for age, key in enumerate(keys[:3]):
+            path = render(key)
+            # PDF convertido desde esta entrada (utils.pdf_render.ensure_pdf)
+            pdf_path = path[:-len(".docx")] + ".pdf"
+            with open(pdf_path, "wb") as f:
+                f.write(b"%PDF")
+            # Antigüedad explícita: la primera entrada es la menos usada
+            timestamp = 1_000_000 + age * 100
+            os.utime(path, (timestamp, timestamp))
+            os.utime(pdf_path, (timestamp, timestamp))
+
+        # Usar la entrada 0 la convierte en la más reciente; la 1 pasa a ser la menos usada
+        assert acta_cache.get(keys[0]) is not None
+        render(keys[3])
+        names = set(os.listdir(acta_cache.CACHE_DIR))
+        assert f"{keys[1]}.docx" not in names and f"{keys[1]}.pdf" not in names
+        assert {f"{keys[0]}.docx", f"{keys[0]}.pdf", f"{keys[2]}.docx", f"{keys[2]}.pdf"} <= names
+
+        render(keys[4])
+        names = set(os.listdir(acta_cache.CACHE_DIR))
+        assert f"{keys[2]}.docx" not in names and f"{keys[2]}.pdf" not in names
+        assert len([name for name in names if name.endswith(".docx")]) == 3
+        assert {f"{keys[0]}.docx", f"{keys[0]}.pdf", f"{keys[3]}.docx", f"{keys[4]}.docx"} <= names
+    finally:
+        restore_cache_dir(previous)
+
+if __name__ == "__main__":
+    test_same_inputs_hit_the_cache()
+    test_changed_inputs_miss_the_cache()
+    test_eviction_removes_sibling_pdf()
+    print("[OK] Caché de actas renderizadas")
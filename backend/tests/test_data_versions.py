@@ -0,0 +1,118 @@
+"""
+Versiones por tabla y GET condicionales (services.data_versions).
+Sobre una base SQLite temporal verifica que una escritura ORM confirmada y un
+query.update() suben la versión de su tabla (el contador se incrementa en una
+transacción propia después del commit), que una escritura revertida no la cambia,
+y que etag_guard responde 304 mientras los datos no cambian y 200 con un ETag
+nuevo después de un commit.
+
+Uso:
+    python tests/test_data_versions.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import database, models
+from services import data_versions
+
+def make_database():
+    """Base SQLite en un archivo: el TestClient atiende en otro hilo que la sesión del test"""
+    work_dir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(work_dir, 'versions.db')}")
+    models.Base.metadata.create_all(bind=engine)
+    return work_dir, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def device_version(db):
+    db.rollback()  # leer lo confirmado por la transacción del contador
+    return data_versions.current_versions(db, ["devices"])["devices"]
+
+def test_commits_bump_and_rollbacks_do_not():
+    work_dir, engine, Session = make_database()
+    db = Session()
+    try:
+        assert device_version(db) == 0
+
+        db.add(models.Device(serial_number="VER-1", device_type="laptop", status="available"))
+        db.flush()
+        db.add(models.Device(serial_number="VER-2", device_type="laptop", status="available"))
+        db.commit()
+        assert device_version(db) == 1
+
+        device = db.query(models.Device).filter(models.Device.serial_number == "VER-2").one()
+        device.hostname = "PC-VER"
+        db.commit()
+        assert device_version(db) == 2
+
+        db.query(models.Device).filter(models.Device.serial_number == "VER-2").update({"brand": "HP"})
+        db.commit()
+        assert device_version(db) == 3
+
+        device = db.query(models.Device).filter(models.Device.serial_number == "VER-2").one()
+        device.hostname = "REVERTIDO"
+        db.flush()
+        db.query(models.Device).update({"model": "X"})
+        db.rollback()
+        assert device_version(db) == 3
+        # Lo pendiente de la transacción revertida no se aplica en el commit siguiente
+        db.commit()
+        assert device_version(db) == 3
+
+        # Las demás tablas no cambian
+        assert data_versions.current_versions(db, ["employees"]) == {"employees": 0}
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_etag_guard_304_then_200_after_commit():
+    work_dir, engine, Session = make_database()
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/devices/", dependencies=[Depends(data_versions.etag_guard("devices"))])
+    def list_devices(db=Depends(database.get_db)):
+        return [device.serial_number for device in db.query(models.Device).order_by(models.Device.id)]
+
+    app.dependency_overrides[database.get_db] = get_db
+    client = TestClient(app)
+    db = Session()
+    try:
+        first = client.get("/devices/?limit=10")
+        assert first.status_code == 200 and first.json() == []
+        etag = first.headers["etag"]
+        assert client.get("/devices/?limit=10", headers={"If-None-Match": etag}).status_code == 304
+        # Otra URL, otro ETag
+        assert client.get("/devices/?limit=20", headers={"If-None-Match": etag}).status_code == 200
+
+        db.add(models.Device(serial_number="VER-ETAG", device_type="laptop", status="available"))
+        db.commit()
+        changed = client.get("/devices/?limit=10", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.json() == ["VER-ETAG"]
+        assert changed.headers["etag"] != etag
+        assert client.get("/devices/?limit=10", headers={"If-None-Match": changed.headers["etag"]}).status_code == 304
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_commits_bump_and_rollbacks_do_not()
+    test_etag_guard_304_then_200_after_commit()
+    print("[OK] Versiones por tabla y ETags")
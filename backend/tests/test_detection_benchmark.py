@@ -0,0 +1,157 @@
+"""
+Backends de detección de utils.object_detection (ultralytics vs ONNX Runtime).
+Cada backend se mide en un proceso aparte: tiempo de carga del modelo, primera
+inferencia, latencia por imagen (mediana y p95), por imagen en lote (detect_batch)
+y memoria máxima (RSS) del proceso.
+
+Uso:
+    python tests/test_detection_benchmark.py                      # fotos sintéticas
+    python tests/test_detection_benchmark.py --images uploads/decommission --rounds 20
+    python -m utils.object_detection --export --dynamic           # requisito para 'onnx'
+(la verificación del pre/post-procesado ONNX también se ejecuta con pytest)
+"""
+import sys
+import os
+import glob
+import json
+import time
+import resource
+import statistics
+import subprocess
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import object_detection
+
+def fake_output(boxes, num_classes=80, anchors=8400):
+    """Salida YOLOv8 [4 + clases, anclas] con las cajas (cx, cy, w, h, clase, score) dadas"""
+    output = np.zeros((4 + num_classes, anchors), dtype=np.float32)
+    for i, (cx, cy, w, h, cls, score) in enumerate(boxes):
+        output[:4, i] = (cx, cy, w, h)
+        output[4 + cls, i] = score
+    return output
+
+def test_letterbox_maps_back_to_original_coordinates():
+    img = Image.new("RGB", (4000, 3000), (255, 255, 255))
+    tensor, scale, offset = object_detection.letterbox(img)
+    assert tensor.shape == (3, 640, 640) and tensor.dtype == np.float32
+    assert scale == 640 / 4000 and offset == (0, 80)
+
+    # Objeto en (1000, 500)-(3000, 2500) de la imagen original, en coordenadas del letterbox
+    box = [1000 * scale, 500 * scale + 80, 3000 * scale, 2500 * scale + 80]
+    cx, cy, w, h = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2, box[2] - box[0], box[3] - box[1]
+    detections = object_detection.postprocess(fake_output([(cx, cy, w, h, 63, 0.9)]), scale, offset, img.size, {63: "laptop"})
+    assert len(detections) == 1
+    xmin, ymin, xmax, ymax, conf, name = detections[0]
+    assert np.allclose([xmin, ymin, xmax, ymax], [1000, 500, 3000, 2500], atol=1e-2)
+    assert name == "laptop" and abs(conf - 0.9) < 1e-6
+
+def test_postprocess_nms_and_threshold():
+    output = fake_output([
+        (320, 320, 200, 200, 63, 0.9),
+        (322, 318, 200, 204, 63, 0.8),   # misma clase, solapada: se suprime
+        (322, 318, 200, 204, 67, 0.7),   # otra clase: se mantiene
+        (100, 100, 50, 50, 0, 0.2),      # bajo el umbral
+    ])
+    detections = object_detection.postprocess(output, 1.0, (0, 0), (640, 640))
+    assert [(round(d[4], 2), d[5]) for d in detections] == [(0.9, "63"), (0.7, "67")]
+    assert object_detection.postprocess(fake_output([]), 1.0, (0, 0), (640, 640)) == []
+
+class FakeSession:
+    """Sesión onnxruntime mínima: una detección por imagen, según el brillo medio del tensor"""
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.runs = []
+
+    def run(self, _, feeds):
+        batch = next(iter(feeds.values()))
+        assert self.batch_size is None or len(batch) == self.batch_size
+        self.runs.append(len(batch))
+        return [np.stack([fake_output([(320, 320, 100 + 400 * float(t.mean()), 100, 63, 0.9)]) for t in batch])]
+
+def test_onnx_detect_batch_matches_single_images():
+    images = [Image.new("RGB", (4000, 3000), (v, v, v)) for v in (20, 120, 200)] + [Image.new("RGB", (3000, 2000), (90, 90, 90))]
+    for batch_size, expected_runs in ((1, [1, 1, 1, 1]), (3, [3, 3]), (None, [4])):
+        detector = object_detection.OnnxDetector.__new__(object_detection.OnnxDetector)
+        detector.session, detector.input_name, detector.input_size = FakeSession(batch_size), "images", 640
+        detector.batch_size, detector.names = batch_size, {63: "laptop"}
+        batch = detector.detect_batch(images)
+        assert detector.session.runs == expected_runs
+        assert batch == [detector.detect(img) for img in images]
+
+def sample_images(directory=None, count=8):
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.jp*g")) + glob.glob(os.path.join(directory, "*.png")))
+        return [Image.open(path).convert("RGB") for path in paths[:count]]
+    # Fotos sintéticas 12 MP con un "objeto" oscuro sobre fondo claro
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(count):
+        arr = np.full((3000, 4000, 3), 220, dtype=np.uint8)
+        arr[600 + i * 50:2400, 800:3200 - i * 100] = 40
+        arr += rng.integers(0, 20, arr.shape, dtype=np.uint8)
+        images.append(Image.fromarray(arr))
+    return images
+
+def measure(backend, images_dir=None, rounds=10):
+    """Se ejecuta en un proceso hijo con DETECTION_BACKEND=backend"""
+    images = sample_images(images_dir)
+    start = time.perf_counter()
+    detector = object_detection.get_detector()
+    if detector is None:
+        return {"backend": backend, "error": "no disponible"}
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    detector.detect(images[0])
+    first = time.perf_counter() - start
+    latencies = []
+    for _ in range(rounds):
+        for img in images:
+            start = time.perf_counter()
+            detector.detect(img)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        detector.detect_batch(images)
+    batch = (time.perf_counter() - start) / (rounds * len(images))
+    return {
+        "backend": backend,
+        "load_s": round(load, 2),
+        "first_ms": round(first * 1000, 1),
+        "median_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "batch_ms": round(batch * 1000, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def run_benchmark(images_dir=None, rounds=10):
+    print(f"{'backend':<12} {'carga s':>8} {'1a ms':>8} {'mediana ms':>11} {'p95 ms':>8} {'lote ms/img':>12} {'RSS MB':>8}")
+    for backend in object_detection.BACKENDS:
+        env = dict(os.environ, DETECTION_BACKEND=backend)
+        args = [sys.executable, os.path.abspath(__file__), "--child", backend, "--rounds", str(rounds)]
+        if images_dir:
+            args += ["--images", images_dir]
+        result = subprocess.run(args, env=env, cwd=BACKEND_DIR, capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+        stats = json.loads(lines[-1]) if lines else {"error": result.stderr.strip().splitlines()[-1:]}
+        if "error" in stats:
+            print(f"{backend:<12} {stats['error']}")
+            continue
+        print(f"{backend:<12} {stats['load_s']:>8} {stats['first_ms']:>8} {stats['median_ms']:>11} "
+              f"{stats['p95_ms']:>8} {stats['batch_ms']:>12} {stats['max_rss_mb']:>8}")
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 10
+    images_dir = sys.argv[sys.argv.index("--images") + 1] if "--images" in sys.argv else None
+    if "--child" in sys.argv:
+        print(json.dumps(measure(sys.argv[sys.argv.index("--child") + 1], images_dir, rounds)))
+    else:
+        test_letterbox_maps_back_to_original_coordinates()
+        test_postprocess_nms_and_threshold()
+        test_onnx_detect_batch_matches_single_images()
+        print("[OK] Pre/post-procesado ONNX verificado")
+        run_benchmark(images_dir, rounds)
@@ -0,0 +1,198 @@
+"""
+Paginación de GET /devices/ (routes.inventory.read_devices).
+Siembra en una base SQLite en memoria dispositivos con marcas y hostnames NULL
+y valores repetidos, y recorre todas las páginas por cursor, hacia adelante y
+hacia atrás, para el orden por defecto y varias columnas de sort_by. Cada recorrido
+debe dar exactamente el orden de las páginas skip/limit, sin duplicados ni huecos.
+El filtro de cursor también se verifica con NULLs ordenados como en PostgreSQL
+(NULLS LAST en ASC, NULLS FIRST en DESC).
+
+Relevancia de búsqueda: la clave numeric(7,6) viaja en el cursor como Decimal en
+texto (encode -> decode -> _cursor_value); recorrer rangos empatados no repite ni
+salta filas, y un rango malformado en el cursor responde 400.
+
+fields=: solo se aceptan las columnas de schemas.Device (más las calculadas), no
+las columnas internas de orden ni de auditoría.
+
+Uso:
+    python tests/test_device_pagination.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import json
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from decimal import Decimal
+from fastapi import HTTPException, Response
+from sqlalchemy import asc, desc, cast, Numeric
+import database, models
+from routes import inventory
+
+SORTS = [(None, "asc"), ("brand", "asc"), ("brand", "desc"), ("model", "asc"),
+         ("hostname", "asc"), ("hostname", "desc"), ("device_type", "desc")]
+PAGE_SIZE = 7
+
+def seed_devices(db, count=120):
+    """Marcas/modelos/hostnames con NULLs y muchos empates, para forzar el desempate por id"""
+    rnd = random.Random(20250101)
+    db.query(models.Device).delete()
+    for i in range(count):
+        db.add(models.Device(
+            serial_number=f"PAG-{i:04d}",
+            device_type=rnd.choice(["laptop", "monitor", "celular", "mochila"]),
+            brand=rnd.choice(["HP", "DELL", "LENOVO", None, None]),
+            model=rnd.choice(["A", "B", None]),
+            hostname=rnd.choice([None, None, "PC-1", "PC-2", f"PC-{i}"]),
+            status=rnd.choice(["available", "assigned", "retired"]),
+        ))
+    db.commit()
+
+def list_devices(db, **params):
+    return inventory.read_devices(db=db, response=Response(), **params)
+
+def offset_order(db, sort_by, sort_order):
+    """Ids en el orden de las páginas skip/limit"""
+    ids, skip = [], 0
+    while True:
+        page = list_devices(db, skip=skip, limit=PAGE_SIZE, sort_by=sort_by, sort_order=sort_order, count="none")
+        ids += [device.id for device in page["items"]]
+        if not page["has_more"]:
+            return ids
+        skip += PAGE_SIZE
+
+def cursor_walk(db, sort_by, sort_order):
+    """(ids hacia adelante, ids volviendo hacia atrás desde la última página)"""
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = list_devices(db, limit=PAGE_SIZE, cursor=cursor, sort_by=sort_by, sort_order=sort_order)
+        pages.append(page)
+        cursor = page["next_cursor"]
+    forward = [device.id for page in pages for device in page["items"]]
+
+    backward = [device.id for device in pages[-1]["items"]]
+    cursor = pages[-1]["prev_cursor"]
+    while cursor is not None:
+        page = list_devices(db, limit=PAGE_SIZE, cursor=cursor, sort_by=sort_by, sort_order=sort_order)
+        backward = [device.id for device in page["items"]] + backward
+        cursor = page["prev_cursor"]
+    return forward, backward
+
+def test_cursor_pages_match_offset_pages():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        seed_devices(db)
+        total = db.query(models.Device).count()
+        for sort_by, sort_order in SORTS:
+            expected = offset_order(db, sort_by, sort_order)
+            assert len(expected) == len(set(expected)) == total, (sort_by, sort_order)
+            forward, backward = cursor_walk(db, sort_by, sort_order)
+            assert forward == expected, (sort_by, sort_order, "adelante")
+            assert backward == expected, (sort_by, sort_order, "atrás")
+    finally:
+        db.close()
+
+def test_keyset_filter_with_nulls_largest():
+    """Mismo recorrido con NULLs como los ordena PostgreSQL (simulado con NULLS LAST/FIRST)"""
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+
+    def pg_order(keys):
+        return [desc(expr).nulls_first() if is_desc else asc(expr).nulls_last() for expr, is_desc in keys]
+
+    def walk(base, keys, forward):
+        ids, last = [], None
+        ordering = pg_order(keys if forward else [(expr, not is_desc) for expr, is_desc in keys])
+        while True:
+            query = base
+            if last is not None:
+                query = query.filter(inventory._keyset_filter(keys, last, forward, nulls_largest=True))
+            rows = query.add_columns(*[expr for expr, _ in keys]).order_by(*ordering).limit(PAGE_SIZE).all()
+            if not rows:
+                return ids if forward else ids[::-1]
+            ids += [row[0].id for row in rows]
+            last = list(rows[-1][1:])
+
+    try:
+        seed_devices(db)
+        base = db.query(models.Device)
+        for sort_by, sort_order in SORTS:
+            keys = inventory._device_sort_keys(sort_by, sort_order)
+            expected = [device.id for device in base.order_by(*pg_order(keys)).all()]
+            assert walk(base, keys, True) == expected, (sort_by, sort_order, "adelante")
+            assert walk(base, keys, False) == expected, (sort_by, sort_order, "atrás")
+    finally:
+        db.close()
+
+def tied_rank():
+    """Rango con el mismo tipo que device_search_rank y solo tres valores (muchos empates)"""
+    return cast((models.Device.id % 3) * 0.25 + 0.375, Numeric(7, 6))
+
+def test_search_rank_cursor_round_trip():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        seed_devices(db)
+        rank = tied_rank()
+        keys = [(rank, True)] + inventory._device_sort_keys()
+        base = db.query(models.Device)
+        expected = [row[0].id for row in base.add_columns(rank).order_by(
+            *[desc(expr) if is_desc else asc(expr) for expr, is_desc in keys]).all()]
+
+        ids, cursor = [], ""
+        while cursor is not None:
+            page = inventory._read_devices_page_by_cursor(base, keys, cursor, PAGE_SIZE, "relevance:asc")
+            ids += [device.id for device in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor:
+                values, direction = inventory._decode_cursor(cursor, "relevance:asc")
+                assert isinstance(values[0], str) and direction == "next"
+                restored = inventory._cursor_value(rank, values[0])
+                assert isinstance(restored, Decimal) and restored in (Decimal("0.375"), Decimal("0.625"), Decimal("0.875"))
+        assert ids == expected
+
+        # Claves que no son numeric pasan tal cual
+        assert inventory._cursor_value(models.Device.brand, "HP") == "HP"
+        assert inventory._cursor_value(rank, None) is None
+
+        values = [None] * len(keys)
+        for bad in ("abc", [1], {"x": 1}):
+            values[0] = bad
+            token = inventory._encode_cursor(values, "next", "relevance:asc")
+            try:
+                inventory._read_devices_page_by_cursor(base, keys, token, PAGE_SIZE, "relevance:asc")
+                assert False, f"se esperaba 400 para {bad!r}"
+            except HTTPException as e:
+                assert e.status_code == 400
+    finally:
+        db.close()
+
+def test_sparse_fields_hide_internal_columns():
+    import schemas
+    allowed = set(inventory.DEVICE_LIST_FIELDS)
+    assert allowed == set(schemas.Device.model_fields) | set(inventory.DEVICE_EXTRA_FIELDS)
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        seed_devices(db, count=5)
+        for internal in ("type_rank", "status_rank", "status_group_rank", "deleted_by_user_id"):
+            try:
+                list_devices(db, fields=f"serial_number,{internal}")
+                assert False, f"se esperaba 400 para {internal}"
+            except HTTPException as e:
+                assert e.status_code == 400
+        items = json.loads(list_devices(db, fields="serial_number,brand,current_employee_name").body)["items"]
+        assert len(items) == 5 and set(items[0]) == {"id", "serial_number", "brand", "current_employee_name"}
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_cursor_pages_match_offset_pages()
+    test_keyset_filter_with_nulls_largest()
+    test_search_rank_cursor_round_trip()
+    test_sparse_fields_hide_internal_columns()
+    print("[OK] Paginación por cursor igual a skip/limit")
@@ -0,0 +1,86 @@
+"""
+Trabajos de generación de actas en segundo plano (services.document_jobs).
+Ejecuta execute_job en línea sobre una base SQLite temporal: un empleado con una
+laptop y un celular asignados tiene dos actas (cómputo y celular), así que el
+trabajo assignment_acta debe terminar con un ZIP en disco que contiene ambas; con
+un solo tipo de equipo el resultado es el .docx. Un id inexistente falla con el
+detalle del 404.
+
+Uso:
+    python tests/test_document_jobs.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import shutil
+import tempfile
+import zipfile
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ACTA_CACHE_DIR", os.path.join(tempfile.mkdtemp(), "actas"))
+
+import database, models
+from services import document_jobs
+
+def seed_employee(db, dni, device_types):
+    """Empleado con una asignación activa por cada tipo de equipo"""
+    employee = models.Employee(full_name=f"EMPLEADO {dni}", email=f"{dni}@example.com", dni=dni, company="EMPRESA SAC")
+    db.add(employee)
+    db.flush()
+    assignments = []
+    for i, device_type in enumerate(device_types):
+        device = models.Device(serial_number=f"SN-{dni}-{i}", device_type=device_type, brand="HP", model="X", status="assigned")
+        db.add(device)
+        db.flush()
+        assignment = models.Assignment(device_id=device.id, employee_id=employee.id, assigned_date=datetime.datetime(2025, 1, 1))
+        db.add(assignment)
+        assignments.append(assignment)
+    db.commit()
+    return assignments[0].id
+
+def run_job(store, kind, params):
+    job = store.create(kind, document_jobs.validate_job(kind, params))
+    document_jobs.execute_job(job["id"], store.path)
+    return store.get(job["id"])
+
+def test_assignment_acta_jobs():
+    work_dir = tempfile.mkdtemp()
+    previous_results_dir = document_jobs.RESULTS_DIR
+    document_jobs.RESULTS_DIR = os.path.join(work_dir, "results")
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        store = document_jobs.JobStore(os.path.join(work_dir, "jobs.sqlite3"))
+        both_id = seed_employee(db, "70000001", ["laptop", "celular"])
+        laptop_id = seed_employee(db, "70000002", ["laptop"])
+
+        job = run_job(store, "assignment_acta", {"assignment_id": both_id})
+        assert job["status"] == "done", job["error"]
+        assert job["media_type"] == "application/zip"
+        assert job["result_filename"].startswith("ACTAS - EMPLEADO 70000001") and job["result_filename"].endswith(".zip")
+        assert os.path.dirname(job["result_path"]) == os.path.abspath(document_jobs.RESULTS_DIR)
+        with zipfile.ZipFile(job["result_path"]) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+            assert len(names) == 2
+            assert any(name.startswith("ACTA DE ENTREGA EQUIPO COMPUTO") for name in names)
+            assert any(name.startswith("ACTA DE ENTREGA DE CELULAR") for name in names)
+            for name in names:
+                assert archive.read(name)[:2] == b"PK"  # cada acta es un .docx válido
+
+        job = run_job(store, "assignment_acta", {"assignment_id": laptop_id})
+        assert job["status"] == "done", job["error"]
+        assert job["result_filename"].endswith(".docx") and os.path.exists(job["result_path"])
+
+        job = run_job(store, "assignment_acta", {"assignment_id": 999999})
+        assert job["status"] == "failed" and job["error"] == "Assignment not found"
+    finally:
+        db.close()
+        document_jobs.RESULTS_DIR = previous_results_dir
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_assignment_acta_jobs()
+    print("[OK] Trabajos assignment_acta (ZIP con dos actas y acta única)")
@@ -0,0 +1,97 @@
+"""
+Pool de procesamiento de fotos de bajas (services.image_pipeline).
+Verifica que el pool se recupera cuando muere un proceso worker: tras matar un
+worker (SIGKILL) la siguiente carga se procesa en un pool nuevo; una tarea cuyo
+worker muere una vez se reintenta y termina bien; si muere también en el
+reintento se guarda la imagen original y el siguiente envío sigue funcionando.
+En todos los casos no quedan marcadores .pending ni imágenes contadas en cola.
+
+Uso:
+    python tests/test_image_pipeline.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import io
+import signal
+import shutil
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DETECTION_BACKEND", "none")
+
+from services import image_pipeline
+
+TIMEOUT = 120
+
+def jpeg_bytes():
+    img = Image.new("RGB", (320, 240), "white")
+    img.paste((30, 30, 30), (80, 60, 240, 180))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG")
+    return buffer.getvalue()
+
+def exit_once(flag_path: str, items: list) -> tuple:
+    """Se ejecuta en el pool: la primera vez mata su propio proceso, después procesa el lote"""
+    if not os.path.exists(flag_path):
+        open(flag_path, "wb").close()
+        os._exit(1)
+    return image_pipeline.process_images(items)
+
+def always_exit(items: list) -> tuple:
+    os._exit(1)
+
+def assert_idle(pipeline, *paths):
+    assert pipeline.stats()["in_flight"] == 0
+    for path in paths:
+        assert not os.path.exists(image_pipeline.pending_marker(path)), path
+
+def test_pool_recovers_from_dead_workers():
+    work_dir = tempfile.mkdtemp()
+    pipeline = image_pipeline.ImagePipeline(workers=1, queue_size=4)
+    content = jpeg_bytes()
+    try:
+        # 1. Worker muerto entre cargas: el siguiente envío usa un pool nuevo
+        first = os.path.join(work_dir, "first.jpg")
+        assert pipeline.submit(content, first).result(TIMEOUT)[0] is True
+        for pid in list(pipeline._pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        broken_pool = pipeline._pool
+        second = os.path.join(work_dir, "second.jpg")
+        ok, _ = pipeline.submit(content, second).result(TIMEOUT)
+        assert ok is True and os.path.exists(second)
+        assert pipeline._pool is not broken_pool
+        assert_idle(pipeline, first, second)
+
+        # 2. El worker muere con la tarea en curso: se reintenta una vez en otro pool
+        retried = os.path.join(work_dir, "retried.jpg")
+        items = [(content, retried)]
+        results, _ = pipeline._submit(exit_once, items, os.path.join(work_dir, "flag"), items).result(TIMEOUT)
+        assert results == [True] and os.path.exists(retried)
+        assert_idle(pipeline, retried)
+
+        # 3. Muere también en el reintento: se guarda el original y el pool sigue usable
+        lost = os.path.join(work_dir, "lost.jpg")
+        items = [(content, lost)]
+        try:
+            pipeline._submit(always_exit, items, items).result(TIMEOUT)
+            assert False, "se esperaba BrokenProcessPool"
+        except BrokenProcessPool:
+            pass
+        with open(lost, "rb") as f:
+            assert f.read() == content
+        assert_idle(pipeline, lost)
+        last = os.path.join(work_dir, "last.jpg")
+        assert pipeline.submit(content, last).result(TIMEOUT)[0] is True
+        assert_idle(pipeline, last)
+    finally:
+        pipeline._pool.shutdown(wait=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_pool_recovers_from_dead_workers()
+    print("[OK] El pool de imágenes se recupera de workers muertos")
@@ -0,0 +1,105 @@
+"""
+Conteos de listas paginadas (services.list_counts).
+Con count=estimate el total exacto se guarda por endpoint + filtros durante
+ESTIMATE_TTL_SECONDS: verifica que la caché nunca supera COUNT_CACHE_MAX_ENTRIES
+(se descartan las entradas usadas hace más tiempo), que una entrada vencida se
+recalcula en lugar de servirse y que count=exact y count=none no usan la caché.
+
+Uso:
+    python tests/test_list_counts.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import database, models
+from services import list_counts
+
+class FakeClock:
+    """Reemplazo de time.monotonic controlado por el test"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def seed(db, count):
+    db.query(models.Device).delete()
+    for i in range(count):
+        db.add(models.Device(serial_number=f"CNT-{i:04d}", device_type="laptop", status="available"))
+    db.commit()
+
+def with_settings(test):
+    """Ejecuta `test(db, clock)` con caché vacía, tope chico y reloj falso; restaura todo al final"""
+    def run():
+        models.Base.metadata.create_all(bind=database.engine)
+        db = database.SessionLocal()
+        clock = FakeClock()
+        saved = (list_counts.COUNT_CACHE_MAX_ENTRIES, list_counts.time)
+        list_counts.COUNT_CACHE_MAX_ENTRIES = 5
+        list_counts.time = types.SimpleNamespace(monotonic=clock)
+        list_counts._count_cache.clear()
+        try:
+            test(db, clock)
+        finally:
+            list_counts.COUNT_CACHE_MAX_ENTRIES, list_counts.time = saved
+            list_counts._count_cache.clear()
+            db.close()
+    run.__name__ = test.__name__
+    return run
+
+def _cache_is_bounded(db, clock):
+    seed(db, 3)
+    query = db.query(models.Device)
+    for i in range(40):
+        assert list_counts.count_total(db, query, "estimate", "devices", ("search", i)) == (3, True)
+        assert len(list_counts._count_cache) <= list_counts.COUNT_CACHE_MAX_ENTRIES
+    assert len(list_counts._count_cache) == list_counts.COUNT_CACHE_MAX_ENTRIES
+    # Se conservan las más recientes
+    assert [key[1][1] for key in list_counts._count_cache] == list(range(35, 40))
+
+    # Un acierto pasa al final: la siguiente inserción descarta otra entrada
+    list_counts.count_total(db, query, "estimate", "devices", ("search", 35))
+    list_counts.count_total(db, query, "estimate", "devices", ("search", 99))
+    assert [key[1][1] for key in list_counts._count_cache] == [37, 38, 39, 35, 99]
+
+def _expired_entry_is_recomputed(db, clock):
+    seed(db, 3)
+    query = db.query(models.Device)
+    assert list_counts.count_total(db, query, "estimate", "devices", None) == (3, True)
+    seed(db, 7)
+    # Vigente: se sirve el total guardado
+    clock.now += list_counts.ESTIMATE_TTL_SECONDS - 1
+    assert list_counts.count_total(db, query, "estimate", "devices", None) == (3, True)
+    # Vencida: se recalcula y se guarda de nuevo
+    clock.now += 1
+    assert list_counts.count_total(db, query, "estimate", "devices", None) == (7, True)
+    assert list_counts._count_cache[("devices", None)] == (clock.now + list_counts.ESTIMATE_TTL_SECONDS, 7)
+
+    # Una entrada vencida que no se vuelve a pedir también se descarta al leerla
+    list_counts.count_total(db, query, "estimate", "employees", None)
+    clock.now += list_counts.ESTIMATE_TTL_SECONDS
+    assert list_counts._cached_count(("employees", None), clock.now) is None
+    assert ("employees", None) not in list_counts._count_cache
+
+def _exact_and_none_skip_cache(db, clock):
+    seed(db, 4)
+    query = db.query(models.Device)
+    assert list_counts.count_total(db, query, "exact", "devices", None) == (4, False)
+    assert list_counts.count_total(db, query, "none", "devices", None) == (None, False)
+    assert not list_counts._count_cache
+
+test_cache_is_bounded = with_settings(_cache_is_bounded)
+test_expired_entry_is_recomputed = with_settings(_expired_entry_is_recomputed)
+test_exact_and_none_skip_cache = with_settings(_exact_and_none_skip_cache)
+
+if __name__ == "__main__":
+    test_cache_is_bounded()
+    test_expired_entry_is_recomputed()
+    test_exact_and_none_skip_cache()
+    print("[OK] Caché de conteos acotada y con vencimiento")
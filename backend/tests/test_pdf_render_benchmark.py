@@ -0,0 +1,84 @@
+"""
+Conversión DOCX -> PDF de utils.pdf_render (reportlab, sin Word ni LibreOffice).
+Convierte todas las plantillas de resources/templates y backend/templates,
+verifica que cada PDF sea válido y mide el tiempo por documento, en secuencia y
+con un pool de procesos (como la descarga masiva de actas).
+
+Uso:
+    python tests/test_pdf_render_benchmark.py               # benchmark
+    python tests/test_pdf_render_benchmark.py --workers 8
+(la verificación de PDFs válidos también se ejecuta con pytest)
+"""
+import sys
+import os
+import glob
+import time
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import pdf_render, process_pool
+
+TEMPLATE_DIRS = [
+    os.path.join(os.path.dirname(BACKEND_DIR), "resources", "templates"),
+    os.path.join(BACKEND_DIR, "templates"),
+]
+
+def template_paths():
+    return [path for directory in TEMPLATE_DIRS for path in sorted(glob.glob(os.path.join(directory, "*.docx")))]
+
+def convert(args):
+    """Convierte una plantilla y devuelve (segundos, tamaño del PDF). Se ejecuta en el pool."""
+    docx_path, pdf_path = args
+    start = time.perf_counter()
+    pdf_render.docx_to_pdf(docx_path, pdf_path)
+    return time.perf_counter() - start, os.path.getsize(pdf_path)
+
+def test_templates_convert_to_pdf():
+    paths = template_paths()
+    assert paths, "No se encontraron plantillas .docx"
+    out_dir = tempfile.mkdtemp()
+    try:
+        for i, path in enumerate(paths):
+            pdf_path = os.path.join(out_dir, f"{i}.pdf")
+            convert((path, pdf_path))
+            with open(pdf_path, "rb") as f:
+                data = f.read()
+            name = os.path.basename(path)
+            assert data.startswith(b"%PDF"), f"PDF inválido para {name}"
+            assert b"%%EOF" in data[-1024:], f"PDF incompleto para {name}"
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def run_benchmark(workers):
+    paths = template_paths()
+    out_dir = tempfile.mkdtemp()
+    try:
+        jobs = [(path, os.path.join(out_dir, f"{i}.pdf")) for i, path in enumerate(paths)]
+        convert(jobs[0])  # fuentes registradas antes de medir
+
+        print(f"{'plantilla':<60} {'ms':>8} {'KB':>7}")
+        start = time.perf_counter()
+        for path, pdf_path in jobs:
+            seconds, size = convert((path, pdf_path))
+            print(f"{os.path.basename(path)[:58]:<60} {seconds * 1000:>8.1f} {size / 1024:>7.1f}")
+        sequential = time.perf_counter() - start
+
+        with process_pool.new_spawn_pool(workers) as pool:
+            list(pool.map(convert, jobs[:workers]))  # arranque de los procesos
+            start = time.perf_counter()
+            list(pool.map(convert, jobs * 4))
+            parallel = time.perf_counter() - start
+
+        print(f"Secuencial: {len(jobs) / sequential:.1f} docs/s ({sequential / len(jobs) * 1000:.1f} ms/doc)")
+        print(f"Pool de {workers} procesos: {len(jobs) * 4 / parallel:.1f} docs/s")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else (os.cpu_count() or 2)
+    test_templates_convert_to_pdf()
+    print("[OK] Todas las plantillas se convierten a PDF válido")
+    run_benchmark(workers)
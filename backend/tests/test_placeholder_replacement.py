@@ -0,0 +1,213 @@
+"""
+Reemplazo de placeholders de actas (pdf_generator.process_document_placeholders).
+Verifica build_placeholder_matcher y _replace_in_pieces con placeholders partidos
+entre runs, tabs y saltos dentro de los runs y claves que se solapan
+({{NAME}} / {{NAME_FULL}}), y que el texto resultante es idéntico al de la
+implementación anterior (legacy_process_placeholders: reemplazo por run, reescritura
+del párrafo y barrido de w:t) sobre las plantillas de resources/templates y
+backend/templates.
+
+Uso:
+    python tests/test_placeholder_replacement.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import re
+import glob
+from docx import Document
+from docx.oxml.ns import qn
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import pdf_generator
+
+TEMPLATE_DIRS = [
+    os.path.join(os.path.dirname(BACKEND_DIR), "resources", "templates"),
+    os.path.join(BACKEND_DIR, "templates"),
+]
+
+PLACEHOLDER = re.compile(r"\{\{[^{}]+\}\}|«[^«»]+»")
+
+def legacy_replace_in_paragraph(paragraph, placeholders):
+    """Implementación anterior: reemplazo por run y, si quedan claves partidas, reescritura del párrafo"""
+    for run in paragraph.runs:
+        if '{' in run.text:
+            for key, value in placeholders.items():
+                if key in run.text:
+                    run.text = run.text.replace(key, str(value))
+    full_text = paragraph.text
+    if not any(key in full_text for key in placeholders):
+        return
+    new_text = full_text
+    for key, value in placeholders.items():
+        if key in new_text:
+            new_text = new_text.replace(key, str(value))
+    if new_text != full_text:
+        bold = italic = font_name = font_size = None
+        if paragraph.runs:
+            first_run = paragraph.runs[0]
+            bold, italic = first_run.bold, first_run.italic
+            font_name, font_size = first_run.font.name, first_run.font.size
+        for run in paragraph.runs:
+            run.text = ""
+        new_run = paragraph.add_run(new_text)
+        if bold is not None:
+            new_run.bold = bold
+        if italic is not None:
+            new_run.italic = italic
+        if font_name:
+            new_run.font.name = font_name
+        if font_size:
+            new_run.font.size = font_size
+
+def legacy_replace_in_table(table, placeholders):
+    for row in table.rows:
+        for cell in row.cells:
+            for paragraph in cell.paragraphs:
+                legacy_replace_in_paragraph(paragraph, placeholders)
+            for nested_table in cell.tables:
+                legacy_replace_in_table(nested_table, placeholders)
+
+def legacy_process_placeholders(doc, placeholders):
+    """Implementación anterior de process_document_placeholders (tres pasadas)"""
+    for p in doc.paragraphs:
+        legacy_replace_in_paragraph(p, placeholders)
+    for t in doc.tables:
+        legacy_replace_in_table(t, placeholders)
+    for section in doc.sections:
+        for part in (section.header, section.footer):
+            for p in part.paragraphs:
+                legacy_replace_in_paragraph(p, placeholders)
+            for t in part.tables:
+                legacy_replace_in_table(t, placeholders)
+
+    def scan_xml_elements(parent_element):
+        for t in parent_element.iter(qn('w:t')):
+            if not t.text:
+                continue
+            new_text = t.text
+            for key, value in placeholders.items():
+                if key in new_text:
+                    new_text = new_text.replace(key, str(value))
+            if new_text != t.text:
+                t.text = new_text
+
+    scan_xml_elements(doc._element)
+    for section in doc.sections:
+        scan_xml_elements(section.header._element)
+        scan_xml_elements(section.footer._element)
+
+def paragraph_texts(doc):
+    """Texto de cada w:p del cuerpo, encabezados y pies (tabs y saltos incluidos)"""
+    roots = [doc.element.body]
+    for section in doc.sections:
+        roots += [section.header._element, section.footer._element]
+    texts = []
+    for root in roots:
+        for paragraph in root.iter(qn('w:p')):
+            texts.append("".join(
+                (node.text or "") if node.tag == qn('w:t') else "\t" if node.tag == qn('w:tab') else "\n"
+                for node in paragraph.iter(qn('w:t'), qn('w:tab'), qn('w:br'), qn('w:cr'))
+            ))
+    return texts
+
+def paragraph_with_runs(doc, *chunks):
+    """Párrafo con un run por chunk; el primero en negrita para comprobar el formato"""
+    paragraph = doc.add_paragraph()
+    for i, chunk in enumerate(chunks):
+        run = paragraph.add_run(chunk)
+        run.bold = i == 0
+    return paragraph
+
+def replace(doc, placeholders):
+    pdf_generator.process_document_placeholders(doc, placeholders)
+
+def test_matcher_prefers_longest_key():
+    matcher = pdf_generator.build_placeholder_matcher(tuple(sorted(["NAME", "NAME_FULL", "{{NAME}}", "{{NAME_FULL}}"])))
+    assert [m.group(0) for m in matcher.finditer("{{NAME}} {{NAME_FULL}} NAME NAME_FULL NAME_")] == \
+        ["{{NAME}}", "{{NAME_FULL}}", "NAME", "NAME_FULL", "NAME"]
+    assert pdf_generator.build_placeholder_matcher(()) is None
+    assert pdf_generator.build_placeholder_matcher(("",)) is None
+    assert pdf_generator.build_placeholder_matcher(("a.b",)).findall("axb a.b") == ["a.b"]
+
+def test_overlapping_keys():
+    doc = Document()
+    paragraph_with_runs(doc, "{{NAME}} / {{NAME_FULL}}")
+    paragraph_with_runs(doc, "{{NAME_", "FULL}} y {{NA", "ME}}")
+    replace(doc, {"{{NAME}}": "Ana", "{{NAME_FULL}}": "Ana Pérez"})
+    assert [p.text for p in doc.paragraphs] == ["Ana / Ana Pérez", "Ana Pérez y Ana"]
+
+def test_placeholder_split_across_runs_keeps_first_run():
+    doc = Document()
+    paragraph = paragraph_with_runs(doc, "Nombre: {{NOM", "BR", "E}}.", " Fin")
+    replace(doc, {"{{NOMBRE}}": "Juan"})
+    assert paragraph.text == "Nombre: Juan. Fin"
+    # El valor queda en el run (en negrita) donde empezaba el placeholder
+    assert [run.text for run in paragraph.runs] == ["Nombre: Juan", "", ".", " Fin"]
+    assert paragraph.runs[0].bold
+
+def test_tabs_and_breaks_inside_runs():
+    doc = Document()
+    tab_split = paragraph_with_runs(doc, "{{A\t}}")      # un tab corta el placeholder
+    break_split = paragraph_with_runs(doc, "{{A\n}}")    # igual que un salto de línea
+    around = paragraph_with_runs(doc, "\t{{A}}\n{{B}}\t")
+    multiline = paragraph_with_runs(doc, "{{B}}")
+    replace(doc, {"{{A}}": "uno", "{{B}}": "dos\tcol\nlinea"})
+    assert tab_split.text == "{{A\t}}"
+    assert break_split.text == "{{A\n}}"
+    assert around.text == "\tuno\ndos\tcol\nlinea\t"
+    # Los tabs y saltos del valor se escriben como w:tab / w:br en el mismo run
+    run = multiline.runs[0]._r
+    assert [child.tag for child in run if child.tag != qn('w:rPr')] == [qn('w:t'), qn('w:tab'), qn('w:t'), qn('w:br'), qn('w:t')]
+    assert multiline.text == "dos\tcol\nlinea"
+
+def test_replace_in_pieces_counts_and_skips_breaks():
+    doc = Document()
+    paragraph = paragraph_with_runs(doc, "{{X}}{{", "X}}", "{{X")
+    paragraph.runs[2].add_tab()
+    paragraph.add_run("}}")
+    values = {"{{X}}": "7"}
+    matcher = pdf_generator.build_placeholder_matcher(tuple(values))
+    pieces = pdf_generator._collect_paragraph_pieces(doc.element.body)[-1]
+    assert pdf_generator._replace_in_pieces(pieces, matcher, values) == 2
+    assert paragraph.text == "77{{X\t}}"
+
+def template_paths():
+    return [path for directory in TEMPLATE_DIRS for path in sorted(glob.glob(os.path.join(directory, "*.docx")))]
+
+def template_placeholders(path):
+    """
+    Valores de prueba para cada placeholder presente en la plantilla, más las
+    variantes con espacios y en minúsculas que también arma pdf_generator
+    """
+    doc = Document(path)
+    keys = sorted({key for text in paragraph_texts(doc) for key in PLACEHOLDER.findall(text)})
+    placeholders = {}
+    for i, key in enumerate(keys):
+        name = key.strip("{}«» ")
+        for variant in (key, f"{{{{ {name} }}}}", f"{{{{{name.lower()}}}}}"):
+            placeholders.setdefault(variant, f"Valor {i} de {name.lower()}")
+    return placeholders
+
+def test_same_text_as_previous_implementation():
+    paths = template_paths()
+    assert paths, "No se encontraron plantillas .docx"
+    for path in paths:
+        placeholders = template_placeholders(path)
+        placeholders["{{NO_EXISTE}}"] = "nada"
+        expected = Document(path)
+        legacy_process_placeholders(expected, placeholders)
+        result = Document(path)
+        pdf_generator.process_document_placeholders(result, placeholders)
+        assert paragraph_texts(result) == paragraph_texts(expected), os.path.basename(path)
+
+if __name__ == "__main__":
+    test_matcher_prefers_longest_key()
+    test_overlapping_keys()
+    test_placeholder_split_across_runs_keeps_first_run()
+    test_tabs_and_breaks_inside_runs()
+    test_replace_in_pieces_counts_and_skips_breaks()
+    test_same_text_as_previous_implementation()
+    print(f"[OK] Reemplazo de placeholders ({len(template_paths())} plantillas)")
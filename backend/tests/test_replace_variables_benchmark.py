@@ -0,0 +1,128 @@
+"""
+Micro-benchmark de doc_utils.replace_variables_in_docx.
+Compara el reemplazo de una sola pasada (tokenizador único por parte XML) con la
+implementación anterior (un regex compilado y un pattern.sub por variable) sobre
+las plantillas de resources/templates y backend/templates, y verifica que ambas
+producen el mismo XML (salvo claves partidas entre runs, que antes no se reemplazaban).
+
+Uso:
+    python tests/test_replace_variables_benchmark.py              # benchmark
+    python tests/test_replace_variables_benchmark.py --rounds 50
+(la verificación de equivalencia también se ejecuta con pytest)
+"""
+import sys
+import os
+import re
+import glob
+import time
+import zipfile
+from lxml import etree
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import doc_utils
+
+TEMPLATE_DIRS = [
+    os.path.join(os.path.dirname(BACKEND_DIR), "resources", "templates"),
+    os.path.join(BACKEND_DIR, "templates"),
+]
+
+# Variables típicas de un mapeo de plantilla (~40), además de las que tenga cada archivo
+COMMON_KEYS = [
+    "NOMBRE", "USUARIO", "DNI", "EMPRESA", "SEDE", "FECHA", "FECHALARGA", "FECHA_LARGA",
+    "OBSERVACIONES", "CARGO", "AREA", "CORREO", "TABLA", "MARCA", "MODELO", "SERIE",
+    "HOSTNAME", "INVENTARIO", "IMEI", "LINEA", "OPERADOR", "ESTADO", "TIPOACTIVO", "ANO",
+    "MES", "ANOFAB", "TIEMPOUSO", "MOTIVOCOMPRA", "IMAGEN1", "IMAGEN2", "SERIE_LAPTOP",
+    "MARCA_LAPTOP", "MODELO_LAPTOP", "HOSTNAME_LAPTOP", "SERIE_MONITOR", "MARCA_MONITOR",
+    "MODELO_MONITOR", "SERIE_CELULAR", "MARCA_CELULAR", "IMEI_CELULAR",
+]
+
+def legacy_replace_in_xml(xml_content, variables, table_xml_map=None):
+    """Implementación anterior: un regex por variable y una pasada completa por cada una"""
+    for key, value in variables.items():
+        val_str = str(value)
+        pattern = re.compile(r"\{(?:<[^>]+>)*\{(?:<[^>]+>)*\s*" + re.escape(key) + r"\s*(?:<[^>]+>)*\}(?:<[^>]+>)*\}")
+        if table_xml_map and key in table_xml_map:
+            replacement = f"</w:t></w:r></w:p>{table_xml_map[key]}<w:p><w:r><w:t>"
+            xml_content = pattern.sub(replacement, xml_content)
+        else:
+            xml_content = pattern.sub(val_str, xml_content)
+    return xml_content
+
+def load_template_parts():
+    """{ruta: [xml de document/header/footer]} para cada .docx disponible"""
+    templates = {}
+    for directory in TEMPLATE_DIRS:
+        for path in sorted(glob.glob(os.path.join(directory, "*.docx"))):
+            with zipfile.ZipFile(path) as z:
+                templates[path] = [
+                    z.read(name).decode("utf-8") for name in z.namelist()
+                    if doc_utils._is_text_part(name)
+                ]
+    return templates
+
+def build_variables(parts):
+    """Claves comunes + las que aparecen en el archivo, con valores sin caracteres especiales"""
+    keys = list(COMMON_KEYS)
+    for xml in parts:
+        for raw in doc_utils.PLACEHOLDER_PATTERN.findall(xml):
+            key = doc_utils.TAG_PATTERN.sub("", raw).strip()
+            if key and key not in keys:
+                keys.append(key)
+    variables = {key: f"VALOR {i}" for i, key in enumerate(keys)}
+    table_xml_map = {"TABLA": doc_utils.get_table_xml(["Nro.", "EQUIPO"], [["1", "LAPTOP"]])}
+    return variables, table_xml_map
+
+def remaining_known_placeholders(xml, variables):
+    """Placeholders con clave conocida que siguen en el XML"""
+    keys = (doc_utils.TAG_PATTERN.sub("", raw).strip() for raw in doc_utils.PLACEHOLDER_PATTERN.findall(xml))
+    return [key for key in keys if key in variables]
+
+def test_single_pass_matches_legacy():
+    templates = load_template_parts()
+    assert templates, "No se encontraron plantillas .docx"
+    for path, parts in templates.items():
+        variables, table_xml_map = build_variables(parts)
+        for xml in parts:
+            expected = legacy_replace_in_xml(xml, variables, table_xml_map)
+            actual = doc_utils.replace_placeholders_in_xml(xml, variables, table_xml_map)
+            name = os.path.basename(path)
+            # El XML resultante debe seguir bien formado y sin placeholders conocidos
+            etree.fromstring(actual.encode("utf-8"))
+            assert not remaining_known_placeholders(actual, variables), f"Quedaron placeholders en {name}"
+            if not remaining_known_placeholders(expected, variables):
+                assert actual == expected, f"Resultado distinto en {name}"
+            # Si no, la versión anterior dejó claves partidas entre runs (p.ej. {{FECH</w:t>...LARGA}})
+            # que ahora sí se reemplazan
+
+def run_benchmark(rounds=20):
+    templates = load_template_parts()
+    print(f"{'plantilla':<60} {'vars':>5} {'anterior ms':>12} {'una pasada ms':>14} {'x':>6}")
+    total_legacy = total_new = 0.0
+    for path, parts in templates.items():
+        variables, table_xml_map = build_variables(parts)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for xml in parts:
+                legacy_replace_in_xml(xml, variables, table_xml_map)
+        legacy = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for xml in parts:
+                doc_utils.replace_placeholders_in_xml(xml, variables, table_xml_map)
+        single = (time.perf_counter() - start) / rounds
+
+        total_legacy += legacy
+        total_new += single
+        name = os.path.basename(path)[:58]
+        print(f"{name:<60} {len(variables):>5} {legacy * 1000:>12.2f} {single * 1000:>14.2f} {legacy / single:>6.1f}")
+    print(f"{'TOTAL':<60} {'':>5} {total_legacy * 1000:>12.2f} {total_new * 1000:>14.2f} {total_legacy / total_new:>6.1f}")
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 20
+    test_single_pass_matches_legacy()
+    print("[OK] El reemplazo de una sola pasada coincide con la implementación anterior")
+    run_benchmark(rounds)
@@ -0,0 +1,243 @@
+"""
+Smart crop de fotos de baja (utils.image_processing).
+Verifica que crop_multires (detección sobre una copia de ~640 px, recorte y resize
+únicos sobre el JPEG decodificado con draft()) recorta la misma región que
+smart_crop_image sobre la imagen completa, para cada orientación EXIF, y mide
+tiempo de CPU y memoria máxima de process_and_save_image. process_and_save_images
+(carga por lotes) debe dejar cada imagen igual que subida sola.
+
+Fallback a bordes (edge_crop_box, numpy): las cajas se comparan con las de la
+implementación anterior (legacy_edge_box) sobre escenas sintéticas fijas; idénticas
+a <= 640 px (la copia de detección) y con menos de 1% de diferencia a resolución completa.
+
+Uso:
+    python tests/test_smart_crop.py                      # foto sintética de 12 MP
+    python tests/test_smart_crop.py --image foto.jpg
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import io
+import json
+import time
+import resource
+import subprocess
+import tempfile
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import image_processing
+
+def fake_detection(img):
+    """Objeto fijo en coordenadas relativas de la imagen que recibe la detección"""
+    w, h = img.size
+    return (0.5 * w, 0.2 * h, 0.9 * w, 0.5 * h)
+
+def jpeg_bytes(img, orientation=None, quality=95):
+    exif = Image.Exif()
+    if orientation:
+        exif[274] = orientation
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality, exif=exif)
+    return buffer.getvalue()
+
+def block_image(size, seed=1):
+    """Bloques de 50 px de color aleatorio (recortes comparables píxel a píxel)"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, (size[1] // 50, size[0] // 50, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize(size, Image.Resampling.NEAREST)
+
+def test_multires_crop_matches_full_resolution(monkeypatch):
+    monkeypatch.setattr(image_processing, "detect_object_yolo", fake_detection)
+    for size in [(3000, 2000), (2000, 3000)]:
+        for orientation in [None, 3, 6, 8]:
+            content = jpeg_bytes(block_image(size), orientation)
+            expected = full_resolution_crop(content)
+            result = image_processing.crop_multires(content, max_output_px=0)
+            assert result.size == expected.size
+            assert np.abs(np.asarray(result, int) - np.asarray(expected, int)).mean() < 1
+
+def test_output_capped_at_max_size(monkeypatch):
+    monkeypatch.setattr(image_processing, "detect_object_yolo", fake_detection)
+    content = jpeg_bytes(block_image((4000, 3000)), 6)
+    result = image_processing.crop_multires(content, max_output_px=800)
+    assert max(result.size) == 800 and result.width > result.height
+
+def test_batch_matches_single_uploads(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_processing, "detect_object_yolo", fake_detection)
+    monkeypatch.setattr(image_processing, "detect_objects_yolo_batch", lambda images: [fake_detection(img) for img in images])
+    contents = [jpeg_bytes(block_image((3000, 2000), seed), orientation) for seed, orientation in ((1, None), (2, 6), (3, 8))]
+    contents.insert(1, b"no es una imagen")
+    singles = [image_processing.process_and_save_image(c, str(tmp_path / f"single{i}.jpg")) for i, c in enumerate(contents)]
+    batch = image_processing.process_and_save_images([(c, str(tmp_path / f"batch{i}.jpg")) for i, c in enumerate(contents)])
+    assert batch == singles == [True, False, True, True]
+    for i in range(len(contents)):
+        assert (tmp_path / f"batch{i}.jpg").read_bytes() == (tmp_path / f"single{i}.jpg").read_bytes()
+
+def legacy_edge_box(img):
+    """Fallback a bordes anterior (edges.point con lambda por píxel + getbbox)"""
+    gray = img.convert("L")
+    blurred = gray.filter(ImageFilter.GaussianBlur(radius=2))
+    edges = blurred.filter(ImageFilter.FIND_EDGES)
+    threshold = 50
+    bw = edges.point(lambda x: 0 if x < threshold else 255)
+    return bw.getbbox()
+
+def edge_scene(name, size=(640, 480)):
+    """Escenas fijas para el fallback a bordes, dibujadas en coordenadas relativas"""
+    w, h = size
+    rng = np.random.default_rng(sum(map(ord, name)))
+    background = {"claro": 225}.get(name, 20)
+    img = Image.new("RGB", size, (background,) * 3)
+    draw = ImageDraw.Draw(img)
+    box = lambda l, t, r, b: (int(l * w), int(t * h), int(r * w), int(b * h))
+    if name == "vacia":
+        return img
+    if name == "gradiente":
+        ramp = np.linspace(0, 60, w, dtype=np.float32)[None, :, None].repeat(h, 0).repeat(3, 2)
+        img = Image.fromarray(ramp.astype(np.uint8))
+        draw = ImageDraw.Draw(img)
+    draw.rectangle(box(0.3, 0.25, 0.7, 0.75), fill=(200, 200, 190))
+    if name == "etiqueta":
+        for i in range(6):
+            draw.rectangle(box(0.35, 0.3 + i * 0.07, 0.65 - i * 0.02, 0.33 + i * 0.07), fill=(10, 10, 10))
+    if name == "esquina":
+        draw.rectangle(box(0.0, 0.0, 0.2, 0.15), fill=(240, 240, 240))
+    if name == "ruido":
+        # Objeto con textura fina (teclado, texto) y motas sueltas en el fondo
+        for y in range(int(0.25 * h) + 6, int(0.75 * h) - 6, 12):
+            draw.line((int(0.3 * w) + 4, y, int(0.7 * w) - 4, y), fill=(0, 0, 0), width=4)
+        for x, y in zip(rng.integers(0, w - 4, 10), rng.integers(0, h - 4, 10)):
+            draw.rectangle((int(x), int(y), int(x) + 3, int(y) + 3), fill=(255, 255, 255))
+    return img
+
+EDGE_SCENES = ["objeto", "etiqueta", "esquina", "gradiente", "ruido", "claro", "vacia"]
+
+def test_edge_box_matches_previous_implementation():
+    for name in EDGE_SCENES:
+        for size in [(640, 480), (480, 640), (601, 333)]:
+            img = edge_scene(name, size)
+            assert image_processing.edge_crop_box(img, trim_percent=0) == legacy_edge_box(img), (name, size)
+
+def test_edge_box_full_resolution_close_to_previous():
+    for name in EDGE_SCENES:
+        img = edge_scene(name, (3000, 2000))
+        expected, result = legacy_edge_box(img), image_processing.edge_crop_box(img, trim_percent=0)
+        assert (expected is None) == (result is None), name
+        if expected:
+            assert max(abs(a - b) for a, b in zip(expected, result)) <= 0.01 * 3000, (name, expected, result)
+
+def test_multires_edge_crop_close_to_previous(tmp_path):
+    """La foto guardada (detección sobre la copia reducida) recorta lo mismo que el flujo anterior a resolución completa"""
+    for name in EDGE_SCENES:
+        img = edge_scene(name, (3000, 2000))
+        content = jpeg_bytes(img)
+        box = legacy_edge_box(Image.open(io.BytesIO(content)).convert("RGB"))
+        if box:
+            pad_w, pad_h = int(3000 * 0.05), int(2000 * 0.05)
+            box = (max(0, box[0] - pad_w), max(0, box[1] - pad_h), min(3000, box[2] + pad_w), min(2000, box[3] + pad_h))
+        expected = img.crop(box) if box else img
+        result = image_processing.crop_multires(content, max_output_px=0)
+        assert all(abs(a - b) <= 0.01 * 3000 for a, b in zip(result.size, expected.size)), (name, result.size, expected.size)
+
+def test_edge_box_trim_ignores_speckles():
+    img = edge_scene("ruido")
+    loose = image_processing.edge_crop_box(img, trim_percent=0)
+    tight = image_processing.edge_crop_box(img, trim_percent=2)
+    area = lambda box: (box[2] - box[0]) * (box[3] - box[1])
+    # Objeto en (192, 120)-(448, 360): sin recorte las motas llevan la caja casi a toda la imagen
+    assert area(loose) > 0.7 * 640 * 480
+    assert tight[0] >= 184 and tight[1] <= 120 and tight[3] >= 360 and area(tight) < 0.6 * area(loose), (loose, tight)
+
+def run_edge_benchmark(rounds=5):
+    """Fallback a bordes: implementación anterior a resolución completa vs numpy sobre copia reducida"""
+    photo = Image.open(io.BytesIO(sample_photo())).convert("RGB")
+    small = photo.copy()
+    small.thumbnail((640, 640))
+    print(f"{'bordes':<28} {'ms':>8}")
+    for label, fn, img in [("anterior, 12 MP", legacy_edge_box, photo),
+                           ("numpy, 12 MP", image_processing.edge_crop_box, photo),
+                           ("anterior, copia 640 px", legacy_edge_box, small),
+                           ("numpy, copia 640 px", image_processing.edge_crop_box, small)]:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn(img)
+        print(f"{label:<28} {(time.perf_counter() - start) / rounds * 1000:>8.1f}")
+
+def sample_photo():
+    """Foto sintética 12 MP (vertical por EXIF) con un "objeto" oscuro sobre fondo claro"""
+    rng = np.random.default_rng(0)
+    arr = np.full((3000, 4000, 3), 220, dtype=np.uint8)
+    arr[600:2400, 800:3200] = 40
+    arr += rng.integers(0, 20, arr.shape, dtype=np.uint8)
+    return jpeg_bytes(Image.fromarray(arr), 6, quality=92)
+
+def full_resolution_crop(content):
+    """Sin copia de detección: decodificar todo, orientar y smart_crop_image a resolución completa"""
+    img = Image.open(io.BytesIO(content))
+    orientation = image_processing.get_exif_orientation(img)
+    return image_processing.smart_crop_image(image_processing.apply_exif_orientation(img.convert("RGB"), orientation))
+
+def peak_rss_kb():
+    """Memoria máxima del proceso. ru_maxrss se hereda del padre a través de fork/exec; VmHWM no"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def measure(mode, image_path, rounds=3):
+    """Se ejecuta en un proceso hijo: 'full' (smart_crop_image a resolución completa) o 'multires'"""
+    with open(image_path, "rb") as f:
+        content = f.read()
+    if mode == "full":
+        image_processing.crop_multires = full_resolution_crop
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        save_path = os.path.join(tmp, "photo.jpg")
+        for _ in range(rounds):
+            start = time.process_time()
+            image_processing.process_and_save_image(content, save_path)
+            times.append(time.process_time() - start)
+        with Image.open(save_path) as saved:
+            output = f"{saved.width}x{saved.height}"
+        output_kb = os.path.getsize(save_path) // 1024
+    return {"mode": mode, "cpu_s": round(min(times), 2), "output": output, "output_kb": output_kb,
+            "max_rss_mb": round(peak_rss_kb() / 1024, 1)}
+
+def run_benchmark(image_path=None, rounds=3):
+    if image_path is None:
+        # Generada aquí: en el proceso hijo subiría la memoria máxima medida
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+            f.write(sample_photo())
+        try:
+            return run_benchmark(f.name, rounds)
+        finally:
+            os.remove(f.name)
+    print(f"{'modo':<10} {'CPU s':>6} {'salida':>11} {'KB':>6} {'RSS MB':>8}")
+    for mode in ("full", "multires"):
+        args = [sys.executable, os.path.abspath(__file__), "--child", mode, "--rounds", str(rounds), "--image", image_path]
+        result = subprocess.run(args, cwd=BACKEND_DIR, capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            print(f"{mode:<10} {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        stats = json.loads(lines[-1])
+        print(f"{mode:<10} {stats['cpu_s']:>6} {stats['output']:>11} {stats['output_kb']:>6} {stats['max_rss_mb']:>8}")
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 3
+    image_path = sys.argv[sys.argv.index("--image") + 1] if "--image" in sys.argv else None
+    if "--child" in sys.argv:
+        print(json.dumps(measure(sys.argv[sys.argv.index("--child") + 1], image_path, rounds)))
+    else:
+        import pytest
+        if pytest.main([os.path.abspath(__file__), "-q"]) == 0:
+            run_benchmark(image_path, rounds)
+            run_edge_benchmark()
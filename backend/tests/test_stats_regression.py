@@ -0,0 +1,125 @@
+"""
+Test de regresión para GET /stats.
+Siembra un dataset determinista en una base SQLite temporal y compara la salida
+de get_stats (para cada filtro de sede) con la salida esperada guardada en
+tests/stats_regression_expected.json, generada con la implementación anterior.
+
+Uso:
+    python tests/test_stats_regression.py                    # comparar
+    python tests/test_stats_regression.py --write-expected   # regenerar la salida esperada
+(también se puede ejecutar con pytest)
+"""
+import sys
+import os
+import json
+import random
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import models, crud
+from routes.stats import get_stats
+
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stats_regression_expected.json")
+
+LOCATIONS = [None, "all", "Callao", "Lima", "Chiclayo"]
+
+DEVICE_TYPES = [
+    "laptop", "laptop", "monitor", "kit teclado/mouse", "mochila", "auriculares",
+    "celular", "chip", "charger", "stand", "keyboard", "mouse", None
+]
+DEVICE_STATUSES = ["available", "available", "assigned", "assigned", "maintenance", "retired", "sold", None]
+POSITIONS = ["Analista", "CHOFER", "Conductor de ruta", "Practicante", "practicante de TI", "Jefe", None]
+
+def seed_database(session, employees=60, devices=500):
+    """Dataset determinista; las fechas de compra son relativas a hoy para que el forecast sea estable"""
+    rnd = random.Random(20240607)
+    today = datetime.date.today()
+
+    employee_rows = []
+    for i in range(employees):
+        employee = models.Employee(
+            full_name=f"EMPLEADO {i:03d}",
+            email=f"empleado{i}@example.com",
+            dni=f"{40000000 + i}",
+            position=rnd.choice(POSITIONS),
+            location=rnd.choice(["Callao", "Lima", None]),
+            is_active=rnd.random() < 0.85,
+            expected_laptop_count=rnd.choice([1, 1, 2, 0, None]),
+            deleted_at=datetime.datetime(2024, 1, 1) if rnd.random() < 0.05 else None
+        )
+        session.add(employee)
+        employee_rows.append(employee)
+    session.flush()
+
+    for i in range(devices):
+        device = models.Device(
+            serial_number=f"SN-{i:05d}",
+            device_type=rnd.choice(DEVICE_TYPES),
+            brand=rnd.choice(["HP", "LENOVO", "DELL"]),
+            model=rnd.choice(["A", "B"]),
+            status=rnd.choice(DEVICE_STATUSES),
+            location=rnd.choice(["Callao", "Lima", None]),
+            purchase_date=rnd.choice([
+                None,
+                today - datetime.timedelta(days=100),
+                today - datetime.timedelta(days=1095),
+                today - datetime.timedelta(days=1096),
+                today - datetime.timedelta(days=1097),
+                today - datetime.timedelta(days=2500),
+                today + datetime.timedelta(days=30),
+            ]),
+            deleted_at=datetime.datetime(2024, 1, 1) if rnd.random() < 0.05 else None
+        )
+        session.add(device)
+        session.flush()
+
+        # Assigned devices (and a few others) are currently held by someone
+        if device.status == "assigned" or rnd.random() < 0.05:
+            employee = rnd.choice(employee_rows)
+            assignment = models.Assignment(
+                device_id=device.id,
+                employee_id=employee.id,
+                assigned_date=datetime.datetime(2025, 1, 1)
+            )
+            session.add(assignment)
+            session.flush()
+            crud.set_current_assignment(device, assignment)
+
+    session.commit()
+
+def collect_stats():
+    """Salida de get_stats por sede sobre una base recién sembrada"""
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        seed_database(session)
+        results = {}
+        for location in LOCATIONS:
+            stats = get_stats(location=location, db=session)
+            # Round-trip through JSON so keys/values compare as the API would send them
+            results[str(location)] = json.loads(json.dumps(stats, default=str))
+        return results
+    finally:
+        session.close()
+        engine.dispose()
+
+def test_stats_match_expected():
+    with open(EXPECTED_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    actual = collect_stats()
+    for location in expected:
+        assert actual[location] == expected[location], f"/stats difiere para location={location}"
+
+if __name__ == "__main__":
+    if "--write-expected" in sys.argv:
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+            json.dump(collect_stats(), f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"[OK] Salida esperada guardada en {EXPECTED_PATH}")
+    else:
+        test_stats_match_expected()
+        print("[OK] /stats coincide con la salida esperada para todas las sedes")
@@ -0,0 +1,200 @@
+"""
+Limpieza de archivos generados (services.storage).
+Sobre una base SQLite temporal y directorios temporales en cada área verifica que
+un barrido con presupuesto 0 conserva los archivos referenciados desde la base
+(por ruta relativa, ruta absoluta o solo nombre de archivo) y la copia
+<nombre>.acta-<hash>.jpg de una foto referenciada, que borra los no referenciados
+salvo los recién escritos, que los archivos de templates/temp caducan después de
+STORAGE_TEMP_MAX_AGE_HOURS aunque sobre presupuesto, y que un dry run informa el
+plan sin escribir nada en stored_files ni borrar archivos.
+
+Uso:
+    python tests/test_storage.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+import database, models
+from services import storage
+from utils import image_derivatives
+
+HOUR = 3600
+
+# Una fábrica por columna protegida: fila mínima que apunta al archivo
+REFERENCES = [
+    lambda value: models.Assignment(pdf_acta_path=value),
+    lambda value: models.Assignment(return_acta_computer_path=value),
+    lambda value: models.Assignment(return_acta_mobile_path=value),
+    lambda value: models.Termination(computer_acta_path=value),
+    lambda value: models.Termination(mobile_acta_path=value),
+    lambda value: models.Sale(acta_path=value, buyer_name="Comprador", buyer_dni="11.111.111-1"),
+    lambda value: models.Decommission(acta_path=value, reason="Prueba"),
+    lambda value: models.Decommission(device_image_path=value, reason="Prueba"),
+    lambda value: models.Decommission(serial_image_path=value, reason="Prueba"),
+    lambda value: models.DocumentTemplate(file_path=value, name="Plantilla", template_type="assignment"),
+]
+
+class Workspace:
+    """Áreas de almacenamiento y base SQLite temporales en lugar de las reales"""
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.dir, 'storage.db')}")
+        models.Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.previous = (storage.AREAS, database.SessionLocal, storage.MIN_AGE_SECONDS, storage.TEMP_MAX_AGE_HOURS)
+        storage.AREAS = {area: os.path.join(self.dir, area) for area in self.previous[0]}
+        database.SessionLocal = self.Session
+        storage.MIN_AGE_SECONDS = HOUR
+        storage.TEMP_MAX_AGE_HOURS = 24
+        self.references = iter(REFERENCES * 3)
+
+    def file(self, area, name, age_hours=48, content=b"x" * 100):
+        """Escribe un archivo en el área con la antigüedad (mtime) indicada"""
+        directory = storage.AREAS[area]
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        timestamp = time.time() - age_hours * HOUR
+        os.utime(path, (timestamp, timestamp))
+        return path
+
+    def reference(self, value):
+        """Guarda `value` en la siguiente columna protegida"""
+        db = self.Session()
+        try:
+            db.add(next(self.references)(value))
+            db.commit()
+        finally:
+            db.close()
+
+    def stored_files(self):
+        db = self.Session()
+        try:
+            return db.execute(select(func.count()).select_from(models.StoredFile.__table__)).scalar()
+        finally:
+            db.close()
+
+    def close(self):
+        storage.AREAS, database.SessionLocal, storage.MIN_AGE_SECONDS, storage.TEMP_MAX_AGE_HOURS = self.previous
+        self.engine.dispose()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+def seed_references(workspace):
+    """En cada área: un archivo referenciado de cada forma y otros sin referencia"""
+    kept, removed = [], []
+    for area in storage.AREAS:
+        relative = workspace.file(area, f"por_ruta_relativa_{area}.docx")
+        workspace.reference(os.path.relpath(relative))
+        absolute = workspace.file(area, f"por_ruta_absoluta_{area}.docx")
+        workspace.reference(absolute)
+        by_name = workspace.file(area, f"por_nombre_{area}.pdf")
+        workspace.reference(f"/api/files/{os.path.basename(by_name)}")
+        kept += [relative, absolute, by_name]
+        # Recién escrito: puede que aún no esté guardado en su fila
+        kept.append(workspace.file(area, "recien_generado.docx", age_hours=0))
+        removed.append(workspace.file(area, "sin_referencia.docx"))
+    return kept, removed
+
+def test_budget_sweep_keeps_referenced_files():
+    workspace = Workspace()
+    try:
+        kept, removed = seed_references(workspace)
+        photo = workspace.file("decommission_uploads", "foto_equipo.png")
+        workspace.reference(photo)
+        derivative = image_derivatives.derivative_path(photo)
+        workspace.file("decommission_uploads", os.path.basename(derivative))
+        orphan_derivative = workspace.file("decommission_uploads", "otra_foto.acta-0123456789abcdef.jpg")
+        kept += [photo, derivative]
+        removed.append(orphan_derivative)
+
+        result = storage.sweep(budget_bytes=0)
+        assert result["total_files"] == len(kept) + len(removed)
+        assert result["deleted_files"] == len(removed)
+        assert sorted(row["path"] for row in result["deleted"]) == sorted(storage._normalize(path) for path in removed)
+        for path in kept:
+            assert os.path.exists(path), f"Se borró un archivo protegido: {path}"
+        for path in removed:
+            assert not os.path.exists(path), f"No se borró: {path}"
+        assert workspace.stored_files() == len(kept)
+        assert result["over_budget"]
+
+        # Un segundo barrido no encuentra nada más que borrar
+        again = storage.sweep(budget_bytes=0)
+        assert again["deleted_files"] == 0 and again["total_files"] == len(kept)
+    finally:
+        workspace.close()
+
+def test_temp_files_expire():
+    workspace = Workspace()
+    try:
+        expired = workspace.file("templates_temp", "vista_previa_vieja.pdf", age_hours=25)
+        fresh = workspace.file("templates_temp", "vista_previa.pdf", age_hours=2)
+        old_acta = workspace.file("actas", "acta_antigua.docx", age_hours=24 * 30)
+        referenced = workspace.file("templates_temp", "subida_pendiente.docx", age_hours=48)
+        workspace.reference(referenced)
+
+        # Con presupuesto de sobra solo caducan los temporales viejos y sin referencia
+        result = storage.sweep(budget_bytes=10 ** 9)
+        assert [row["path"] for row in result["deleted"]] == [storage._normalize(expired)]
+        assert not os.path.exists(expired)
+        assert os.path.exists(fresh) and os.path.exists(old_acta) and os.path.exists(referenced)
+        assert not result["over_budget"]
+
+        storage.TEMP_MAX_AGE_HOURS = 1
+        result = storage.sweep(budget_bytes=10 ** 9)
+        assert [row["path"] for row in result["deleted"]] == [storage._normalize(fresh)]
+        assert os.path.exists(old_acta) and os.path.exists(referenced)
+    finally:
+        workspace.close()
+
+def test_dry_run_writes_nothing():
+    workspace = Workspace()
+    try:
+        kept, removed = seed_references(workspace)
+        plan = storage.sweep(dry_run=True, budget_bytes=0)
+        assert plan["dry_run"] and plan["deleted_files"] == len(removed)
+        assert sorted(row["path"] for row in plan["deleted"]) == sorted(storage._normalize(path) for path in removed)
+        assert workspace.stored_files() == 0
+        for path in kept + removed:
+            assert os.path.exists(path)
+
+        # Con la tabla ya sincronizada, un dry run tampoco registra archivos nuevos ni cambios
+        result = storage.sweep(budget_bytes=10 ** 9)
+        tracked = workspace.stored_files()
+        # Solo caduca el temporal sin referencia
+        assert [row["area"] for row in result["deleted"]] == ["templates_temp"]
+        assert tracked == len(kept) + len(removed) - 1
+        workspace.file("actas", "nuevo.docx")
+        workspace.file("actas", "sin_referencia.docx", content=b"y" * 5000)
+        plan = storage.sweep(dry_run=True, budget_bytes=0)
+        assert plan["total_files"] == tracked + 1
+        assert workspace.stored_files() == tracked
+        db = workspace.Session()
+        try:
+            size = db.execute(
+                select(models.StoredFile.size_bytes)
+                .where(models.StoredFile.path == storage._normalize(os.path.join(storage.AREAS["actas"], "sin_referencia.docx")))
+            ).scalar()
+            assert size == 100
+        finally:
+            db.close()
+        assert os.path.exists(os.path.join(storage.AREAS["actas"], "nuevo.docx"))
+    finally:
+        workspace.close()
+
+if __name__ == "__main__":
+    test_budget_sweep_keeps_referenced_files()
+    test_temp_files_expire()
+    test_dry_run_writes_nothing()
+    print("[OK] Limpieza de archivos generados")
@@ -0,0 +1,125 @@
+"""
+Caché de plantillas compiladas (utils.template_cache).
+Verifica que get_compiled reutiliza la plantilla mientras el archivo no cambia,
+la recompila cuando cambian su mtime o su tamaño, que invalidate() descarta la
+entrada (de una plantilla o todas) y que new_document() entrega copias profundas
+independientes entre sí y del esqueleto.
+
+Uso:
+    python tests/test_template_cache.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import glob
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from utils import template_cache
+
+TEMPLATE_DIRS = [
+    os.path.join(os.path.dirname(BACKEND_DIR), "resources", "templates"),
+    os.path.join(BACKEND_DIR, "templates"),
+]
+
+def sample_template():
+    """Copia temporal de una plantilla incluida en el repositorio (se puede modificar)"""
+    paths = [path for directory in TEMPLATE_DIRS for path in sorted(glob.glob(os.path.join(directory, "*.docx")))]
+    assert paths, "No se encontraron plantillas .docx"
+    out_dir = tempfile.mkdtemp()
+    path = os.path.join(out_dir, "plantilla.docx")
+    shutil.copyfile(paths[0], path)
+    return out_dir, path
+
+class CountingResolver:
+    """resolve() para get_compiled que cuenta cuántas veces se compila"""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self, raw_path):
+        self.calls += 1
+        return self.path
+
+def test_reuses_until_file_changes():
+    template_cache.invalidate()
+    out_dir, path = sample_template()
+    try:
+        resolve = CountingResolver(path)
+        first = template_cache.get_compiled("plantilla.docx", resolve, template_id=1)
+        assert template_cache.get_compiled("plantilla.docx", resolve, template_id=1) is first
+        assert resolve.calls == 1
+
+        # Mismo tamaño, otro mtime
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        second = template_cache.get_compiled("plantilla.docx", resolve, template_id=1)
+        assert second is not first and resolve.calls == 2
+
+        # Otro tamaño (bytes agregados al final del zip) con el mtime conservado
+        stat = os.stat(path)
+        with open(path, "ab") as f:
+            f.write(b"\0" * 16)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        third = template_cache.get_compiled("plantilla.docx", resolve, template_id=1)
+        assert third is not second and resolve.calls == 3
+        assert third.size == second.size + 16
+        assert template_cache.get_compiled("plantilla.docx", resolve, template_id=1) is third
+    finally:
+        template_cache.invalidate()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def test_invalidate_drops_entries():
+    template_cache.invalidate()
+    out_dir, path = sample_template()
+    try:
+        resolve = CountingResolver(path)
+        template_cache.get_compiled("plantilla.docx", resolve, template_id=1)
+        template_cache.get_compiled("plantilla.docx", resolve, template_id=2)
+        assert template_cache.stats()["entries"] == 2
+
+        template_cache.invalidate(1)
+        assert template_cache.stats()["entries"] == 1
+        template_cache.get_compiled("plantilla.docx", resolve, template_id=2)
+        assert resolve.calls == 2  # la plantilla 2 sigue en caché
+        template_cache.get_compiled("plantilla.docx", resolve, template_id=1)
+        assert resolve.calls == 3  # la plantilla 1 se recompila
+
+        template_cache.invalidate()
+        assert template_cache.stats()["entries"] == 0
+    finally:
+        template_cache.invalidate()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def test_new_document_returns_independent_copies():
+    template_cache.invalidate()
+    out_dir, path = sample_template()
+    try:
+        compiled = template_cache.get_compiled("plantilla.docx", CountingResolver(path))
+        skeleton_text = [p.text for p in compiled.new_document().paragraphs]
+        first = compiled.new_document()
+        second = compiled.new_document()
+        assert first is not second and first is not compiled.document
+        assert first.element is not second.element
+
+        first.add_paragraph("SOLO EN LA PRIMERA COPIA")
+        for paragraph in first.paragraphs:
+            for run in paragraph.runs:
+                run.text = "X"
+        assert [p.text for p in second.paragraphs] == skeleton_text
+        assert [p.text for p in compiled.new_document().paragraphs] == skeleton_text
+        assert "SOLO EN LA PRIMERA COPIA" not in [p.text for p in second.paragraphs]
+        assert "SOLO EN LA PRIMERA COPIA" not in "\n".join(compiled._paragraph_texts())
+    finally:
+        template_cache.invalidate()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_reuses_until_file_changes()
+    test_invalidate_drops_entries()
+    test_new_document_returns_independent_copies()
+    print("[OK] Caché de plantillas compiladas")
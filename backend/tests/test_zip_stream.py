@@ -0,0 +1,110 @@
+"""
+ZIP en streaming (utils.zip_stream), usado por la descarga de dos actas, la
+descarga masiva y los trabajos en segundo plano. Verifica que los fragmentos
+producidos, unidos, forman un ZIP válido (zipfile.testzip) con el contenido
+correcto; los nombres repetidos (unique_name); add_file de un archivo mayor que
+CHUNK_SIZE en varios fragmentos; stream_files con remove=True; y que write_files
+no deja el .tmp ni un ZIP parcial cuando falla.
+
+Uso:
+    python tests/test_zip_stream.py
+(las verificaciones también se ejecutan con pytest)
+"""
+import sys
+import os
+import io
+import shutil
+import tempfile
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import zip_stream
+
+def open_zip(data: bytes) -> zipfile.ZipFile:
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    return archive
+
+def test_streamed_chunks_form_a_valid_zip():
+    stream = zip_stream.ZipStream()
+    chunks = []
+    names = []
+    for arcname, data in [("acta.docx", b"uno" * 1000), ("acta.docx", b"dos"), ("acta.docx", b"tres"),
+                          ("LEEME", b"a"), ("LEEME", b"b"), ("fotos/serie.jpg", bytes(range(256)) * 10)]:
+        names.append(stream.add(arcname, data, compression=zipfile.ZIP_STORED if arcname.endswith(".jpg") else None))
+        chunks.append(stream.drain())
+    chunks.append(stream.close())
+    assert names == ["acta.docx", "acta (2).docx", "acta (3).docx", "LEEME", "LEEME (2)", "fotos/serie.jpg"]
+    assert stream.unique_name("acta.docx") == "acta (4).docx"
+
+    archive = open_zip(b"".join(chunks))
+    assert archive.namelist() == names
+    assert archive.read("acta.docx") == b"uno" * 1000
+    assert archive.read("acta (3).docx") == b"tres"
+    assert archive.read("LEEME (2)") == b"b"
+    assert archive.getinfo("fotos/serie.jpg").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("acta.docx").compress_type == zipfile.ZIP_DEFLATED
+
+def test_add_file_larger_than_chunk_size():
+    work_dir = tempfile.mkdtemp()
+    try:
+        data = os.urandom(3 * zip_stream.CHUNK_SIZE + 123)
+        path = os.path.join(work_dir, "grande.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+
+        stream = zip_stream.ZipStream(zipfile.ZIP_STORED)
+        chunks = list(stream.add_file(path, "grande.bin"))
+        assert len(chunks) >= 4  # un fragmento por bloque leído, nunca el archivo entero de una vez
+        assert max(len(chunk) for chunk in chunks) < len(data)
+        chunks += list(stream.add_file(path, "grande.bin"))
+        archive = open_zip(b"".join(chunks) + stream.close())
+        assert archive.namelist() == ["grande.bin", "grande (2).bin"]
+        assert archive.read("grande.bin") == archive.read("grande (2).bin") == data
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_stream_files_and_remove():
+    work_dir = tempfile.mkdtemp()
+    try:
+        files = []
+        for i in range(3):
+            path = os.path.join(work_dir, f"{i}.docx")
+            with open(path, "wb") as f:
+                f.write(f"acta {i}".encode() * 5000)
+            files.append((path, "ACTA.docx"))
+        archive = open_zip(b"".join(zip_stream.stream_files(files, remove=True)))
+        assert archive.namelist() == ["ACTA.docx", "ACTA (2).docx", "ACTA (3).docx"]
+        assert archive.read("ACTA (3).docx") == b"acta 2" * 5000
+        assert not any(os.path.exists(path) for path, _ in files)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def test_write_files_cleans_up_on_error():
+    work_dir = tempfile.mkdtemp()
+    try:
+        existing = os.path.join(work_dir, "a.docx")
+        with open(existing, "wb") as f:
+            f.write(b"a" * (zip_stream.CHUNK_SIZE + 1))
+
+        dest = os.path.join(work_dir, "salida", "actas.zip")
+        assert zip_stream.write_files([(existing, "a.docx")], dest) == dest
+        assert open_zip(open(dest, "rb").read()).read("a.docx") == b"a" * (zip_stream.CHUNK_SIZE + 1)
+
+        failed = os.path.join(work_dir, "salida", "fallido.zip")
+        try:
+            zip_stream.write_files([(existing, "a.docx"), (os.path.join(work_dir, "no-existe.docx"), "b.docx")], failed)
+            assert False, "se esperaba FileNotFoundError"
+        except FileNotFoundError:
+            pass
+        assert sorted(os.listdir(os.path.join(work_dir, "salida"))) == ["actas.zip"]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_streamed_chunks_form_a_valid_zip()
+    test_add_file_larger_than_chunk_size()
+    test_stream_files_and_remove()
+    test_write_files_cleans_up_on_error()
+    print("[OK] ZIP en streaming")
@@ -0,0 +1,104 @@
+"""
+Content-addressed cache of rendered actas.
+
+A render is fully determined by the template file and the values written into
+it, so the generators hash exactly that:
+
+    key = acta_cache.render_key(kind, compiled.digest, placeholders, devices_info, ...)
+    cached = acta_cache.get(key)          # path of a previous identical render, or None
+    ...render...
+    doc.save(acta_cache.temp_path(key)); path = acta_cache.store(key, tmp)
+
+Any change (template file replaced, different mapping, employee data, device
+rows, observations, the date) gives a different key, so entries never need
+explicit invalidation; old ones are simply evicted (least recently used) once
+there are more than ACTA_CACHE_MAX_FILES.
+
+Cached files are shared: callers must not move or delete the returned path.
+Only on-demand downloads use the cache (pdf_generator use_cache=True); paths
+stored in the DB (e.g. pdf_acta_path) keep getting their own file.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+CACHE_DIR = os.getenv("ACTA_CACHE_DIR", "cache/actas")
+MAX_FILES = int(os.getenv("ACTA_CACHE_MAX_FILES", "2000"))
+
+# Bump when the rendering code changes in a way that alters the output
+RENDER_VERSION = 1
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def render_key(*parts) -> str:
+    """sha256 of the render inputs (any JSON-serializable values)."""
+    payload = json.dumps([RENDER_VERSION, *parts], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def path_for(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.docx")
+
+def get(key: str):
+    """Path of the cached render for `key`, or None."""
+    path = path_for(key)
+    try:
+        # Touch: eviction removes the least recently used entries
+        os.utime(path)
+    except OSError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    try:
+        # Keep a PDF converted from this entry newer than it (utils.pdf_render.ensure_pdf)
+        os.utime(path[:-len(".docx")] + ".pdf")
+    except OSError:
+        pass
+    with _lock:
+        _stats["hits"] += 1
+    return path
+
+def temp_path(key: str) -> str:
+    """Unique path to save a new render to before store()."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f".{key}.{uuid.uuid4().hex}.tmp")
+
+def store(key: str, rendered_path: str) -> str:
+    """Move a finished render into the cache (atomically) and return its cached path."""
+    path = path_for(key)
+    os.replace(rendered_path, path)
+    _evict()
+    return path
+
+def _evict():
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".docx")]
+    except OSError:
+        return
+    if len(entries) <= MAX_FILES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    removed = 0
+    for entry in entries[:len(entries) - MAX_FILES]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+        try:
+            # PDF converted from this entry (utils.pdf_render.ensure_pdf)
+            os.remove(entry.path[:-len(".docx")] + ".pdf")
+        except OSError:
+            pass
+    with _lock:
+        _stats["evictions"] += removed
+
+def stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None
+        }
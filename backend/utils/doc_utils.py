@@ -125,9 +125,37 @@ def get_mobile_table_xml(rows: List[List[str]], table_width_pct: int = 5000) ->
     return tbl_start + header_xml + rows_xml + tbl_end
 
 
+# Any {{ KEY }} placeholder, tolerating Word run/proof tags between and inside the
+# braces (e.g. {<w:t>{</w:t>...KEY...}}). Group 1 is the raw text between the braces.
+PLACEHOLDER_PATTERN = re.compile(r"\{(?:<[^>]+>)*\{((?:<[^>]+>|[^{}<])*?)\}(?:<[^>]+>)*\}")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+def _is_text_part(filename: str) -> bool:
+    return filename == 'word/document.xml' or filename.startswith('word/header') or filename.startswith('word/footer')
+
+def replace_placeholders_in_xml(xml_content: str, variables: Dict[str, Any], table_xml_map: Dict[str, str] = None) -> str:
+    """
+    Single pass over an XML part: every placeholder is tokenized once and its key
+    (inner text without tags/whitespace) is looked up in `variables`. Unknown keys
+    are left untouched. Keys also present in `table_xml_map` get the table injected.
+    """
+    if '{' not in xml_content:
+        return xml_content
+    
+    def substitute(match):
+        key = TAG_PATTERN.sub("", match.group(1)).strip()
+        if key not in variables:
+            return match.group(0)
+        if table_xml_map and key in table_xml_map:
+            # Hacky XML injection: Break out of current run/paragraph, insert table, start new
+            return f"</w:t></w:r></w:p>{table_xml_map[key]}<w:p><w:r><w:t>"
+        return str(variables[key])
+    
+    return PLACEHOLDER_PATTERN.sub(substitute, xml_content)
+
 def replace_variables_in_docx(source_path: str, dest_path: str, variables: Dict[str, Any], table_xml_map: Dict[str, str] = None) -> bool:
     """
-    Replace variables in docx using robust regex.
+    Replace variables in docx with a single tokenizer pass per XML part.
     handles split tags in variables (e.g. {{<tag>VAR</tag>}}).
     
     Args:
@@ -145,26 +173,9 @@ def replace_variables_in_docx(source_path: str, dest_path: str, variables: Dict[
                     content = zin.read(item.filename)
                     
                     # Process document body, headers, and footers
-                    if item.filename == 'word/document.xml' or item.filename.startswith('word/header') or item.filename.startswith('word/footer'):
+                    if _is_text_part(item.filename):
                         xml_content = content.decode('utf-8')
-                        
-                        for key, value in variables.items():
-                            val_str = str(value)
-                            
-                            # Robust Pattern allowing whitespace
-                            # Matches {{ KEY }} with optional tags and whitespace
-                            pattern = re.compile(r"\{(?:<[^>]+>)*\{(?:<[^>]+>)*\s*" + re.escape(key) + r"\s*(?:<[^>]+>)*\}(?:<[^>]+>)*\}")
-                            
-                            # Check if this key corresponds to a pre-generated table XML
-                            if table_xml_map and key in table_xml_map:
-                                table_xml = table_xml_map[key]
-                                # Hacky XML injection: Break out of current run/paragraph, insert table, start new
-                                replacement = f"</w:t></w:r></w:p>{table_xml}<w:p><w:r><w:t>"
-                                xml_content = pattern.sub(replacement, xml_content)
-                            else:
-                                xml_content = pattern.sub(val_str, xml_content)
-                            
-                        content = xml_content.encode('utf-8')
+                        content = replace_placeholders_in_xml(xml_content, variables, table_xml_map).encode('utf-8')
                     
                     zout.writestr(item, content)
         return True
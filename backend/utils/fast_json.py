@@ -0,0 +1,29 @@
+"""
+JSON response that serializes with orjson (falls back to the standard library).
+
+Meant for endpoints that already build plain dicts/lists (e.g. ?fields= projections):
+returning ORJSONResponse directly skips FastAPI's jsonable_encoder pass entirely.
+"""
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    print("WARNING: 'orjson' not installed. Falling back to standard json serialization.")
+    ORJSON_AVAILABLE = False
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if ORJSON_AVAILABLE:
+            # Dates/datetimes come out as ISO strings, like jsonable_encoder
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
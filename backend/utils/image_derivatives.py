@@ -0,0 +1,81 @@
+"""
+Downscaled copies of uploaded photos for inserting into actas.
+
+Decommission photos are stored as uploaded (already cropped, but still at
+phone resolution). The acta shows them ~2.5" wide, so re-decoding and
+re-encoding the full image on every (re)generated baja acta is wasted work.
+Instead a derivative is written once, at upload time, next to the original:
+
+    uploads/decommission/<uuid>.jpg
+    uploads/decommission/<uuid>.acta-<hash>.jpg    EXIF-normalized, RGB, <= MAX_PX
+
+<hash> is taken from the original's bytes (and the derivative settings), so a
+replaced photo never reuses a stale copy. Photos uploaded before derivatives
+existed get theirs on first use.
+"""
+import glob
+import hashlib
+import os
+import uuid
+from PIL import Image, ImageOps
+
+# Longest side of the derivative (2.5" at ~480 dpi)
+MAX_PX = int(os.getenv("ACTA_IMAGE_MAX_PX", "1200"))
+JPEG_QUALITY = 90
+
+# Bump when the way derivatives are produced changes
+DERIVATIVE_VERSION = 1
+
+SUFFIX = ".acta-"
+
+def _digest(path: str) -> str:
+    hasher = hashlib.sha256(f"{DERIVATIVE_VERSION}:{MAX_PX}:{JPEG_QUALITY}:".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()[:16]
+
+def derivative_path(original_path: str) -> str:
+    """Where the derivative of the current content of `original_path` lives."""
+    return f"{os.path.splitext(original_path)[0]}{SUFFIX}{_digest(original_path)}.jpg"
+
+def is_derivative(path: str) -> bool:
+    return SUFFIX in os.path.basename(path)
+
+def create_derivative(original_path: str) -> str:
+    """Write (or rewrite) the derivative of `original_path`; returns its path."""
+    path = derivative_path(original_path)
+    with Image.open(original_path) as img:
+        # JPEG: decode directly at a reduced scale instead of full resolution
+        img.draft("RGB", (MAX_PX, MAX_PX))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((MAX_PX, MAX_PX), Image.Resampling.LANCZOS)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        img.save(temp_path, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(temp_path, path)
+    # Derivatives of an earlier version of this photo
+    for stale in glob.glob(glob.escape(os.path.splitext(original_path)[0]) + SUFFIX + "*.jpg"):
+        if stale != path:
+            _remove_file(stale)
+    return path
+
+def get_derivative(original_path: str) -> str:
+    """Path of the derivative of `original_path`, creating it if missing."""
+    path = derivative_path(original_path)
+    if os.path.exists(path):
+        return path
+    print(f"DEBUG: Creating acta image derivative for {original_path}")
+    return create_derivative(original_path)
+
+def remove_derivatives(original_path: str):
+    """Delete every derivative of `original_path` (the original is deleted by the caller)."""
+    for path in glob.glob(glob.escape(os.path.splitext(original_path)[0]) + SUFFIX + "*.jpg"):
+        _remove_file(path)
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
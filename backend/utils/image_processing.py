@@ -1,29 +1,18 @@
-from PIL import Image, ExifTags, ImageFilter
+from PIL import Image, ImageFilter
 import io
+import math
 import os
 import numpy as np
-
-# Intentar importar ultralytics para Deep Learning Local
-try:
-    from ultralytics import YOLO
-    # Cargar modelo Nano (el más ligero/rápido)
-    # Se descargará automáticamente en la primera ejecución
-    print("DEBUG: Loading YOLOv8n model for local Deep Learning...")
-    model = YOLO("yolov8n.pt") 
-    YOLO_AVAILABLE = True
-except ImportError:
-    print("WARNING: 'ultralytics' not installed. Deep Learning features disabled.")
-    YOLO_AVAILABLE = False
-except Exception as e:
-    print(f"WARNING: Error loading YOLO model: {e}")
-    YOLO_AVAILABLE = False
+from utils import image_derivatives, object_detection
 
 def detect_object_yolo(img_pil):
     """
     Usa YOLOv8 localmente para detectar el BBox del objeto principal.
     Retorna (left, top, right, bottom) o None.
+    El modelo se carga en el primer uso (utils.object_detection).
     """
-    if not YOLO_AVAILABLE:
+    detector = object_detection.get_detector()
+    if detector is None:
         return None
 
     try:
@@ -31,62 +20,86 @@ def detect_object_yolo(img_pil):
         # Clases COCO relevantes: Originalmente filtramos, pero un "Teléfono Fijo" puede ser cualquier cosa.
         # Mejor estrategia: Encontrar el objeto con MAYOR confianza/tamaño en la imagen, sea lo que sea.
         
-        results = model(img_pil, verbose=False) # Inferencia
-        
-        # Buscar el objeto con mayor confianza
-        best_box = None
-        max_conf = 0.0
-        
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = model.names[cls]
-                
-                # Debug logging para ver qué detecta
-                print(f"DEBUG: YOLO Candidate: '{class_name}' (conf={conf:.2f})")
-
-                # Aceptamos cualquier objeto con confianza > 0.3
-                # Asumimos que la foto es del activo, así que el objeto dominante es el que queremos.
-                if conf > 0.3 and conf > max_conf:
-                    max_conf = conf
-                    coords = box.xyxy[0].tolist() 
-                    best_box = coords 
-        
-        if best_box:
-            xmin, ymin, xmax, ymax = best_box
-            print(f"DEBUG: YOLO selected best object with conf {max_conf:.2f}: {best_box}")
-            return (xmin, ymin, xmax, ymax)
+        detections = detector.detect(img_pil) # Inferencia
+        return select_main_object(detections)
             
     except Exception as e:
         print(f"ERROR in YOLO inference: {e}")
     
     return None
 
-def smart_crop_image(img, padding_percent=0.15):
+def detect_objects_yolo_batch(images):
     """
-    1. Heurística de Rotación.
-    2. Deep Learning Crop (YOLO).
-    3. Fallback a Bordes.
-    Padding ajustado al 15% (base) para un equilibrio entre safety y crop.
+    detect_object_yolo para varias imágenes con una sola pasada del modelo
+    (detect_batch). Misma caja por imagen que detectarlas una a una.
     """
+    detector = object_detection.get_detector()
+    if detector is None:
+        return [None] * len(images)
+
+    try:
+        return [select_main_object(detections) for detections in detector.detect_batch(images)]
+    except Exception as e:
+        print(f"ERROR in YOLO batch inference: {e}. Falling back to one image at a time.")
+        return [detect_object_yolo(img) for img in images]
+
+def select_main_object(detections):
+    """Caja (left, top, right, bottom) del objeto con mayor confianza, o None."""
+    # Buscar el objeto con mayor confianza
+    best_box = None
+    max_conf = 0.0
     
-    # 1. HEURÍSTICA DE ROTACIÓN (Siempre activa)
-    # Regla: Si Alto > Ancho (Vertical), rotar a Horizontal.
-    # User feedback: "roto pero lado contrario" -> Cambiamos de -90 a 90.
-    w, h = img.size
-    print(f"DEBUG: Pre-processing size: {w}x{h}")
+    for xmin, ymin, xmax, ymax, conf, class_name in detections:
+        # Debug logging para ver qué detecta
+        print(f"DEBUG: YOLO Candidate: '{class_name}' (conf={conf:.2f})")
+
+        # Aceptamos cualquier objeto con confianza > 0.3
+        # Asumimos que la foto es del activo, así que el objeto dominante es el que queremos.
+        if conf > 0.3 and conf > max_conf:
+            max_conf = conf
+            best_box = [xmin, ymin, xmax, ymax]
     
+    if best_box:
+        xmin, ymin, xmax, ymax = best_box
+        print(f"DEBUG: YOLO selected best object with conf {max_conf:.2f}: {best_box}")
+        return (xmin, ymin, xmax, ymax)
+    return None
+
+# Lado mayor de la copia reducida usada para YOLO / bordes
+DETECTION_PX = object_detection.INPUT_SIZE
+# Lado mayor de la imagen guardada (0 = tamaño del recorte, sin reducir)
+MAX_OUTPUT_PX = int(os.getenv("IMAGE_MAX_OUTPUT_PX", "2048"))
+# Fallback a bordes: lado mayor de la copia analizada, umbral del mapa de bordes y
+# % de píxeles de borde que se descartan en cada extremo (fondos con ruido; 0 = getbbox)
+EDGE_DETECTION_PX = DETECTION_PX
+EDGE_THRESHOLD = 50
+# Radio del blur medido en píxeles de la foto original; en la copia reducida se escala,
+# con un mínimo que sigue suavizando el ruido de 1 px
+EDGE_BLUR_RADIUS = 2
+EDGE_MIN_BLUR_RADIUS = 0.5
+EDGE_TRIM_PERCENT = float(os.getenv("EDGE_TRIM_PERCENT", "0"))
+
+def rotate_to_landscape(img):
+    """
+    HEURÍSTICA DE ROTACIÓN (Siempre activa)
+    Regla: Si Alto > Ancho (Vertical), rotar a Horizontal.
+    User feedback: "roto pero lado contrario" -> Cambiamos de -90 a 90.
+    """
+    w, h = img.size
     if h > w:
         print("DEBUG: Image is Vertical (H > W). Applying heuristic rotation (90 deg).")
-        img = img.rotate(90, expand=True) 
-        w, h = img.size 
+        img = img.rotate(90, expand=True)
+    return img
 
-    # 2. DEEP LEARNING CROP (Local YOLO)
-    yolo_bbox = detect_object_yolo(img)
-    final_img = img # Default to current img
+def find_crop_box(img, yolo_bbox, padding_percent=0.15, source_size=None):
+    """
+    Caja de recorte (left, top, right, bottom) en coordenadas de `img`:
+    objeto detectado por YOLO (yolo_bbox, de detect_object_yolo) con padding o,
+    si no hay, fallback a bordes (source_size: ver edge_crop_box). None si no hay nada que recortar.
+    """
+    w, h = img.size
 
+    # 2. DEEP LEARNING CROP (Local YOLO)
     if yolo_bbox:
         left, top, right, bottom = yolo_bbox
         
@@ -115,35 +128,73 @@ def smart_crop_image(img, padding_percent=0.15):
         right = min(w, right + pad_w)
         bottom = min(h, bottom + pad_h)
         
-        final_img = img.crop((left, top, right, bottom))
+        return (left, top, right, bottom)
 
-    else:
-        # 3. FALLBACK: Detección de Bordes Clásica
-        print("DEBUG: Using basic edge-detection crop (YOLO found nothing).")
-        try:
-            gray = img.convert("L")
-            blurred = gray.filter(ImageFilter.GaussianBlur(radius=2))
-            edges = blurred.filter(ImageFilter.FIND_EDGES)
-            threshold = 50
-            bw = edges.point(lambda x: 0 if x < threshold else 255)
-            bbox = bw.getbbox()
-            
-            if bbox:
-                left, top, right, bottom = bbox
-                pad_w = int(w * 0.05)
-                pad_h = int(h * 0.05)
-                left = max(0, left - pad_w)
-                top = max(0, top - pad_h)
-                right = min(w, right + pad_w)
-                bottom = min(h, bottom + pad_h)
-                final_img = img.crop((left, top, right, bottom))
-        except Exception as e:
-            print(f"DEBUG: Edge crop failed: {e}")
-            final_img = img
+    # 3. FALLBACK: Detección de Bordes Clásica
+    print("DEBUG: Using basic edge-detection crop (YOLO found nothing).")
+    try:
+        bbox = edge_crop_box(img, source_size=source_size)
+        
+        if bbox:
+            left, top, right, bottom = bbox
+            pad_w = int(w * 0.05)
+            pad_h = int(h * 0.05)
+            left = max(0, left - pad_w)
+            top = max(0, top - pad_h)
+            right = min(w, right + pad_w)
+            bottom = min(h, bottom + pad_h)
+            return (left, top, right, bottom)
+    except Exception as e:
+        print(f"DEBUG: Edge crop failed: {e}")
+    return None
+
+def edge_crop_box(img, trim_percent=None, source_size=None):
+    """
+    Caja (left, top, right, bottom) de los bordes detectados en `img`, sin padding, o None.
+    Analiza una copia de a lo sumo EDGE_DETECTION_PX px: blur + FIND_EDGES y luego
+    umbral y proyecciones por columna/fila con numpy. source_size: tamaño de la foto
+    original si `img` ya es una copia reducida (crop_multires), para escalar el blur.
+    """
+    trim_percent = EDGE_TRIM_PERCENT if trim_percent is None else trim_percent
+    w, h = img.size
+    gray = img.convert("L")
+    gray.thumbnail((EDGE_DETECTION_PX, EDGE_DETECTION_PX), Image.Resampling.BILINEAR)
+    scale = max(gray.size) / max(source_size or img.size)
+    radius = EDGE_BLUR_RADIUS if scale >= 1 else max(EDGE_MIN_BLUR_RADIUS, EDGE_BLUR_RADIUS * scale)
+    blurred = gray.filter(ImageFilter.GaussianBlur(radius=radius))
+    edges = blurred.filter(ImageFilter.FIND_EDGES)
+    # Ojo: los filtros 3x3 de PIL copian el marco de 1 px sin filtrar, así que un fondo
+    # claro (>= umbral) cuenta como borde y la caja es la imagen completa (igual que antes)
+    mask = np.asarray(edges) >= EDGE_THRESHOLD
+
+    columns = _projection_bounds(mask.sum(axis=0), trim_percent)
+    rows = _projection_bounds(mask.sum(axis=1), trim_percent)
+    if columns is None:
+        return None
+    scale_x, scale_y = w / gray.width, h / gray.height
+    return (round(columns[0] * scale_x), round(rows[0] * scale_y),
+            min(w, round(columns[1] * scale_x)), min(h, round(rows[1] * scale_y)))
+
+def _projection_bounds(counts, trim_percent):
+    """
+    [inicio, fin) de una proyección (píxeles de borde por columna o fila). Con trim_percent
+    se ignora ese % del total de píxeles de borde en cada extremo; con 0 es el primer y el
+    último índice con algún borde, como getbbox().
+    """
+    total = counts.sum()
+    if not total:
+        return None
+    cumulative = np.cumsum(counts)
+    start = int(np.searchsorted(cumulative, total * trim_percent / 100, side="right"))
+    end = int(np.searchsorted(cumulative, total * (1 - trim_percent / 100), side="left")) + 1
+    return start, max(end, start + 1)
 
-    # 4. POST-CROP CHECK: FORZAR HORIZONTAL
-    # A veces el crop (especialmente de etiquetas) vuelve a dejar la imagen vertical.
-    # Si sigue siendo vertical, la rotamos 90 grados para asegurar legibilidad.
+def force_landscape(final_img):
+    """
+    POST-CROP CHECK: FORZAR HORIZONTAL
+    A veces el crop (especialmente de etiquetas) vuelve a dejar la imagen vertical.
+    Si sigue siendo vertical, la rotamos 90 grados para asegurar legibilidad.
+    """
     fw, fh = final_img.size
     print(f"DEBUG: Final Image Size: {fw}x{fh} (Aspect Ratio: {fw/fh:.2f})")
     
@@ -153,43 +204,171 @@ def smart_crop_image(img, padding_percent=0.15):
 
     return final_img
 
+def smart_crop_image(img, padding_percent=0.15):
+    """
+    1. Heurística de Rotación.
+    2. Deep Learning Crop (YOLO).
+    3. Fallback a Bordes.
+    Padding ajustado al 15% (base) para un equilibrio entre safety y crop.
+    Trabaja sobre la imagen a resolución completa; process_and_save_image detecta
+    sobre una copia reducida (ver crop_multires).
+    """
+    print(f"DEBUG: Pre-processing size: {img.size[0]}x{img.size[1]}")
+    img = rotate_to_landscape(img)
+    box = find_crop_box(img, detect_object_yolo(img), padding_percent)
+    final_img = img.crop(box) if box else img
+    return force_landscape(final_img)
+
+# Rotación (antihoraria, grados) para cada valor de EXIF Orientation que corregimos
+EXIF_ROTATION = {3: 180, 6: 270, 8: 90}
+
+def get_exif_orientation(img):
+    """Valor del tag EXIF Orientation (274) o None."""
+    try:
+        return img.getexif().get(274)
+    except Exception:
+        return None
+
+def apply_exif_orientation(img, orientation):
+    """Corregir Orientación EXIF (solo rotaciones, como siempre)."""
+    angle = EXIF_ROTATION.get(orientation)
+    return img.rotate(angle, expand=True) if angle else img
+
+def _open_reduced(content: bytes, min_size: tuple):
+    """
+    Abre la imagen decodificando el JPEG a la menor escala (1/2, 1/4, 1/8) que
+    sigue cubriendo `min_size`; otros formatos se decodifican completos.
+    """
+    img = Image.open(io.BytesIO(content))
+    img.draft(img.mode, min_size)
+    if img.mode in ("RGBA", "P"):
+        img = img.convert("RGB")
+    else:
+        img.load()
+    return img
+
+def _unrotate_box(box, angle):
+    """Caja en fracciones (l, t, r, b) de la imagen rotada `angle` grados -> fracciones de la imagen sin rotar."""
+    for _ in range((angle // 90) % 4):
+        left, top, right, bottom = box
+        box = (1 - bottom, left, 1 - top, right)
+    return box
+
+def prepare_detection(content: bytes) -> dict:
+    """
+    Paso 1 de crop_multires: copia de ~DETECTION_PX px decodificada con draft() y ya
+    orientada (EXIF + heurística vertical), sobre la que corre la detección.
+    """
+    source = Image.open(io.BytesIO(content))
+    orientation = get_exif_orientation(source)
+    print(f"DEBUG: Original Image Size: {source.size}, Mode: {source.mode}, EXIF Orientation: {orientation}")
+
+    small = _open_reduced(content, (DETECTION_PX, DETECTION_PX))
+    small.thumbnail((DETECTION_PX, DETECTION_PX), Image.Resampling.BILINEAR)
+    small = apply_exif_orientation(small, orientation)
+    angle = EXIF_ROTATION.get(orientation, 0) + (90 if small.height > small.width else 0)
+    return {"image": rotate_to_landscape(small), "angle": angle, "raw_size": source.size}
+
+def crop_prepared(content: bytes, prepared: dict, yolo_bbox, padding_percent=0.15, max_output_px=None):
+    """
+    Pasos 2 y 3 de crop_multires, con la detección (yolo_bbox) ya hecha sobre prepared["image"].
+    """
+    max_output_px = MAX_OUTPUT_PX if max_output_px is None else max_output_px
+    small, angle = prepared["image"], prepared["angle"]
+    raw_w, raw_h = prepared["raw_size"]
+    box = find_crop_box(small, yolo_bbox, padding_percent, source_size=prepared["raw_size"])
+    sw, sh = small.size
+    box = (box[0] / sw, box[1] / sh, box[2] / sw, box[3] / sh) if box else (0, 0, 1, 1)
+    left, top, right, bottom = _unrotate_box(box, angle)
+
+    # 2. Escala necesaria del original: el recorte no necesita más de max_output_px
+    crop_long_side = max((right - left) * raw_w, (bottom - top) * raw_h)
+    scale = min(1.0, max_output_px / crop_long_side) if max_output_px and crop_long_side else 1.0
+    img = _open_reduced(content, (math.ceil(raw_w * scale), math.ceil(raw_h * scale)))
+
+    # 3. Recorte y resize únicos, luego orientación
+    w, h = img.size
+    crop_box = (round(left * w), round(top * h), round(right * w), round(bottom * h))
+    out_size = (round(raw_w * scale * (right - left)), round(raw_h * scale * (bottom - top)))
+    crop_size = (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1])
+    if min(out_size) >= 1 and out_size[0] < crop_size[0] and out_size[1] < crop_size[1]:
+        final_img = img.resize(out_size, Image.Resampling.LANCZOS, box=crop_box)
+    else:
+        final_img = img.crop(crop_box)
+    if angle % 360:
+        final_img = final_img.rotate(angle % 360, expand=True)
+    return force_landscape(final_img)
+
+def crop_multires(content: bytes, padding_percent=0.15, max_output_px=None):
+    """
+    Smart crop en dos resoluciones:
+    1. Detección (YOLO / bordes) sobre una copia de ~DETECTION_PX px (prepare_detection).
+    2. La caja se pasa a fracciones de la imagen sin rotar y el original se decodifica
+       a la menor escala que alcanza para el tamaño final (max_output_px).
+    3. Recorte + resize en una sola pasada; la rotación se aplica al resultado, ya pequeño.
+    """
+    prepared = prepare_detection(content)
+    return crop_prepared(content, prepared, detect_object_yolo(prepared["image"]), padding_percent, max_output_px)
+
 def process_and_save_image(file_content: bytes, save_path: str):
     """
     Procesa la imagen (rotación, crop, conversión) y la guarda en disco.
     """
     try:
         print(f"DEBUG: Processing image -> {save_path}")
-        img = Image.open(io.BytesIO(file_content))
-        print(f"DEBUG: Original Image Size: {img.size}, Mode: {img.mode}")
-        
-        # 1. Corregir Orientación EXIF
-        try:
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            exif = dict(img._getexif().items())
-            print(f"DEBUG: EXIF Orientation: {exif.get(orientation, 'None')}")
-            
-            if exif[orientation] == 3: img = img.rotate(180, expand=True)
-            elif exif[orientation] == 6: img = img.rotate(270, expand=True)
-            elif exif[orientation] == 8: img = img.rotate(90, expand=True)
-        except (AttributeError, KeyError, IndexError, TypeError):
-            print("DEBUG: No EXIF Orientation found.")
-            pass
-
-        # 2. Asegurar RGB
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
-            
-        # 3. Aplicar Smart Crop (Local Deep Learning + Heuristics)
-        img = smart_crop_image(img)
+
+        # Corregir orientación EXIF, asegurar RGB y Smart Crop (Local Deep Learning + Heuristics)
+        img = crop_multires(file_content)
         
         # 4. Guardar
-        img.save(save_path, format='JPEG', quality=85)
-        print("DEBUG: Image saved successfully.")
+        _save_processed(img, save_path)
         return True
     except Exception as e:
-        print(f"ERROR processing image: {e}")
-        with open(save_path, "wb") as f:
-            f.write(file_content)
-        return False
+        return _keep_original(file_content, save_path, e)
+
+def process_and_save_images(items: list) -> list:
+    """
+    process_and_save_image para varias imágenes [(contenido, ruta)], con la detección
+    YOLO de todas en una sola pasada del modelo. Cada imagen queda igual que subida
+    sola; retorna un bool por imagen.
+    """
+    prepared = []
+    for content, save_path in items:
+        try:
+            prepared.append(prepare_detection(content))
+        except Exception as e:
+            prepared.append(e)
+    ready = [p for p in prepared if not isinstance(p, Exception)]
+    boxes = iter(detect_objects_yolo_batch([p["image"] for p in ready]) if ready else [])
+
+    results = []
+    for (content, save_path), p in zip(items, prepared):
+        try:
+            print(f"DEBUG: Processing image -> {save_path}")
+            if isinstance(p, Exception):
+                raise p
+            _save_processed(crop_prepared(content, p, next(boxes)), save_path)
+            results.append(True)
+        except Exception as e:
+            results.append(_keep_original(content, save_path, e))
+    return results
+
+def _save_processed(img, save_path: str):
+    img.save(save_path, format='JPEG', quality=85)
+    print("DEBUG: Image saved successfully.")
+    _create_acta_derivative(save_path)
+
+def _keep_original(file_content: bytes, save_path: str, error: Exception) -> bool:
+    """Si el procesamiento falla se guarda la imagen tal como se subió."""
+    print(f"ERROR processing image: {error}")
+    with open(save_path, "wb") as f:
+        f.write(file_content)
+    _create_acta_derivative(save_path)
+    return False
+
+def _create_acta_derivative(save_path: str):
+    """Copia reducida para las actas (utils.image_derivatives); si falla se crea al generar el acta."""
+    try:
+        image_derivatives.create_derivative(save_path)
+    except Exception as e:
+        print(f"WARNING: Could not create acta derivative for {save_path}: {e}")
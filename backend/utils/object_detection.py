@@ -0,0 +1,236 @@
+"""
+Object detection for the smart crop of uploaded photos (utils.image_processing).
+
+The model is loaded on first use, not at import: importing ultralytics pulls
+torch into every worker and YOLO() may download the weights, which used to
+happen in whichever request first imported image_processing. get_detector()
+builds one detector per process behind a lock; set YOLO_WARMUP=1 to load it
+(and run one inference) when the image workers start instead
+(services.image_pipeline).
+
+Backends (DETECTION_BACKEND):
+- ultralytics: YOLOv8 through ultralytics/torch (YOLO_WEIGHTS, default yolov8n.pt).
+- onnx:        the same model exported to ONNX (YOLO_ONNX_PATH, default yolov8n.onnx)
+               run by onnxruntime on CPU. No torch in memory, and lower
+               single-image latency. Export it once with:
+
+                   python -m utils.object_detection --export [--batch N | --dynamic]
+
+               --batch / --dynamic let batch uploads (detect_batch) run
+               several photos per inference instead of one at a time.
+
+- none:        detection disabled (smart crop falls back to edge detection).
+
+Every backend returns the same detections: [(xmin, ymin, xmax, ymax, conf, class_name)]
+in the coordinates of the image passed in, sorted by confidence.
+"""
+import ast
+import os
+import threading
+import numpy as np
+from PIL import Image
+
+BACKEND = os.getenv("DETECTION_BACKEND", "ultralytics").lower()
+YOLO_WEIGHTS = os.getenv("YOLO_WEIGHTS", "yolov8n.pt")
+YOLO_ONNX_PATH = os.getenv("YOLO_ONNX_PATH", "yolov8n.onnx")
+WARMUP_AT_STARTUP = os.getenv("YOLO_WARMUP", "0").lower() in ("1", "true", "yes")
+# onnxruntime intra-op threads (0: onnxruntime default, one per core)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+# Same defaults as ultralytics predict()
+INPUT_SIZE = 640
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = (114, 114, 114)
+
+class UltralyticsDetector:
+    name = "ultralytics"
+
+    def __init__(self, weights: str = YOLO_WEIGHTS):
+        from ultralytics import YOLO
+        # Se descargará automáticamente en la primera ejecución
+        print(f"DEBUG: Loading YOLO model {weights} (ultralytics)...")
+        self.model = YOLO(weights)
+
+    def detect(self, img: Image.Image) -> list:
+        return self.detect_batch([img])[0]
+
+    def detect_batch(self, images: list) -> list:
+        # One forward pass per image size: ultralytics only letterboxes a batch the way it
+        # letterboxes a single image when every image has the same shape
+        batch = [None] * len(images)
+        by_size = {}
+        for i, img in enumerate(images):
+            by_size.setdefault(img.size, []).append(i)
+        for indices in by_size.values():
+            results = self.model([images[i] for i in indices], verbose=False, conf=CONF_THRESHOLD,
+                                 iou=IOU_THRESHOLD, max_det=MAX_DETECTIONS)
+            for i, result in zip(indices, results):
+                detections = []
+                for box in result.boxes:
+                    xmin, ymin, xmax, ymax = box.xyxy[0].tolist()
+                    detections.append((xmin, ymin, xmax, ymax, float(box.conf[0]), self.model.names[int(box.cls[0])]))
+                batch[i] = sorted(detections, key=lambda d: d[4], reverse=True)
+        return batch
+
+class OnnxDetector:
+    name = "onnx"
+
+    def __init__(self, model_path: str = YOLO_ONNX_PATH):
+        import onnxruntime as ort
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found (export it with: python -m utils.object_detection --export)")
+        print(f"DEBUG: Loading YOLO model {model_path} (onnxruntime CPU)...")
+        options = ort.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static export: [1, 3, 640, 640]; dynamic axes come back as strings
+        self.input_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else INPUT_SIZE
+        # Images per run: fixed by the export (--batch N), or None if the batch axis is dynamic (--dynamic)
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+    def detect(self, img: Image.Image) -> list:
+        return self.detect_batch([img])[0]
+
+    def detect_batch(self, images: list) -> list:
+        letterboxed = [letterbox(img, self.input_size) for img in images]
+        run_size = self.batch_size or max(1, len(images))
+        outputs = []
+        for start in range(0, len(letterboxed), run_size):
+            tensors = [tensor for tensor, _, _ in letterboxed[start:start + run_size]]
+            count = len(tensors)
+            # Fixed-size batches: fill the last one with blank images
+            tensors += [np.full_like(tensors[0], LETTERBOX_COLOR[0] / 255.0)] * (run_size - count)
+            outputs.extend(self.session.run(None, {self.input_name: np.stack(tensors)})[0][:count])
+        return [
+            postprocess(output, scale, offset, img.size, self.names)
+            for img, output, (_, scale, offset) in zip(images, outputs, letterboxed)
+        ]
+
+def letterbox(img: Image.Image, size: int = INPUT_SIZE):
+    """
+    Resize keeping the aspect ratio and pad to size x size (as ultralytics does).
+    Returns (CHW float32 tensor in 0..1, scale, (pad_left, pad_top)).
+    """
+    w, h = img.size
+    scale = min(size / w, size / h)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+    resized = img.convert("RGB").resize((new_w, new_h), Image.Resampling.BILINEAR)
+    offset = ((size - new_w) // 2, (size - new_h) // 2)
+    canvas = Image.new("RGB", (size, size), LETTERBOX_COLOR)
+    canvas.paste(resized, offset)
+    tensor = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1) / 255.0
+    return np.ascontiguousarray(tensor), scale, offset
+
+def postprocess(output: np.ndarray, scale: float, offset: tuple, image_size: tuple, names: dict = None) -> list:
+    """
+    YOLOv8 head output [4 + classes, anchors] (cx, cy, w, h, class scores) ->
+    detections in the original image's coordinates, after per-class NMS.
+    """
+    predictions = output.T
+    class_ids = predictions[:, 4:].argmax(axis=1)
+    scores = predictions[np.arange(len(predictions)), 4 + class_ids]
+    keep = scores > CONF_THRESHOLD
+    predictions, class_ids, scores = predictions[keep], class_ids[keep], scores[keep]
+    if not len(scores):
+        return []
+
+    cx, cy, bw, bh = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+    boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    # Undo the letterbox
+    boxes -= np.array([offset[0], offset[1], offset[0], offset[1]], dtype=boxes.dtype)
+    boxes /= scale
+    w, h = image_size
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+
+    selected = nms(boxes, scores, class_ids)[:MAX_DETECTIONS]
+    names = names or {}
+    return [
+        (*(float(v) for v in boxes[i]), float(scores[i]), names.get(int(class_ids[i]), str(int(class_ids[i]))))
+        for i in selected
+    ]
+
+def nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float = IOU_THRESHOLD) -> list:
+    """Indices kept by per-class non-maximum suppression, highest score first."""
+    # Offset boxes by class so boxes of different classes never overlap
+    shifted = boxes + (class_ids * (boxes.max() + 1))[:, None]
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        xx1 = np.maximum(shifted[i, 0], shifted[rest, 0])
+        yy1 = np.maximum(shifted[i, 1], shifted[rest, 1])
+        xx2 = np.minimum(shifted[i, 2], shifted[rest, 2])
+        yy2 = np.minimum(shifted[i, 3], shifted[rest, 3])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[i] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+BACKENDS = {
+    "ultralytics": UltralyticsDetector,
+    "onnx": OnnxDetector,
+}
+
+_detector = None
+_load_failed = False
+_lock = threading.Lock()
+
+def get_detector():
+    """This process's detector (loaded on first call), or None if detection is unavailable."""
+    global _detector, _load_failed
+    if _detector is None and not _load_failed:
+        with _lock:
+            if _detector is None and not _load_failed:
+                if BACKEND not in BACKENDS:
+                    if BACKEND != "none":
+                        print(f"WARNING: Unknown DETECTION_BACKEND '{BACKEND}'. Deep Learning features disabled.")
+                    _load_failed = True
+                    return None
+                try:
+                    _detector = BACKENDS[BACKEND]()
+                except ImportError as e:
+                    print(f"WARNING: Detection backend '{BACKEND}' not installed ({e}). Deep Learning features disabled.")
+                    _load_failed = True
+                except Exception as e:
+                    print(f"WARNING: Error loading detection model ({BACKEND}): {e}")
+                    _load_failed = True
+    return _detector
+
+def warmup():
+    """Load the model and run one inference, so the first upload doesn't pay for it."""
+    detector = get_detector()
+    if detector is not None:
+        detector.detect(Image.new("RGB", (INPUT_SIZE, INPUT_SIZE), LETTERBOX_COLOR))
+        print(f"DEBUG: Detection backend '{detector.name}' warmed up")
+    return detector
+
+def export_onnx(weights: str = YOLO_WEIGHTS, output_path: str = YOLO_ONNX_PATH, batch: int = 1, dynamic: bool = False) -> str:
+    """
+    Export the ultralytics weights to a 640x640 ONNX model at `output_path`, taking
+    `batch` images per run (or any number with dynamic=True) for detect_batch.
+    """
+    from ultralytics import YOLO
+    exported = YOLO(weights).export(format="onnx", imgsz=INPUT_SIZE, batch=batch, dynamic=dynamic, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(output_path):
+        os.replace(exported, output_path)
+    return output_path
+
+if __name__ == "__main__":
+    import sys
+    if "--export" in sys.argv:
+        batch = int(sys.argv[sys.argv.index("--batch") + 1]) if "--batch" in sys.argv else 1
+        print(f"[OK] Exported {export_onnx(batch=batch, dynamic='--dynamic' in sys.argv)}")
+    else:
+        print(f"[->] Warming up backend '{BACKEND}'")
+        print("[OK]" if warmup() else "[X] Detection unavailable")
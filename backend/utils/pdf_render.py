@@ -0,0 +1,612 @@
+"""
+Linux-native PDF output for generated actas.
+
+docx2pdf drives Microsoft Word and can't run on the Linux deployment, so the
+filled .docx is laid out again with reportlab (already a dependency) instead:
+page size and margins, paragraphs (alignment, spacing, indentation, bold /
+italic / underline / size / color, bullets and numbering), tables (grid
+widths, merged cells, borders, shading, nested tables), inline images and the
+default header / footer of the first section. That covers the layouts the
+acta templates use (assignment, return, decommission, sale); floating shapes
+are placed inline and text boxes are rendered as normal paragraphs.
+
+    pdf_path = pdf_render.ensure_pdf(docx_path)     # <docx>.pdf, reused while newer
+
+Routes expose it with `?format=pdf` through acta_response() / pdf_filename().
+"""
+import io
+import os
+import uuid
+from xml.sax.saxutils import escape
+from docx import Document
+from docx.oxml.ns import qn
+from fastapi import HTTPException
+from fastapi.responses import FileResponse
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Paragraph, Spacer, Table, TableStyle, Image, Frame
+
+ACTA_FORMATS = ("docx", "pdf")
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MEDIA_TYPE = "application/pdf"
+
+EMU_PER_PT = 12700
+TWIPS_PER_PT = 20
+DEFAULT_FONT_SIZE = 11
+DEFAULT_PAGE = (612, 792)  # Letter
+DEFAULT_MARGIN = 72
+
+ALIGNMENTS = {"left": TA_LEFT, "start": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT,
+              "end": TA_RIGHT, "both": TA_JUSTIFY, "distribute": TA_JUSTIFY}
+NO_BORDER = ("nil", "none")
+A_BLIP = "{http://schemas.openxmlformats.org/drawingml/2006/main}blip"
+R_EMBED = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+WP_EXTENT = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}extent"
+MC_ALTERNATE = "{http://schemas.openxmlformats.org/markup-compatibility/2006}AlternateContent"
+MC_CHOICE = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Choice"
+V_IMAGEDATA = "{urn:schemas-microsoft-com:vml}imagedata"
+
+# Calibri (Word's default body font) is narrower than Helvetica: without a
+# metric-compatible font (Carlito) text is set smaller so lines wrap like in Word
+CALIBRI_FALLBACK_SCALE = 0.9
+FONT_DIRS = [d for d in (os.getenv("PDF_FONTS_DIR"), "/usr/share/fonts/truetype/crosextra",
+                         "/usr/share/fonts/crosextra", "/usr/share/fonts/truetype/carlito") if d]
+CARLITO_FILES = {"Carlito": "Carlito-Regular.ttf", "Carlito-Bold": "Carlito-Bold.ttf",
+                 "Carlito-Italic": "Carlito-Italic.ttf", "Carlito-BoldItalic": "Carlito-BoldItalic.ttf"}
+
+# Elements whose children are walked as if they were inline in the paragraph
+RUN_CONTAINERS = {qn("w:hyperlink"), qn("w:ins"), qn("w:smartTag"), qn("w:fldSimple"), qn("w:customXml")}
+
+def _attr(element, name, default=None):
+    if element is None:
+        return default
+    return element.get(qn(name), default)
+
+def _twips(value, default=0.0):
+    try:
+        return int(value) / TWIPS_PER_PT
+    except (TypeError, ValueError):
+        return default
+
+_body_font = None
+
+def _calibri_font():
+    """("Carlito", 1.0) when the font files are available, else ("Helvetica", CALIBRI_FALLBACK_SCALE)."""
+    global _body_font
+    if _body_font is None:
+        _body_font = ("Helvetica", CALIBRI_FALLBACK_SCALE)
+        for directory in FONT_DIRS:
+            paths = {name: os.path.join(directory, filename) for name, filename in CARLITO_FILES.items()}
+            if all(os.path.exists(path) for path in paths.values()):
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                for name, path in paths.items():
+                    pdfmetrics.registerFont(TTFont(name, path))
+                pdfmetrics.registerFontFamily("Carlito", normal="Carlito", bold="Carlito-Bold",
+                                              italic="Carlito-Italic", boldItalic="Carlito-BoldItalic")
+                _body_font = ("Carlito", 1.0)
+                break
+    return _body_font
+
+def _pdf_font(family: str):
+    """(reportlab font, size factor) for a Word font name ('' = theme / default font)."""
+    family = (family or "").lower()
+    if "times" in family or "georgia" in family or "cambria" in family or "serif" in family:
+        return "Times-Roman", 1.0
+    if "courier" in family or "consol" in family or "mono" in family:
+        return "Courier", 1.0
+    if "arial" in family or "helvetica" in family or "liberation sans" in family:
+        return "Helvetica", 1.0
+    # Calibri, Aptos, theme fonts and anything else
+    return _calibri_font()
+
+def _spacing_props(spacing):
+    """before / after (points) and line height (multiple, or points for exact/atLeast) of a w:spacing."""
+    props = {}
+    if spacing is None:
+        return props
+    for name in ("before", "after"):
+        if _attr(spacing, f"w:{name}") is not None and _attr(spacing, f"w:{name}Autospacing") not in ("1", "true"):
+            props[name] = _twips(_attr(spacing, f"w:{name}"))
+    if _attr(spacing, "w:line") is not None:
+        if _attr(spacing, "w:lineRule", "auto") == "auto":
+            props["line"] = int(_attr(spacing, "w:line")) / 240
+        else:
+            props["line_pt"] = _twips(_attr(spacing, "w:line"))
+    return props
+
+def _is_on(element):
+    """w:b / w:i style toggles: present and not val=false/0."""
+    return element is not None and _attr(element, "w:val", "true") not in ("false", "0", "off")
+
+class _DocxLayout:
+    """Builds reportlab flowables from the parts of one python-docx Document."""
+
+    def __init__(self, document):
+        self.document = document
+        self.styles, self.default_size, self.defaults = self._load_styles()
+        self.numbering = self._load_numbering()
+        self._counters = {}
+        # Paragraph properties of the enclosing table's style (Word: defaults < table style < paragraph style)
+        self._table_props = {}
+
+    # --- styles / numbering -------------------------------------------------
+
+    def _load_styles(self):
+        """
+        (styleId -> {size, bold, italic, font, jc, before, after, line} with basedOn resolved,
+        default font size, docDefaults paragraph/run properties)
+        """
+        raw = {}
+        default_size = DEFAULT_FONT_SIZE
+        try:
+            element = self.document.styles.element
+        except Exception:
+            return {}, default_size, {}
+        sz = element.find(f"{qn('w:docDefaults')}/{qn('w:rPrDefault')}/{qn('w:rPr')}/{qn('w:sz')}")
+        if sz is not None:
+            default_size = int(_attr(sz, "w:val", DEFAULT_FONT_SIZE * 2)) / 2
+        defaults = _spacing_props(element.find(f"{qn('w:docDefaults')}/{qn('w:pPrDefault')}/{qn('w:pPr')}/{qn('w:spacing')}"))
+        default_fonts = element.find(f"{qn('w:docDefaults')}/{qn('w:rPrDefault')}/{qn('w:rPr')}/{qn('w:rFonts')}")
+        if _attr(default_fonts, "w:ascii"):
+            defaults["font"] = _attr(default_fonts, "w:ascii")
+        for style in element.iter(qn("w:style")):
+            props = {}
+            rpr = style.find(qn("w:rPr"))
+            if rpr is not None:
+                if rpr.find(qn("w:sz")) is not None:
+                    props["size"] = int(_attr(rpr.find(qn("w:sz")), "w:val")) / 2
+                if rpr.find(qn("w:b")) is not None:
+                    props["bold"] = _is_on(rpr.find(qn("w:b")))
+                if rpr.find(qn("w:i")) is not None:
+                    props["italic"] = _is_on(rpr.find(qn("w:i")))
+                fonts = rpr.find(qn("w:rFonts"))
+                if _attr(fonts, "w:ascii"):
+                    props["font"] = _attr(fonts, "w:ascii")
+            ppr = style.find(qn("w:pPr"))
+            if ppr is not None:
+                if ppr.find(qn("w:jc")) is not None:
+                    props["jc"] = _attr(ppr.find(qn("w:jc")), "w:val")
+                props.update(_spacing_props(ppr.find(qn("w:spacing"))))
+            based_on = style.find(qn("w:basedOn"))
+            raw[_attr(style, "w:styleId")] = (_attr(based_on, "w:val"), props)
+
+        resolved = {}
+        def resolve(style_id, depth=0):
+            if style_id in resolved:
+                return resolved[style_id]
+            if style_id not in raw or depth > 10:
+                return {}
+            parent, props = raw[style_id]
+            merged = {**resolve(parent, depth + 1), **props} if parent else dict(props)
+            resolved[style_id] = merged
+            return merged
+        for style_id in raw:
+            resolve(style_id)
+        return resolved, default_size, defaults
+
+    def _style(self, style_id):
+        return self.styles.get(style_id) or self.styles.get("Normal") or {}
+
+    def _load_numbering(self):
+        """numId -> {ilvl: (numFmt, lvlText)}"""
+        try:
+            element = self.document.part.numbering_part.element
+        except Exception:
+            return {}
+        abstract = {}
+        for node in element.iter(qn("w:abstractNum")):
+            levels = {}
+            for lvl in node.iter(qn("w:lvl")):
+                levels[_attr(lvl, "w:ilvl", "0")] = (
+                    _attr(lvl.find(qn("w:numFmt")), "w:val", "bullet"),
+                    _attr(lvl.find(qn("w:lvlText")), "w:val", "")
+                )
+            abstract[_attr(node, "w:abstractNumId")] = levels
+        numbering = {}
+        for num in element.iter(qn("w:num")):
+            numbering[_attr(num, "w:numId")] = abstract.get(_attr(num.find(qn("w:abstractNumId")), "w:val"), {})
+        return numbering
+
+    def _list_label(self, num_pr):
+        num_id = _attr(num_pr.find(qn("w:numId")), "w:val")
+        ilvl = _attr(num_pr.find(qn("w:ilvl")), "w:val", "0")
+        if num_id in (None, "0"):
+            return None
+        fmt, text = self.numbering.get(num_id, {}).get(ilvl, ("bullet", "•"))
+        if fmt == "bullet" or fmt == "none":
+            # Symbol-font bullets are private-use characters: draw a plain bullet
+            return "•" if fmt == "bullet" else ""
+        counter = self._counters.get((num_id, ilvl), 0) + 1
+        self._counters[(num_id, ilvl)] = counter
+        value = str(counter)
+        if fmt in ("lowerLetter", "upperLetter"):
+            value = chr(ord("a") + (counter - 1) % 26)
+            if fmt == "upperLetter":
+                value = value.upper()
+        return (text or "%1.").replace(f"%{int(ilvl) + 1}", value)
+
+    # --- blocks ---------------------------------------------------------------
+
+    def blocks(self, container, part, width):
+        """Flowables for the w:p / w:tbl children of a body, cell, header or footer."""
+        flowables = []
+        for child in container.iterchildren():
+            if child.tag == qn("w:p"):
+                flowables.extend(self.paragraph(child, part, width))
+            elif child.tag == qn("w:tbl"):
+                table = self.table(child, part, width)
+                if table is not None:
+                    flowables.append(table)
+            elif child.tag in (qn("w:sdt"), qn("w:customXml")):
+                content = child.find(qn("w:sdtContent"))
+                flowables.extend(self.blocks(content if content is not None else child, part, width))
+        return flowables
+
+    def paragraph(self, p, part, width):
+        ppr = p.find(qn("w:pPr"))
+        style = {**self.defaults, **self._table_props,
+                 **self._style(_attr(ppr.find(qn("w:pStyle")) if ppr is not None else None, "w:val"))}
+        base_size = style.get("size", self.default_size)
+
+        jc = style.get("jc")
+        spacing_props = dict(style)
+        left = right = first = 0
+        label = None
+        if ppr is not None:
+            jc = _attr(ppr.find(qn("w:jc")), "w:val", jc)
+            spacing_props.update(_spacing_props(ppr.find(qn("w:spacing"))))
+            ind = ppr.find(qn("w:ind"))
+            if ind is not None:
+                left = _twips(_attr(ind, "w:left") or _attr(ind, "w:start"))
+                right = _twips(_attr(ind, "w:right") or _attr(ind, "w:end"))
+                first = _twips(_attr(ind, "w:firstLine")) - _twips(_attr(ind, "w:hanging"))
+            num_pr = ppr.find(qn("w:numPr"))
+            if num_pr is not None:
+                label = self._list_label(num_pr)
+
+        markup, images, extra = [], [], []
+        base_font, factor = _pdf_font(style.get("font", ""))
+        max_size = [base_size * factor]
+        self._runs(p, part, style, base_size, markup, images, extra, max_size, width)
+
+        text = "".join(markup)
+        before, after = spacing_props.get("before", 0), spacing_props.get("after", 0)
+        if "line_pt" in spacing_props:
+            leading = max(spacing_props["line_pt"], max_size[0])
+        else:
+            leading = max_size[0] * 1.2 * spacing_props.get("line", 1.0)
+        flowables = []
+        if text.strip() or not images:
+            if label:
+                text = f"{escape(label)}&nbsp;&nbsp;{text}"
+                if not left:
+                    left = 18
+            paragraph_style = ParagraphStyle(
+                "p", fontName=base_font, fontSize=base_size * factor, leading=leading,
+                alignment=ALIGNMENTS.get(jc, TA_LEFT), spaceBefore=before, spaceAfter=after,
+                leftIndent=max(left, 0), rightIndent=max(right, 0), firstLineIndent=first
+            )
+            flowables.append(Paragraph(text or "&nbsp;", paragraph_style))
+        for image in images:
+            image.hAlign = {"center": "CENTER", "right": "RIGHT", "end": "RIGHT"}.get(jc, "LEFT")
+            flowables.append(image)
+        flowables.extend(extra)
+        return flowables
+
+    def _runs(self, container, part, style, base_size, markup, images, extra, max_size, width):
+        for child in container.iterchildren():
+            if child.tag == qn("w:r"):
+                self._run(child, part, style, base_size, markup, images, extra, max_size, width)
+            elif child.tag in RUN_CONTAINERS:
+                self._runs(child, part, style, base_size, markup, images, extra, max_size, width)
+
+    def _run(self, r, part, style, base_size, markup, images, extra, max_size, width):
+        rpr = r.find(qn("w:rPr"))
+        bold, italic = style.get("bold", False), style.get("italic", False)
+        underline, caps, size, color, family = False, False, base_size, None, style.get("font", "")
+        if rpr is not None:
+            if rpr.find(qn("w:b")) is not None:
+                bold = _is_on(rpr.find(qn("w:b")))
+            if rpr.find(qn("w:i")) is not None:
+                italic = _is_on(rpr.find(qn("w:i")))
+            u = rpr.find(qn("w:u"))
+            underline = u is not None and _attr(u, "w:val", "single") != "none"
+            caps = _is_on(rpr.find(qn("w:caps")))
+            sz = rpr.find(qn("w:sz"))
+            if sz is not None:
+                size = int(_attr(sz, "w:val", base_size * 2)) / 2
+            c = _attr(rpr.find(qn("w:color")), "w:val")
+            if c and c != "auto" and len(c) == 6:
+                color = f"#{c}"
+            fonts = rpr.find(qn("w:rFonts"))
+            if fonts is not None:
+                family = _attr(fonts, "w:ascii") or _attr(fonts, "w:hAnsi") or ""
+        font, factor = _pdf_font(family)
+        size *= factor
+        max_size[0] = max(max_size[0], size)
+
+        pieces = []
+        for child in r.iterchildren():
+            if child.tag == qn("w:t"):
+                text = child.text or ""
+                pieces.append(escape(text.upper() if caps else text))
+            elif child.tag == qn("w:tab"):
+                pieces.append("&nbsp;" * 4)
+            elif child.tag in (qn("w:br"), qn("w:cr")):
+                pieces.append("<br/>")
+            elif child.tag == qn("w:noBreakHyphen"):
+                pieces.append("-")
+            elif child.tag in (qn("w:drawing"), qn("w:pict"), MC_ALTERNATE):
+                self._graphics(child, part, images, extra, width)
+        if not pieces:
+            return
+        text = "".join(pieces)
+        if bold:
+            text = f"<b>{text}</b>"
+        if italic:
+            text = f"<i>{text}</i>"
+        if underline:
+            text = f"<u>{text}</u>"
+        color_attr = f' color="{color}"' if color else ""
+        markup.append(f'<font name="{font}" size="{size:g}"{color_attr}>{text}</font>')
+
+    def _graphics(self, element, part, images, extra, width):
+        if element.tag == MC_ALTERNATE:
+            # Choice and Fallback hold the same content: use only the first choice
+            choice = element.find(MC_CHOICE)
+            if choice is not None:
+                for child in choice.iterchildren():
+                    self._graphics(child, part, images, extra, width)
+            return
+        for blip in element.iter(A_BLIP, V_IMAGEDATA):
+            image = self.image(blip.get(R_EMBED) or blip.get(R_ID), element, part, width)
+            if image is not None:
+                images.append(image)
+        for textbox in element.iter(qn("w:txbxContent")):
+            extra.extend(self.blocks(textbox, part, width))
+
+    def image(self, rel_id, drawing, part, width):
+        if not rel_id or rel_id not in part.related_parts:
+            return None
+        try:
+            blob = part.related_parts[rel_id].blob
+            reader = ImageReader(io.BytesIO(blob))
+            pixel_w, pixel_h = reader.getSize()
+        except Exception as e:
+            print(f"WARNING: Skipping image {rel_id} in PDF: {e}")
+            return None
+        extent = drawing.find(f".//{WP_EXTENT}")
+        if extent is not None:
+            w = int(extent.get("cx", 0)) / EMU_PER_PT
+            h = int(extent.get("cy", 0)) / EMU_PER_PT
+        else:
+            w, h = pixel_w * 0.75, pixel_h * 0.75
+        if w <= 0 or h <= 0:
+            return None
+        if w > width:
+            w, h = width, h * width / w
+        return Image(io.BytesIO(blob), width=w, height=h)
+
+    # --- tables ---------------------------------------------------------------
+
+    def table(self, tbl, part, width):
+        tbl_grid = tbl.find(qn("w:tblGrid"))
+        grid = [_twips(_attr(col, "w:w")) for col in tbl_grid.iterchildren(qn("w:gridCol"))] if tbl_grid is not None else []
+        rows = [tr for tr in tbl.iterchildren(qn("w:tr"))]
+        if not rows:
+            return None
+        columns = max(len(grid), max(self._row_span(tr) for tr in rows))
+        if len(grid) < columns or not sum(grid):
+            grid = (grid + [0] * columns)[:columns]
+            known = sum(grid)
+            missing = [i for i, w in enumerate(grid) if not w]
+            for i in missing:
+                grid[i] = max(width - known, 0) / len(missing) or width / columns
+        scale = min(1.0, width / sum(grid)) if sum(grid) else 1.0
+        col_widths = [w * scale for w in grid]
+
+        tbl_pr = tbl.find(qn("w:tblPr"))
+        table_borders = {}
+        if tbl_pr is not None and tbl_pr.find(qn("w:tblBorders")) is not None:
+            for side in tbl_pr.find(qn("w:tblBorders")).iterchildren():
+                table_borders[side.tag.split("}")[1]] = side
+        style_id = _attr(tbl_pr.find(qn("w:tblStyle")) if tbl_pr is not None else None, "w:val", "")
+        outer_table_props = self._table_props
+        self._table_props = {key: value for key, value in self.styles.get(style_id, {}).items()
+                             if key in ("before", "after", "line", "line_pt")}
+        grid_style = "grid" in (style_id or "").lower()
+
+        data = [["" for _ in range(columns)] for _ in rows]
+        commands = [("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 3), ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+                    ("TOPPADDING", (0, 0), (-1, -1), 1), ("BOTTOMPADDING", (0, 0), (-1, -1), 1)]
+        merge_start = {}  # column -> row where the current vertical merge started
+        spans = {}  # (column, row) of a merged cell's origin -> (last column, last row)
+        for r, tr in enumerate(rows):
+            c = 0
+            for tc in tr.iterchildren(qn("w:tc")):
+                if c >= columns:
+                    break
+                tc_pr = tc.find(qn("w:tcPr"))
+                span = int(_attr(tc_pr.find(qn("w:gridSpan")) if tc_pr is not None else None, "w:val", 1))
+                span = max(1, min(span, columns - c))
+                v_merge = tc_pr.find(qn("w:vMerge")) if tc_pr is not None else None
+                end = c + span - 1
+                cell_width = sum(col_widths[c:end + 1]) - 6
+
+                if v_merge is not None and _attr(v_merge, "w:val", "continue") == "continue" and c in merge_start:
+                    origin = (c, merge_start[c])
+                    spans[origin] = (max(spans[origin][0], end), r)
+                else:
+                    merge_start.pop(c, None)
+                    if v_merge is not None:
+                        merge_start[c] = r
+                    data[r][c] = self.blocks(tc, part, max(cell_width, 10)) or ""
+                    spans[(c, r)] = (end, r)
+
+                shd = tc_pr.find(qn("w:shd")) if tc_pr is not None else None
+                fill = _attr(shd, "w:fill")
+                if fill and fill != "auto" and len(fill) == 6:
+                    commands.append(("BACKGROUND", (c, r), (end, r), colors.HexColor(f"#{fill}")))
+
+                cell_borders = {}
+                if tc_pr is not None and tc_pr.find(qn("w:tcBorders")) is not None:
+                    for side in tc_pr.find(qn("w:tcBorders")).iterchildren():
+                        cell_borders[side.tag.split("}")[1]] = side
+                for side, outer, inner, command, cells in (
+                    ("top", r == 0, "insideH", "LINEABOVE", ((c, r), (end, r))),
+                    ("bottom", r == len(rows) - 1, "insideH", "LINEBELOW", ((c, r), (end, r))),
+                    ("left", c == 0, "insideV", "LINEBEFORE", ((c, r), (c, r))),
+                    ("right", end == columns - 1, "insideV", "LINEAFTER", ((end, r), (end, r))),
+                ):
+                    logical = {"left": "start", "right": "end"}.get(side, "")
+                    border = cell_borders.get(side)
+                    if border is None:
+                        border = cell_borders.get(logical)
+                    if border is None:
+                        border = table_borders.get(side if outer else inner)
+                        if border is None and outer:
+                            border = table_borders.get(logical)
+                    if border is None:
+                        if not grid_style:
+                            continue
+                        line_width, color = 0.5, colors.black
+                    else:
+                        if _attr(border, "w:val") in NO_BORDER:
+                            continue
+                        line_width = max(int(_attr(border, "w:sz", 4)) / 8, 0.25)
+                        hex_color = _attr(border, "w:color", "000000")
+                        color = colors.HexColor(f"#{hex_color}") if hex_color and len(hex_color) == 6 else colors.black
+                    commands.append((command, cells[0], cells[1], line_width, color))
+                c = end + 1
+
+        self._table_props = outer_table_props
+
+        for origin, last in spans.items():
+            if origin != last:
+                commands.append(("SPAN", origin, last))
+
+        table = Table(data, colWidths=col_widths, style=TableStyle(commands), hAlign="LEFT")
+        jc = _attr(tbl_pr.find(qn("w:jc")) if tbl_pr is not None else None, "w:val")
+        if jc == "center":
+            table.hAlign = "CENTER"
+        elif jc in ("right", "end"):
+            table.hAlign = "RIGHT"
+        return table
+
+    @staticmethod
+    def _row_span(tr):
+        total = 0
+        for tc in tr.iterchildren(qn("w:tc")):
+            tc_pr = tc.find(qn("w:tcPr"))
+            total += int(_attr(tc_pr.find(qn("w:gridSpan")) if tc_pr is not None else None, "w:val", 1))
+        return total
+
+def _page_setup(document):
+    """(page size, margins dict) of the first section, in points."""
+    sect_pr = document.element.body.find(qn("w:sectPr"))
+    if sect_pr is None:
+        sections = list(document.element.body.iter(qn("w:sectPr")))
+        sect_pr = sections[0] if sections else None
+    pg_sz = sect_pr.find(qn("w:pgSz")) if sect_pr is not None else None
+    pg_mar = sect_pr.find(qn("w:pgMar")) if sect_pr is not None else None
+    size = (_twips(_attr(pg_sz, "w:w"), DEFAULT_PAGE[0]), _twips(_attr(pg_sz, "w:h"), DEFAULT_PAGE[1]))
+    margins = {name: _twips(_attr(pg_mar, f"w:{name}"), DEFAULT_MARGIN) for name in ("top", "bottom", "left", "right")}
+    margins["header"] = _twips(_attr(pg_mar, "w:header"), 36)
+    margins["footer"] = _twips(_attr(pg_mar, "w:footer"), 36)
+    return sect_pr, size, margins
+
+def _header_footer_part(document, sect_pr, kind):
+    """Part of the default header/footer ('header' or 'footer') referenced by the section."""
+    if sect_pr is None:
+        return None
+    for reference in sect_pr.iterchildren(qn(f"w:{kind}Reference")):
+        if _attr(reference, "w:type", "default") == "default":
+            return document.part.related_parts.get(reference.get(R_ID))
+    return None
+
+def render_pdf(document) -> bytes:
+    """PDF bytes of a python-docx Document."""
+    layout = _DocxLayout(document)
+    sect_pr, page_size, margins = _page_setup(document)
+    frame_width = page_size[0] - margins["left"] - margins["right"]
+    header_part = _header_footer_part(document, sect_pr, "header")
+    footer_part = _header_footer_part(document, sect_pr, "footer")
+
+    def draw_header_footer(canvas, doc_template):
+        # Rebuilt on every page: flowables can only be drawn once
+        for part, is_header in ((header_part, True), (footer_part, False)):
+            if part is None:
+                continue
+            flowables = layout.blocks(part.element, part, frame_width)
+            if not flowables:
+                continue
+            height = sum(f.wrap(frame_width, page_size[1])[1] for f in flowables) + 4
+            if is_header:
+                y = page_size[1] - margins["header"] - height
+            else:
+                y = margins["footer"]
+            frame = Frame(margins["left"], y, frame_width, height, leftPadding=0, rightPadding=0,
+                          topPadding=0, bottomPadding=0, showBoundary=0)
+            frame.addFromList(flowables, canvas)
+
+    buffer = io.BytesIO()
+    # Word's margins are the text area itself: no extra frame padding
+    body_frame = Frame(margins["left"], margins["bottom"], frame_width,
+                       page_size[1] - margins["top"] - margins["bottom"],
+                       leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+    template = BaseDocTemplate(
+        buffer, pagesize=page_size, pageTemplates=[PageTemplate("acta", [body_frame], onPage=draw_header_footer)],
+        title=document.core_properties.title or "", author=document.core_properties.author or ""
+    )
+    story = layout.blocks(document.element.body, document.part, frame_width)
+    # Trailing empty paragraphs (always present after a final table) would only add a blank page
+    while story and isinstance(story[-1], Paragraph) and not story[-1].getPlainText().strip():
+        story.pop()
+    story = story or [Spacer(1, 1)]
+    template.build(story)
+    return buffer.getvalue()
+
+def docx_to_pdf(docx_path: str, pdf_path: str = None) -> str:
+    """Convert a .docx file; writes `pdf_path` (default: same name, .pdf) atomically."""
+    pdf_path = pdf_path or os.path.splitext(docx_path)[0] + ".pdf"
+    data = render_pdf(Document(docx_path))
+    temp_path = f"{pdf_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, pdf_path)
+    return pdf_path
+
+def ensure_pdf(docx_path: str) -> str:
+    """PDF next to `docx_path`, converted only if missing or older than the .docx."""
+    pdf_path = os.path.splitext(docx_path)[0] + ".pdf"
+    try:
+        if os.path.getmtime(pdf_path) >= os.path.getmtime(docx_path):
+            return pdf_path
+    except OSError:
+        pass
+    return docx_to_pdf(docx_path, pdf_path)
+
+def check_format(output_format: str) -> str:
+    output_format = (output_format or "docx").lower()
+    if output_format not in ACTA_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(ACTA_FORMATS)}")
+    return output_format
+
+def pdf_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".pdf"
+
+def acta_response(path: str, filename: str, output_format: str = "docx", headers: dict = None) -> FileResponse:
+    """FileResponse for a generated .docx, converted to PDF when output_format == 'pdf'."""
+    if check_format(output_format) == "pdf":
+        path, filename, media_type = ensure_pdf(path), pdf_filename(filename), PDF_MEDIA_TYPE
+    else:
+        media_type = DOCX_MEDIA_TYPE
+    # Served again: keep it out of the storage housekeeping eviction
+    from services import storage
+    storage.record_access(path)
+    return FileResponse(path=path, filename=filename, media_type=media_type, headers=headers)
@@ -0,0 +1,20 @@
+"""
+Process pools for CPU-bound work (image processing, acta rendering, document jobs).
+
+Pools always use the spawn start method. The API process already runs server
+threads, DB connection pools and the background sweepers, and fork() copies
+only the calling thread: a child can inherit a lock held by another thread
+(logging, the SQLAlchemy pool, a driver) and hang on it, or reuse a socket
+that belongs to the parent. Spawned workers start from a fresh interpreter and
+import what they need, so the first task on each worker pays that import once.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def new_spawn_pool(workers: int, initializer=None) -> ProcessPoolExecutor:
+    """ProcessPoolExecutor with `workers` spawned processes, each running `initializer` first."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer
+    )
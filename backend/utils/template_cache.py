@@ -0,0 +1,143 @@
+"""
+Compiled .docx templates for acta generation.
+
+Opening a template with Document() unzips and parses every XML part on each
+acta. A CompiledTemplate keeps the parsed document (the "skeleton") plus the
+text of every paragraph in the body, headers and footers, so a render is:
+
+    compiled = template_cache.get_compiled(raw_path, resolve, template_id=...)
+    doc = compiled.new_document()                       # deep copy, no unzip/parse
+    placeholders = compiled.used_placeholders(placeholders)  # only keys present in the file
+
+Entries are keyed by (template id, raw path, kind) and revalidated on every
+lookup against the file's mtime and size, so replacing the file on disk
+recompiles it even in workers that never saw the invalidation.
+templates.update_template / set_default_template / delete_template call
+invalidate() to drop entries eagerly. Hit/miss counters are exposed with stats().
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from functools import lru_cache
+from docx import Document
+from docx.oxml.ns import qn
+
+MAX_COMPILED_TEMPLATES = 32
+
+# Parts whose text is searched for placeholders
+TEXT_PART_PREFIXES = ("/word/document", "/word/header", "/word/footer")
+
+class CompiledTemplate:
+    """Parsed template document plus the placeholder text it contains."""
+
+    def __init__(self, path: str):
+        stat = os.stat(path)
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        with open(path, "rb") as f:
+            data = f.read()
+        # Content hash of the file: part of the render key in utils.acta_cache
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.document = Document(io.BytesIO(data))
+        self.text = "\n".join(self._paragraph_texts())
+
+    def _paragraph_texts(self):
+        # Walk the package parts directly: section.header/footer would add
+        # missing header parts to the skeleton
+        for part in self.document.part.package.iter_parts():
+            if not str(part.partname).startswith(TEXT_PART_PREFIXES):
+                continue
+            element = getattr(part, "element", None)
+            if element is None:
+                continue
+            for paragraph in element.iter(qn("w:p")):
+                yield "".join(t.text or "" for t in paragraph.iter(qn("w:t")))
+
+    def is_current(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def new_document(self):
+        """Independent copy of the skeleton, ready to be filled and saved."""
+        # Only use the skeleton through the package parts (as above): python-docx
+        # proxies cached on it (e.g. the _Body behind doc.paragraphs) would be
+        # deep-copied into detached trees instead of following the copied document
+        return deepcopy(self.document)
+
+    def contains(self, fragment: str) -> bool:
+        """Whether `fragment` appears inside some paragraph of the template."""
+        return fragment in self.text
+
+    def used_placeholders(self, placeholders: dict) -> dict:
+        """Subset of `placeholders` whose keys actually appear in the template."""
+        return {key: value for key, value in placeholders.items() if key in self.text}
+
+_compiled = OrderedDict()  # (template_id, raw_path, kind) -> CompiledTemplate
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def get_compiled(raw_path, resolve, template_id=None, kind: str = "default") -> CompiledTemplate:
+    """
+    Compiled template for `raw_path`.
+    `resolve(raw_path)` must return the absolute path of the file to use (applying
+    the caller's fallbacks) or raise; it is only called on a miss.
+    """
+    key = (template_id, raw_path, kind)
+    with _lock:
+        entry = _compiled.get(key)
+    if entry is not None and entry.is_current():
+        with _lock:
+            _stats["hits"] += 1
+            if key in _compiled:
+                _compiled.move_to_end(key)
+        return entry
+
+    entry = CompiledTemplate(resolve(raw_path))
+    with _lock:
+        _stats["misses"] += 1
+        _compiled[key] = entry
+        _compiled.move_to_end(key)
+        while len(_compiled) > MAX_COMPILED_TEMPLATES:
+            _compiled.popitem(last=False)
+    print(f"DEBUG: Compiled template {entry.path} (id={template_id}, kind={kind})")
+    return entry
+
+def invalidate(template_id=None):
+    """Drop the compiled entries of one template, or all of them when template_id is None."""
+    with _lock:
+        keys = [key for key in _compiled if template_id is None or key[0] == template_id]
+        for key in keys:
+            del _compiled[key]
+        _stats["invalidations"] += 1
+
+def stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_compiled),
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None
+        }
+
+@lru_cache(maxsize=128)
+def _parse_variables_json(raw: str):
+    return json.loads(raw)
+
+def parse_variables(template):
+    """
+    Variable mapping of a DocumentTemplate (list of {name, map_to, ...}).
+    JSON strings are parsed once per distinct value; treat the result as read-only.
+    """
+    if not template or not template.variables:
+        return []
+    if isinstance(template.variables, str):
+        return _parse_variables_json(template.variables)
+    return template.variables
@@ -0,0 +1,134 @@
+"""
+ZIP archives written straight into a streamed response.
+
+zipfile can write to a non-seekable file: it then emits a data descriptor
+after each entry instead of seeking back to patch the local header. ZipStream
+is such a file; it keeps only the bytes written since the last drain(), so an
+archive can be produced entry by entry without staging it in memory or on disk:
+
+    zip_stream = ZipStream()
+    for arcname, data in documents:
+        zip_stream.add(arcname, data)
+        yield zip_stream.drain()
+    yield zip_stream.close()
+
+stream_files() does the same for files already on disk, reading them in chunks;
+write_files() writes that same archive to a file instead (background jobs).
+"""
+import os
+import zipfile
+from datetime import datetime
+
+CHUNK_SIZE = 64 * 1024
+
+class _Sink:
+    """Write-only, non-seekable buffer (zipfile detects that tell() is missing)."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+class ZipStream:
+    """Incremental ZIP writer; drain() returns the archive bytes produced so far."""
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression)
+        self._names = set()
+
+    def unique_name(self, arcname: str) -> str:
+        """`arcname`, or `name (2).ext` etc. if it is already in the archive."""
+        if arcname not in self._names:
+            return arcname
+        stem, dot, ext = arcname.rpartition(".")
+        if not dot:
+            stem, ext = arcname, ""
+        counter = 2
+        while True:
+            candidate = f"{stem} ({counter}){dot}{ext}"
+            if candidate not in self._names:
+                return candidate
+            counter += 1
+
+    def add(self, arcname: str, data: bytes, compression: int = None) -> str:
+        """Add one entry (renamed if the name is taken). Returns the name used."""
+        arcname = self.unique_name(arcname)
+        info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = self._zip.compression if compression is None else compression
+        self._zip.writestr(info, data)
+        self._names.add(arcname)
+        return arcname
+
+    def add_file(self, path: str, arcname: str, compression: int = None, chunk_size: int = CHUNK_SIZE):
+        """
+        Add a file from disk, chunk by chunk. Generator: yields the archive bytes
+        produced while copying, so a large file is never held in memory.
+        """
+        arcname = self.unique_name(arcname)
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        info.compress_type = self._zip.compression if compression is None else compression
+        with open(path, "rb") as src, self._zip.open(info, "w") as dest:
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                dest.write(data)
+                chunk = self.drain()
+                if chunk:
+                    yield chunk
+        self._names.add(arcname)
+        chunk = self.drain()
+        if chunk:
+            yield chunk
+
+    def drain(self) -> bytes:
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the remaining bytes."""
+        self._zip.close()
+        return self._sink.take()
+
+def stream_files(files, compression: int = zipfile.ZIP_DEFLATED, remove: bool = False):
+    """
+    Generator of the bytes of a ZIP holding `files` ([(path, arcname)]).
+    With remove=True each file is deleted once it is in the archive.
+    """
+    zip_stream = ZipStream(compression)
+    for path, arcname in files:
+        yield from zip_stream.add_file(path, arcname)
+        if remove:
+            os.remove(path)
+    yield zip_stream.close()
+
+def write_files(files, dest_path: str, compression: int = zipfile.ZIP_DEFLATED, remove: bool = False) -> str:
+    """
+    Write the ZIP of stream_files() to `dest_path` and return the path. The archive
+    is written to a temporary name first, so a partial file is never left in place.
+    """
+    directory = os.path.dirname(dest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as out:
+            for chunk in stream_files(files, compression, remove):
+                out.write(chunk)
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return dest_path
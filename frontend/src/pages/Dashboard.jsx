@@ -147,7 +147,10 @@ const Dashboard = () => {
                 params: {
                     skip: 0,
                     limit: 10000, // Get all devices for filters
-                    include_deleted: false
+                    include_deleted: false,
+                    // Only the columns the filters use (skips assignments, much smaller payload)
+                    fields: 'device_type,brand,serial_number,hostname,inventory_code,status',
+                    count: 'none'
                 }
             });
             setAllDevices(response.data.items || []);